@@ -0,0 +1,28 @@
+"""
+特徴量エンジニアリングモジュール（atmaCup#8）
+
+使用方法:
+    from features import hash_text_features, create_text_svd_features
+
+    # Name などの文字列カラムをハッシュ n-gram の疎行列に変換（語彙を保持しない）
+    X_train, X_test, text_names = hash_text_features(
+        train, test, ['Name'], n_features=2 ** 18, ngram_range=(1, 2),
+        cache_dir='../data/output/text_cache'
+    )
+
+    # Truncated SVD で密な特徴量に圧縮してデータフレームに追加
+    train, test, svd_cols = create_text_svd_features(train, test, ['Name'], n_components=16)
+"""
+
+from .text import (
+    hash_text_columns,
+    hash_text_features,
+    create_text_svd_features
+)
+
+__all__ = [
+    # text
+    'hash_text_columns',
+    'hash_text_features',
+    'create_text_svd_features',
+]
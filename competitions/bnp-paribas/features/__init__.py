@@ -0,0 +1,24 @@
+"""
+特徴量エンジニアリングモジュール（BNP Paribas Cardif）
+
+使用方法:
+    from features import create_missing_pattern_features
+
+    # 欠損数・欠損パターンID・パターン頻度・パターンごとの統計量
+    train, test, pattern_info = create_missing_pattern_features(
+        train, test, stat_cols=['v50', 'v10'], chunk_size=100_000
+    )
+"""
+
+from .missing import (
+    hash_missing_mask,
+    create_missing_pattern_features,
+    apply_missing_pattern_features
+)
+
+__all__ = [
+    # missing
+    'hash_missing_mask',
+    'create_missing_pattern_features',
+    'apply_missing_pattern_features',
+]
@@ -0,0 +1,184 @@
+"""
+欠損パターン特徴量
+欠損数、欠損パターンID（ビットマスクのハッシュ）、パターン頻度、パターンごとの統計量
+"""
+import pandas as pd
+import numpy as np
+from typing import Dict, List
+
+
+# 64bitハッシュ混合用の定数（splitmix64）
+_MIX_MULT_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_MULT_2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix64(z: np.ndarray) -> np.ndarray:
+    """uint64 配列をsplitmix64で混合"""
+    z = (z ^ (z >> np.uint64(30))) * _MIX_MULT_1
+    z = (z ^ (z >> np.uint64(27))) * _MIX_MULT_2
+    return z ^ (z >> np.uint64(31))
+
+
+def hash_missing_mask(mask: np.ndarray) -> np.ndarray:
+    """
+    欠損の真偽値行列 (n_rows, n_cols) の各行をint64のパターンIDにハッシュ
+
+    ビットをuint8にパックし、64bitずつまとめて混合するため、行ごとのPythonループは不要。
+
+    Parameters:
+    -----------
+    mask : np.ndarray
+        欠損を示す bool 行列
+
+    Returns:
+    --------
+    np.ndarray : int64 のパターンID
+    """
+    packed = np.packbits(mask, axis=1)
+    n_bytes = packed.shape[1]
+    pad = (-n_bytes) % 8
+    if pad or n_bytes == 0:
+        packed = np.concatenate([packed, np.zeros((len(packed), pad or 8), dtype=np.uint8)], axis=1)
+    words = np.ascontiguousarray(packed).view(np.uint64)
+
+    with np.errstate(over='ignore'):
+        h = np.full(len(mask), _GOLDEN, dtype=np.uint64)
+        for j in range(words.shape[1]):
+            h = _mix64(h ^ (words[:, j] + _GOLDEN * np.uint64(j + 1)))
+    return h.view(np.int64)
+
+
+def _pattern_chunk(df: pd.DataFrame, cols: List[str]) -> tuple:
+    """1チャンク分の (欠損数, パターンID) を計算"""
+    mask = df[cols].isna().to_numpy()
+    return mask.sum(axis=1).astype(np.int32), hash_missing_mask(mask)
+
+
+def create_missing_pattern_features(train: pd.DataFrame, test: pd.DataFrame,
+                                    cols: List[str] = None,
+                                    stat_cols: List[str] = None,
+                                    exclude_cols: List[str] = None,
+                                    chunk_size: int = None) -> tuple:
+    """
+    欠損パターン特徴量を作成
+
+    すべてのカラムの欠損を1つの bool 行列として扱い、欠損数・パターンID・パターン頻度
+    （訓練+テスト）と、パターンごとの数値カラムの平均・標準偏差を計算する。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str], optional
+        欠損パターンに使うカラム（デフォルト: exclude_cols 以外のすべて）
+    stat_cols : List[str], optional
+        パターンごとに平均・標準偏差を計算する数値カラム
+    exclude_cols : List[str]
+        除外するカラム（デフォルト: ['ID', 'target']）
+    chunk_size : int, optional
+        行チャンクのサイズ（指定すると bool 行列をチャンクごとに作成し、ピークメモリを抑える）
+
+    Returns:
+    --------
+    tuple : (train, test, pattern_info)
+        pattern_info: {'cols': 使用カラム, 'frequency': パターンID → 件数の Series,
+                       'stats': パターンごとの統計量のデータフレーム}
+    """
+    if exclude_cols is None:
+        exclude_cols = ['ID', 'target']
+    if cols is None:
+        cols = [col for col in train.columns if col not in exclude_cols]
+    cols = [col for col in cols if col in test.columns]
+    stat_cols = [col for col in (stat_cols or []) if col in train.columns and col in test.columns]
+
+    train = train.copy()
+    test = test.copy()
+    n_train = len(train)
+
+    # 欠損数とパターンID（チャンクごとに計算して結合）
+    counts, pattern_ids = [], []
+    for df in (train, test):
+        step = chunk_size or max(len(df), 1)
+        for start in range(0, len(df), step):
+            count, pattern_id = _pattern_chunk(df.iloc[start:start + step], cols)
+            counts.append(count)
+            pattern_ids.append(pattern_id)
+    nan_count = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int32)
+    pattern_id = np.concatenate(pattern_ids) if pattern_ids else np.zeros(0, dtype=np.int64)
+
+    # パターン頻度（訓練+テスト）
+    unique_ids, inverse, frequency = np.unique(pattern_id, return_inverse=True, return_counts=True)
+
+    train['nan_count'] = nan_count[:n_train]
+    test['nan_count'] = nan_count[n_train:]
+    train['nan_pattern_id'] = pattern_id[:n_train]
+    test['nan_pattern_id'] = pattern_id[n_train:]
+    train['nan_pattern_frequency'] = frequency[inverse[:n_train]]
+    test['nan_pattern_frequency'] = frequency[inverse[n_train:]]
+
+    # パターンごとの統計量（bincountで全パターンを一括集計、欠損は除外）
+    stats = {}
+    for col in stat_cols:
+        values = np.concatenate([train[col].to_numpy(dtype=np.float64), test[col].to_numpy(dtype=np.float64)])
+        valid = ~np.isnan(values)
+        n = np.bincount(inverse[valid], minlength=len(unique_ids))
+        total = np.bincount(inverse[valid], weights=values[valid], minlength=len(unique_ids))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / n
+            # 平均を引いてから二乗和を取る（E[x^2] - E[x]^2 は平均が大きいと桁落ちする）
+            m2 = np.bincount(inverse[valid], weights=(values[valid] - mean[inverse[valid]]) ** 2,
+                             minlength=len(unique_ids))
+            std = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        stats[f'{col}_nan_pattern_mean'] = mean
+        stats[f'{col}_nan_pattern_std'] = std
+
+        train[f'{col}_nan_pattern_mean'] = mean[inverse[:n_train]]
+        test[f'{col}_nan_pattern_mean'] = mean[inverse[n_train:]]
+        train[f'{col}_nan_pattern_std'] = std[inverse[:n_train]]
+        test[f'{col}_nan_pattern_std'] = std[inverse[n_train:]]
+
+    pattern_info = {
+        'cols': cols,
+        'frequency': pd.Series(frequency, index=unique_ids),
+        'stats': pd.DataFrame(stats, index=unique_ids),
+    }
+
+    return train, test, pattern_info
+
+
+def apply_missing_pattern_features(df: pd.DataFrame, pattern_info: Dict,
+                                   chunk_size: int = None) -> pd.DataFrame:
+    """
+    学習済みのパターン頻度・統計量を新しいデータに適用（未知のパターンは頻度0・統計量NaN）
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    pattern_info : Dict
+        create_missing_pattern_features() の戻り値の pattern_info
+    chunk_size : int, optional
+        行チャンクのサイズ
+
+    Returns:
+    --------
+    pd.DataFrame : 特徴量を追加したデータフレーム
+    """
+    df = df.copy()
+    step = chunk_size or max(len(df), 1)
+    chunks = [_pattern_chunk(df.iloc[start:start + step], pattern_info['cols'])
+              for start in range(0, len(df), step)]
+    nan_count = np.concatenate([c for c, _ in chunks]) if chunks else np.zeros(0, dtype=np.int32)
+    pattern_id = np.concatenate([p for _, p in chunks]) if chunks else np.zeros(0, dtype=np.int64)
+
+    df['nan_count'] = nan_count
+    df['nan_pattern_id'] = pattern_id
+    pattern_id = pd.Series(pattern_id, index=df.index)
+    df['nan_pattern_frequency'] = pattern_id.map(pattern_info['frequency']).fillna(0).astype(np.int64)
+    for col in pattern_info['stats'].columns:
+        df[col] = pattern_id.map(pattern_info['stats'][col])
+
+    return df
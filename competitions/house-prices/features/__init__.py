@@ -0,0 +1,34 @@
+"""
+特徴量エンジニアリングモジュール（House Prices）
+
+使用方法:
+    from features import power_transform_skewed, compute_skewness
+
+    # 歪度の確認
+    skewness = compute_skewness(train[numeric_cols])
+
+    # 歪度の大きいカラムをBox-Cox変換（学習済みパラメータはキャッシュ）
+    train, test, params = power_transform_skewed(
+        train, test, cols=numeric_cols, method='boxcox',
+        cache_path='data/output/power_transform.json'
+    )
+"""
+
+from .transform import (
+    compute_skewness,
+    fit_power_transform,
+    apply_power_transform,
+    save_power_transform,
+    load_power_transform,
+    power_transform_skewed
+)
+
+__all__ = [
+    # transform
+    'compute_skewness',
+    'fit_power_transform',
+    'apply_power_transform',
+    'save_power_transform',
+    'load_power_transform',
+    'power_transform_skewed',
+]
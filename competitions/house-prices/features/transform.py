@@ -0,0 +1,270 @@
+"""
+歪度補正（べき変換）
+数値特徴量の歪度を一括計算し、Box-Cox / Yeo-Johnson / log1p 変換をまとめて適用する
+"""
+import json
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+
+def compute_skewness(df: pd.DataFrame, cols: List[str] = None) -> pd.Series:
+    """
+    数値カラムの歪度を NumPy の1回の2次元計算でまとめて求める
+
+    scipy.stats.skew(x.dropna())（bias=True）と同じ値を返す。
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    cols : List[str], optional
+        対象カラム（デフォルト: すべての数値カラム）
+
+    Returns:
+    --------
+    pd.Series : カラム名 → 歪度（降順）
+    """
+    if cols is None:
+        cols = df.select_dtypes(include=[np.number]).columns.tolist()
+
+    X = df[cols].to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(X, axis=0)
+        deviation = X - mean
+        m2 = np.nanmean(deviation ** 2, axis=0)
+        m3 = np.nanmean(deviation ** 3, axis=0)
+        skewness = np.where(m2 > 0, m3 / m2 ** 1.5, 0.0)
+
+    return pd.Series(skewness, index=cols).sort_values(ascending=False)
+
+
+def _fit_lambda(values: np.ndarray, method: str) -> float:
+    """1カラム分の λ を最尤推定（プロセスプールから呼ばれる）"""
+    from scipy import stats
+
+    values = values[~np.isnan(values)]
+    if method == 'boxcox':
+        return float(stats.boxcox_normmax(values, method='mle'))
+    return float(stats.yeojohnson_normmax(values))
+
+
+def fit_power_transform(train: pd.DataFrame,
+                        cols: List[str] = None,
+                        method: str = 'boxcox',
+                        skew_threshold: float = 0.75,
+                        n_jobs: int = 1) -> Dict:
+    """
+    歪度の大きい数値カラムに対するべき変換のパラメータを学習
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    cols : List[str], optional
+        対象カラム（デフォルト: すべての数値カラム）
+    method : str
+        'boxcox'（x + shift に適用）、'yeo-johnson'、'log1p'
+    skew_threshold : float
+        |歪度| がこの値より大きいカラムのみ変換（'log1p' は歪度がこの値より大きい正の歪みのカラムのみ）
+    n_jobs : int
+        λ の推定に使うプロセス数（1: 直列、-1: 全コア）
+
+    Returns:
+    --------
+    Dict : {
+        'method': 変換方法,
+        'cols': 指定した対象カラム（None: すべての数値カラム）,
+        'skew_threshold': 歪度のしきい値,
+        'columns': 変換するカラムのリスト,
+        'lambdas': カラム → λ,
+        'shifts': カラム → 変換前に加える値（Box-Cox / log1p の定義域に収めるため）,
+        'skewness': カラム → 変換前の歪度
+    }
+    """
+    if method not in ('boxcox', 'yeo-johnson', 'log1p'):
+        raise ValueError(f"method は 'boxcox', 'yeo-johnson', 'log1p' のいずれかを指定してください: {method}")
+
+    skewness = compute_skewness(train, cols)
+    if method == 'log1p':
+        # log1p は右に裾の長い分布のみを補正する（負の歪みのカラムは逆に歪みが大きくなる）
+        target_cols = skewness[skewness > skew_threshold].index.tolist()
+    else:
+        target_cols = skewness[skewness.abs() > skew_threshold].index.tolist()
+
+    X = train[target_cols].to_numpy(dtype=np.float64)
+    col_min = np.nanmin(X, axis=0) if len(target_cols) else np.zeros(0)
+
+    if method == 'yeo-johnson':
+        shifts = np.zeros(len(target_cols))
+    elif method == 'log1p':
+        # log1p は x > -1 で定義されるため、最小値が -1 以下のカラムのみ最小値が0になるまでずらす
+        shifts = np.where(col_min <= -1, -col_min, 0.0)
+    else:
+        # Box-Cox は正の値が必要なため、最小値が1になるまでずらす（0を含む面積系カラム向け）
+        shifts = np.where(col_min < 1, 1 - col_min, 0.0)
+
+    if method == 'log1p':
+        lambdas = np.zeros(len(target_cols))
+    else:
+        columns = [X[:, j] + shifts[j] for j in range(len(target_cols))]
+        if n_jobs == 1 or len(columns) <= 1:
+            lambdas = [_fit_lambda(values, method) for values in columns]
+        else:
+            max_workers = None if n_jobs < 0 else n_jobs
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                lambdas = list(executor.map(_fit_lambda, columns, [method] * len(columns)))
+
+    return {
+        'method': method,
+        'cols': None if cols is None else list(cols),
+        'skew_threshold': float(skew_threshold),
+        'columns': target_cols,
+        'lambdas': dict(zip(target_cols, map(float, lambdas))),
+        'shifts': dict(zip(target_cols, map(float, shifts))),
+        'skewness': {col: float(skewness[col]) for col in target_cols},
+    }
+
+
+def _yeo_johnson(X: np.ndarray, lam: np.ndarray) -> np.ndarray:
+    """Yeo-Johnson変換を2次元配列に一括適用"""
+    out = np.empty_like(X)
+    pos = X >= 0
+    lam = np.broadcast_to(lam, X.shape)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lam_zero = np.abs(lam) < 1e-8
+        lam_two = np.abs(lam - 2) < 1e-8
+        pos_power = ((X + 1) ** lam - 1) / np.where(lam_zero, 1, lam)
+        neg_power = -((1 - X) ** (2 - lam) - 1) / np.where(lam_two, 1, 2 - lam)
+        out = np.where(pos, np.where(lam_zero, np.log1p(X), pos_power),
+                       np.where(lam_two, -np.log1p(-X), neg_power))
+    return out
+
+
+def apply_power_transform(df: pd.DataFrame, params: Dict) -> pd.DataFrame:
+    """
+    学習済みのべき変換をデータに適用（再学習はしない）
+
+    対象カラムを1つの2次元配列として一括変換する。
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム（テストデータや新しいデータ）
+    params : Dict
+        fit_power_transform() の戻り値
+
+    Returns:
+    --------
+    pd.DataFrame : 変換後のデータフレーム（カラムは上書き）
+    """
+    df = df.copy()
+    cols = [col for col in params['columns'] if col in df.columns]
+    if not cols:
+        return df
+
+    X = df[cols].to_numpy(dtype=np.float64)
+    lam = np.array([params['lambdas'][col] for col in cols])
+    shift = np.array([params['shifts'][col] for col in cols])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if params['method'] == 'yeo-johnson':
+            out = _yeo_johnson(X, lam)
+        elif params['method'] == 'log1p':
+            # 学習データの範囲外（x + shift <= -1）は下限に丸める
+            out = np.log1p(np.maximum(X + shift, -1 + 1e-12))
+        else:
+            # 学習データの範囲外（x + shift <= 0）は下限に丸める
+            Z = np.maximum(X + shift, 1e-12)
+            lam_zero = np.abs(lam) < 1e-8
+            out = np.where(lam_zero, np.log(Z), (Z ** lam - 1) / np.where(lam_zero, 1, lam))
+
+    df[cols] = out
+    return df
+
+
+def save_power_transform(params: Dict, path: str) -> None:
+    """
+    学習済みパラメータをJSONに保存
+
+    Parameters:
+    -----------
+    params : Dict
+        fit_power_transform() の戻り値
+    path : str
+        保存先のパス
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(params, f, indent=2, ensure_ascii=False)
+
+
+def load_power_transform(path: str) -> Dict:
+    """
+    保存したパラメータを読み込む
+
+    Parameters:
+    -----------
+    path : str
+        save_power_transform() で保存したJSONのパス
+
+    Returns:
+    --------
+    Dict : fit_power_transform() と同じ形式のパラメータ
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def power_transform_skewed(train: pd.DataFrame, test: pd.DataFrame,
+                           cols: List[str] = None,
+                           method: str = 'boxcox',
+                           skew_threshold: float = 0.75,
+                           n_jobs: int = 1,
+                           cache_path: str = None) -> tuple:
+    """
+    歪度の大きい数値カラムを訓練データで学習したべき変換でまとめて補正
+
+    cache_path が存在し、保存時の method・cols・skew_threshold が引数と一致する場合は
+    学習済みパラメータを読み込む。存在しない場合や設定が異なる場合は学習して保存する。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str], optional
+        対象カラム（デフォルト: すべての数値カラム。目的変数やIDは除外しておくこと）
+    method : str
+        'boxcox'、'yeo-johnson'、'log1p'
+    skew_threshold : float
+        |歪度| がこの値より大きいカラムのみ変換
+    n_jobs : int
+        λ の推定に使うプロセス数
+    cache_path : str, optional
+        パラメータのキャッシュ（JSON）のパス
+
+    Returns:
+    --------
+    tuple : (train, test, params)
+    """
+    params = None
+    if cache_path is not None and os.path.exists(cache_path):
+        params = load_power_transform(cache_path)
+        settings = (params.get('method'), params.get('cols'), params.get('skew_threshold'))
+        if settings != (method, None if cols is None else list(cols), float(skew_threshold)):
+            params = None
+
+    if params is None:
+        params = fit_power_transform(train, cols, method=method,
+                                     skew_threshold=skew_threshold, n_jobs=n_jobs)
+        if cache_path is not None:
+            save_power_transform(params, cache_path)
+
+    train = apply_power_transform(train, params)
+    test = apply_power_transform(test, params)
+
+    return train, test, params
@@ -18,79 +18,168 @@
     
     # エンコーディング
     train, test, encoders = label_encode_categorical(train, test, categorical_cols)
+
+モジュールは属性に初めてアクセスしたときに読み込まれる（遅延インポート）。
+例えば `from features import create_all_statistical_features` では
+statistical.py（NumPy / pandas）のみが読み込まれ、sklearn などは読み込まれない。
 """
+import importlib
+
+# サブモジュール名 → 公開する関数・クラス
+_SUBMODULE_EXPORTS = {
+    'base': [
+        'get_base_features',
+        'print_feature_summary',
+    ],
+    'statistical': [
+        'create_cholesterol_features',
+        'create_blood_pressure_features',
+        'create_lifestyle_features',
+        'create_age_features',
+        'create_bmi_features',
+        'create_all_statistical_features',
+    ],
+    'interaction': [
+        'create_high_importance_interactions',
+        'create_cholesterol_interactions',
+        'create_lifestyle_interactions',
+        'create_demographic_interactions',
+        'create_all_interaction_features',
+    ],
+    'encoding': [
+        'label_encode_categorical',
+        'ordinal_encode',
+        'target_encode',
+        'frequency_encode',
+        'frequency_encode_fast',
+        'cross_encode',
+        'fit_target_encoding_chunked',
+        'apply_target_encoding',
+    ],
+    'transform': [
+        'fit_quantile_transform',
+        'apply_quantile_transform',
+        'save_quantile_transform',
+        'load_quantile_transform',
+        'quantile_transform_features',
+    ],
+    'cluster': [
+        'CLUSTER_GROUPS',
+        'fit_cluster_features',
+        'apply_cluster_features',
+        'save_cluster_features',
+        'load_cluster_features',
+        'create_cluster_features',
+    ],
+    'knn': [
+        'create_knn_target_features',
+    ],
+    'imputation': [
+        'fit_imputer',
+        'apply_imputer',
+        'save_imputer',
+        'load_imputer',
+        'impute_missing',
+    ],
+    'sketch': [
+        'CountMinSketch',
+    ],
+    'selection': [
+        'get_feature_importance_from_models',
+        'select_features_by_importance',
+        'remove_highly_correlated_features',
+        'find_redundant_features',
+        'remove_redundant_features',
+        'select_features_combined',
+        'compare_feature_sets',
+        'compare_feature_sets_proxy',
+    ],
+    'drift': [
+        'compute_drift',
+        'run_adversarial_validation',
+        'get_drifted_features',
+    ],
+    'streaming': [
+        'RunningStats',
+        'GroupStats',
+        'fit_group_aggregations_chunked',
+        'apply_group_aggregations',
+    ],
+    'sparse': [
+        'one_hot_encode_sparse',
+        'hstack_features',
+    ],
+    'parallel': [
+        'apply_features_parallel',
+        'apply_features_parallel_train_test',
+    ],
+    'matrix': [
+        'FeatureMatrix',
+        'build_feature_matrix',
+        'as_model_input',
+    ],
+    'cv': [
+        'make_folds',
+        'stratified_subsample',
+        'build_fold_datasets',
+        'train_booster',
+        'lgb_cv',
+    ],
+    'tuning': [
+        'sample_params',
+        'successive_halving_search',
+    ],
+    'training': [
+        'load_model_config',
+        'run_training',
+    ],
+    'predict': [
+        'load_fold_models',
+        'predict_folds_batched',
+        'write_submission_streaming',
+    ],
+    'ensemble': [
+        'PredictionStore',
+        'score_weight_candidates',
+        'optimize_blend_weights',
+        'rank_average',
+        'fit_stacker',
+        'blend_from_store',
+    ],
+    'utils': [
+        'create_features_phase1',
+        'create_features_phase2',
+        'create_features_phase3',
+        'create_features_incremental',
+        'get_feature_list_by_phase',
+        'print_feature_summary_by_phase',
+        'measure_import_time',
+        'load_cached_params',
+        'save_cached_params',
+    ],
+}
+
+# 公開名 → サブモジュール名
+_EXPORT_TO_SUBMODULE = {
+    name: module
+    for module, names in _SUBMODULE_EXPORTS.items()
+    for name in names
+}
+
+__all__ = list(_EXPORT_TO_SUBMODULE)
+
+
+def __getattr__(name: str):
+    """公開名に初めてアクセスされたときに対応するサブモジュールを読み込む"""
+    module_name = _EXPORT_TO_SUBMODULE.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f'.{module_name}', __name__)
+    value = getattr(module, name)
+    # 次回以降は通常の属性として参照できるようにキャッシュ
+    globals()[name] = value
+    return value
 
-from .base import get_base_features, print_feature_summary
-from .statistical import (
-    create_cholesterol_features,
-    create_blood_pressure_features,
-    create_lifestyle_features,
-    create_age_features,
-    create_bmi_features,
-    create_all_statistical_features
-)
-from .interaction import (
-    create_high_importance_interactions,
-    create_cholesterol_interactions,
-    create_lifestyle_interactions,
-    create_demographic_interactions,
-    create_all_interaction_features
-)
-from .encoding import (
-    label_encode_categorical,
-    ordinal_encode,
-    target_encode,
-    frequency_encode
-)
-from .selection import (
-    get_feature_importance_from_models,
-    select_features_by_importance,
-    remove_highly_correlated_features,
-    select_features_combined,
-    compare_feature_sets
-)
-from .utils import (
-    create_features_phase1,
-    create_features_phase2,
-    create_features_phase3,
-    create_features_incremental,
-    get_feature_list_by_phase,
-    print_feature_summary_by_phase
-)
 
-__all__ = [
-    # base
-    'get_base_features',
-    'print_feature_summary',
-    # statistical
-    'create_cholesterol_features',
-    'create_blood_pressure_features',
-    'create_lifestyle_features',
-    'create_age_features',
-    'create_bmi_features',
-    'create_all_statistical_features',
-    # interaction
-    'create_high_importance_interactions',
-    'create_cholesterol_interactions',
-    'create_lifestyle_interactions',
-    'create_demographic_interactions',
-    'create_all_interaction_features',
-    # encoding
-    'label_encode_categorical',
-    'ordinal_encode',
-    'target_encode',
-    'frequency_encode',
-    # selection
-    'get_feature_importance_from_models',
-    'select_features_by_importance',
-    'remove_highly_correlated_features',
-    'select_features_combined',
-    'compare_feature_sets',
-    # utils
-    'create_features_phase1',
-    'create_features_phase2',
-    'create_features_phase3',
-    'create_features_incremental',
-    'get_feature_list_by_phase',
-    'print_feature_summary_by_phase',
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,301 @@
+"""
+クラスタリング特徴量
+数値カラムのグループごとに標準化したミニバッチ k-means をチャンク単位で学習し、クラスタIDと重心までの距離を作成する
+"""
+import json
+import os
+import pandas as pd
+import numpy as np
+from typing import Dict, Iterable, List, Union
+
+from .streaming import RunningStats
+from .utils import load_cached_params, save_cached_params
+
+
+# statistical.py の特徴量グループに対応するデフォルトのカラム
+CLUSTER_GROUPS = {
+    'cholesterol': ['cholesterol_total', 'hdl_cholesterol', 'ldl_cholesterol'],
+    'blood_pressure': ['systolic_bp', 'diastolic_bp'],
+    'lifestyle': ['physical_activity_minutes_per_week', 'sleep_hours_per_day'],
+    'body': ['age', 'bmi'],
+}
+
+
+def _iter_chunks(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], chunk_size: int):
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        yield from data
+
+
+def _sq_distances(Z: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """(行数, クラスタ数) の二乗距離を行列積で一括計算"""
+    d = (Z ** 2).sum(axis=1, keepdims=True) - 2 * Z @ centers.T + (centers ** 2).sum(axis=1)
+    return np.maximum(d, 0)
+
+
+def _kmeans_plus_plus(Z: np.ndarray, n_clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ による初期重心"""
+    centers = [Z[rng.integers(len(Z))]]
+    closest = _sq_distances(Z, np.array(centers))[:, 0]
+    for _ in range(1, n_clusters):
+        total = closest.sum()
+        idx = rng.choice(len(Z), p=closest / total) if total > 0 else rng.integers(len(Z))
+        centers.append(Z[idx])
+        closest = np.minimum(closest, _sq_distances(Z, Z[idx][None, :])[:, 0])
+    return np.array(centers)
+
+
+def _init_centers(Z: np.ndarray, n_clusters: int, n_init: int, rng: np.random.Generator,
+                  n_iter: int = 20) -> np.ndarray:
+    """
+    サンプルに対して k-means++ + Lloyd 法を n_init 回実行し、慣性が最小の重心を返す
+    """
+    best, best_inertia = None, np.inf
+    for _ in range(n_init):
+        C = _kmeans_plus_plus(Z, n_clusters, rng)
+        for _ in range(n_iter):
+            labels = _sq_distances(Z, C).argmin(axis=1)
+            n = np.bincount(labels, minlength=n_clusters)
+            sums = np.zeros_like(C)
+            np.add.at(sums, labels, Z)
+            C = np.where(n[:, None] > 0, sums / np.maximum(n, 1)[:, None], C)
+        inertia = _sq_distances(Z, C).min(axis=1).sum()
+        if inertia < best_inertia:
+            best, best_inertia = C, inertia
+    return best
+
+
+def _standardize(X: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    """標準化（欠損は平均 = 0）"""
+    return np.nan_to_num((X - mean) / np.where(std > 0, std, 1.0))
+
+
+def fit_cluster_features(data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                         groups: Dict[str, List[str]] = None,
+                         n_clusters: int = 8,
+                         batch_size: int = 10_000,
+                         chunk_size: int = 200_000,
+                         n_init: int = 3,
+                         init_size: int = 30_000,
+                         seed: int = 42) -> Dict:
+    """
+    カラムグループごとのミニバッチ k-means をチャンク単位で学習（データは1回だけ読む）
+
+    各チャンクで RunningStats（平均・標準偏差）を更新し、その時点の統計量で標準化した
+    ミニバッチごとに重心を更新する（重心は元の単位で保持するため、統計量の更新後も有効）。
+    初期重心は最初のチャンクのサンプルに k-means++ + Lloyd 法を n_init 回実行して選ぶ。
+
+    Parameters:
+    -----------
+    data : pd.DataFrame or Iterable[pd.DataFrame]
+        訓練データ（train + test を結合したもの）、またはチャンクのイテレータ
+        （pd.read_csv(..., chunksize=...) など）
+    groups : Dict[str, List[str]], optional
+        グループ名 → カラムのリスト（デフォルト: CLUSTER_GROUPS のうち存在するカラム）
+    n_clusters : int
+        クラスタ数
+    batch_size : int
+        ミニバッチの行数
+    chunk_size : int
+        data が DataFrame の場合のチャンク行数
+    n_init : int
+        初期重心の試行回数
+    init_size : int
+        初期重心の選択に使う最初のチャンクの行数
+    seed : int
+        乱数シード
+
+    Returns:
+    --------
+    Dict : グループ名 → {'columns', 'mean', 'std', 'centers', 'counts'}（JSONで保存可能）
+    """
+    rng = np.random.default_rng(seed)
+    stats, centers, counts = {}, {}, {}
+
+    for chunk in _iter_chunks(data, chunk_size):
+        if groups is None:
+            groups = {name: [col for col in cols if col in chunk.columns]
+                      for name, cols in CLUSTER_GROUPS.items()}
+            groups = {name: cols for name, cols in groups.items() if cols}
+
+        for name, cols in groups.items():
+            X = chunk[cols].to_numpy(dtype=np.float64)
+            stats.setdefault(name, RunningStats(cols)).update(X)
+            mean, std = stats[name].mean, np.nan_to_num(stats[name].std)
+            Z = _standardize(X, mean, std)
+
+            if name not in centers:
+                init = _init_centers(Z[rng.permutation(len(Z))[:init_size]], n_clusters, n_init, rng)
+                centers[name] = mean + init * np.where(std > 0, std, 1.0)
+                counts[name] = np.zeros(n_clusters)
+
+            for start in range(0, len(Z), batch_size):
+                batch = Z[start:start + batch_size]
+                scale = np.where(std > 0, std, 1.0)
+                C = (centers[name] - mean) / scale
+                labels = _sq_distances(batch, C).argmin(axis=1)
+
+                # クラスタごとのバッチ平均に向けて、学習率 1 / 累積件数 で重心を移動
+                n_batch = np.bincount(labels, minlength=n_clusters).astype(np.float64)
+                sums = np.zeros_like(C)
+                np.add.at(sums, labels, batch)
+                counts[name] += n_batch
+                hit = n_batch > 0
+                eta = n_batch[hit] / counts[name][hit]
+                C[hit] += eta[:, None] * (sums[hit] / n_batch[hit, None] - C[hit])
+                centers[name] = mean + C * scale
+
+    params = {}
+    for name, cols in groups.items():
+        params[name] = {
+            'columns': list(cols),
+            'mean': stats[name].mean.tolist(),
+            'std': np.nan_to_num(stats[name].std).tolist(),
+            'centers': centers[name].tolist(),
+            'counts': counts[name].tolist(),
+        }
+    return params
+
+
+def apply_cluster_features(df: pd.DataFrame, params: Dict,
+                           chunk_size: int = 500_000,
+                           all_distances: bool = False) -> pd.DataFrame:
+    """
+    学習済みの重心でクラスタIDと距離を作成（行チャンクごとに行列積で一括計算）
+
+    作成する特徴量:
+        {group}_cluster      : 最も近いクラスタのID
+        {group}_cluster_dist : 最も近い重心までの距離（標準化した空間）
+        {group}_dist_{k}     : 各重心までの距離（all_distances=True の場合）
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    params : Dict
+        fit_cluster_features() の戻り値
+    chunk_size : int
+        1回に処理する行数（メモリ使用量は chunk_size × クラスタ数 に比例）
+    all_distances : bool
+        すべての重心までの距離を作成するか
+
+    Returns:
+    --------
+    pd.DataFrame : 特徴量を追加したデータフレーム
+    """
+    df = df.copy()
+    new_cols = {}
+
+    for name, group in params.items():
+        mean = np.asarray(group['mean'])
+        std = np.asarray(group['std'])
+        scale = np.where(std > 0, std, 1.0)
+        C = (np.asarray(group['centers']) - mean) / scale
+        X = df[group['columns']].to_numpy(dtype=np.float64)
+
+        labels = np.empty(len(df), dtype=np.int32)
+        nearest = np.empty(len(df), dtype=np.float32)
+        distances = np.empty((len(df), len(C)), dtype=np.float32) if all_distances else None
+        for start in range(0, len(df), chunk_size):
+            stop = min(start + chunk_size, len(df))
+            d = np.sqrt(_sq_distances(_standardize(X[start:stop], mean, std), C))
+            labels[start:stop] = d.argmin(axis=1)
+            nearest[start:stop] = d.min(axis=1)
+            if all_distances:
+                distances[start:stop] = d
+
+        new_cols[f'{name}_cluster'] = labels
+        new_cols[f'{name}_cluster_dist'] = nearest
+        if all_distances:
+            for k in range(len(C)):
+                new_cols[f'{name}_dist_{k}'] = distances[:, k]
+
+    for col, values in new_cols.items():
+        df[col] = values
+    return df
+
+
+def save_cluster_features(params: Dict, path: str) -> None:
+    """
+    学習済みの重心をJSONに保存
+
+    Parameters:
+    -----------
+    params : Dict
+        fit_cluster_features() の戻り値
+    path : str
+        保存先のパス
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(params, f, indent=2, ensure_ascii=False)
+
+
+def load_cluster_features(path: str) -> Dict:
+    """
+    保存した重心を読み込む
+
+    Parameters:
+    -----------
+    path : str
+        save_cluster_features() で保存したJSONのパス
+
+    Returns:
+    --------
+    Dict : fit_cluster_features() と同じ形式のパラメータ
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def create_cluster_features(train: pd.DataFrame, test: pd.DataFrame,
+                            groups: Dict[str, List[str]] = None,
+                            n_clusters: int = 8,
+                            all_distances: bool = False,
+                            seed: int = 42,
+                            cache_path: str = None) -> tuple:
+    """
+    訓練・テストデータを合わせて学習したクラスタリング特徴量を作成
+
+    cache_path が存在し、保存時の設定（groups・n_clusters・all_distances・seed）が引数と一致する場合は
+    学習済みの重心を読み込む。存在しない場合や設定が異なる場合は学習して保存する。
+    学習は目的変数を使わないため、訓練・テストデータを結合せずにチャンクとして順に渡す。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    groups : Dict[str, List[str]], optional
+        グループ名 → カラムのリスト（デフォルト: CLUSTER_GROUPS）
+    n_clusters : int
+        クラスタ数
+    all_distances : bool
+        すべての重心までの距離を作成するか
+    seed : int
+        乱数シード
+    cache_path : str, optional
+        重心のキャッシュ（設定と重心のJSON）のパス
+
+    Returns:
+    --------
+    tuple : (train, test, params)
+    """
+    settings = {'groups': groups, 'n_clusters': n_clusters, 'all_distances': all_distances, 'seed': seed}
+    params = load_cached_params(cache_path, settings)
+    if params is None:
+        chunk_size = 200_000
+        chunks = (frame.iloc[start:start + chunk_size]
+                  for frame in (train, test)
+                  for start in range(0, len(frame), chunk_size))
+        params = fit_cluster_features(chunks, groups, n_clusters=n_clusters, seed=seed)
+        if cache_path is not None:
+            save_cached_params(params, cache_path, settings)
+
+    train = apply_cluster_features(train, params, all_distances=all_distances)
+    test = apply_cluster_features(test, params, all_distances=all_distances)
+
+    return train, test, params
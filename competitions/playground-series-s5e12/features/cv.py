@@ -0,0 +1,248 @@
+"""
+交差検証
+フォールドの作成、フォールドごとのLightGBM Datasetのキャッシュ、CVスコアの計算
+"""
+import threading
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Tuple
+
+from .matrix import FeatureMatrix
+
+
+# LightGBM Dataset / Booster の作成は Python 側の状態を変更するため、スレッド間で直列化する
+_LGB_LOCK = threading.Lock()
+
+# 指標名 → 大きいほど良いか
+_HIGHER_IS_BETTER = {
+    'auc': True,
+    'binary_logloss': False,
+    'binary_error': False,
+    'rmse': False,
+    'l2': False,
+}
+
+
+def make_folds(y, n_folds: int = 5, seed: int = 42, stratified: bool = True) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    フォールドのインデックスを作成
+
+    Parameters:
+    -----------
+    y : array-like
+        目的変数
+    n_folds : int
+        分割数
+    seed : int
+        乱数シード
+    stratified : bool
+        True: StratifiedKFold、False: KFold
+
+    Returns:
+    --------
+    List[Tuple[np.ndarray, np.ndarray]] : (trn_idx, val_idx) のリスト
+    """
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    y = np.asarray(y)
+    splitter = (StratifiedKFold if stratified else KFold)(n_splits=n_folds, shuffle=True, random_state=seed)
+    return [(trn_idx, val_idx) for trn_idx, val_idx in splitter.split(np.zeros(len(y)), y)]
+
+
+def stratified_subsample(y, n_rows: int = None, seed: int = 42, n_bins: int = 10) -> np.ndarray:
+    """
+    目的変数の分布を保った行の部分集合（同じ seed なら小さいサイズは大きいサイズに含まれる）
+
+    Parameters:
+    -----------
+    y : array-like
+        目的変数（連続値の場合は分位ビンで層化）
+    n_rows : int, optional
+        行数（None: 全行）
+    seed : int
+        乱数シード
+    n_bins : int
+        連続値の目的変数を層化するビンの数
+
+    Returns:
+    --------
+    np.ndarray : 行番号（昇順）
+    """
+    y = np.asarray(y)
+    if n_rows is None or n_rows >= len(y):
+        return np.arange(len(y))
+
+    if np.issubdtype(y.dtype, np.floating) and len(np.unique(y)) > n_bins:
+        edges = np.quantile(y, np.linspace(0, 1, n_bins + 1)[1:-1])
+        strata = np.searchsorted(edges, y, side='right')
+    else:
+        strata = pd.factorize(y)[0]
+
+    rng = np.random.default_rng(seed)
+    selected = []
+    for stratum in np.unique(strata):
+        members = np.flatnonzero(strata == stratum)
+        # 各層の並びをシードで固定し、先頭から比例配分した数を取る（サイズ間で入れ子になる）
+        members = members[rng.permutation(len(members))]
+        n_take = int(round(n_rows * len(members) / len(y)))
+        selected.append(members[:n_take])
+    return np.sort(np.concatenate(selected))
+
+
+def build_fold_datasets(X, y, folds: List[Tuple[np.ndarray, np.ndarray]],
+                        dataset_params: Dict = None,
+                        categorical_feature='auto') -> List[Tuple]:
+    """
+    フォールドごとのLightGBM Dataset（ビン分け済み）を一度だけ作成
+
+    各フォールドの学習用Datasetを作成・construct() し、検証用はそれを reference にして
+    同じビン境界で作成する。作成したDatasetは試行間で再利用できる
+    （ビン分けに関わるパラメータ max_bin などは dataset_params で固定する）。
+    試行ごとに min_data_in_leaf を変えられるよう feature_pre_filter は False にする。
+
+    Parameters:
+    -----------
+    X : pd.DataFrame, np.ndarray or FeatureMatrix
+        特徴量
+    y : array-like
+        目的変数
+    folds : List[Tuple[np.ndarray, np.ndarray]]
+        make_folds() の戻り値
+    dataset_params : Dict, optional
+        Datasetのパラメータ（例: {'max_bin': 255}）
+    categorical_feature : list or 'auto'
+        カテゴリ変数
+
+    Returns:
+    --------
+    List[Tuple[lgb.Dataset, lgb.Dataset]] : (学習用, 検証用) のリスト
+    """
+    import lightgbm as lgb
+
+    # feature_pre_filter=True だと既定の min_data_in_leaf=20 で分割できない特徴量が Dataset から除かれ、
+    # それより小さい min_data_in_leaf / min_child_samples の試行でも使えなくなるため無効にする
+    params = {'verbosity': -1, 'feature_pre_filter': False}
+    params.update(dataset_params or {})
+    y = np.asarray(y)
+    if isinstance(X, FeatureMatrix):
+        X = X.values
+
+    def take(idx):
+        return X.iloc[idx] if isinstance(X, pd.DataFrame) else X[idx]
+
+    fold_datasets = []
+    for trn_idx, val_idx in folds:
+        with _LGB_LOCK:
+            dtrain = lgb.Dataset(take(trn_idx), y[trn_idx], params=params,
+                                 categorical_feature=categorical_feature, free_raw_data=False)
+            dtrain.construct()
+            dvalid = lgb.Dataset(take(val_idx), y[val_idx], reference=dtrain, params=params,
+                                 categorical_feature=categorical_feature, free_raw_data=False)
+            dvalid.construct()
+        fold_datasets.append((dtrain, dvalid))
+    return fold_datasets
+
+
+def train_booster(params: Dict, dtrain, dvalid,
+                  num_boost_round: int = 1000,
+                  early_stopping_rounds: int = 50,
+                  metric: str = 'auc') -> Tuple[object, float, int]:
+    """
+    作成済みのDatasetで1モデルを学習（早期終了付き）
+
+    Boosterの作成のみロックし、学習ループはロックの外で行うため、
+    複数スレッドから同じDatasetを共有して並列に学習できる。
+
+    Parameters:
+    -----------
+    params : Dict
+        LightGBMのパラメータ
+    dtrain, dvalid : lgb.Dataset
+        build_fold_datasets() で作成したDataset
+    num_boost_round : int
+        最大ブースティング回数
+    early_stopping_rounds : int
+        検証スコアが改善しない場合に打ち切る回数（0: 打ち切らない）
+    metric : str
+        評価指標（'auc', 'binary_logloss' など）
+
+    Returns:
+    --------
+    Tuple[lgb.Booster, float, int] : (モデル, 最良スコア, 最良のイテレーション)
+    """
+    import lightgbm as lgb
+
+    params = dict(params)
+    params.setdefault('objective', 'binary')
+    params['metric'] = metric
+    params.setdefault('verbosity', -1)
+    higher_is_better = _HIGHER_IS_BETTER.get(metric, False)
+
+    with _LGB_LOCK:
+        booster = lgb.Booster(params=params, train_set=dtrain)
+        booster.add_valid(dvalid, 'valid')
+
+    best_score = -np.inf if higher_is_better else np.inf
+    best_iteration = 0
+    for iteration in range(1, num_boost_round + 1):
+        booster.update()
+        score = booster.eval_valid()[0][2]
+        improved = score > best_score if higher_is_better else score < best_score
+        if improved:
+            best_score, best_iteration = score, iteration
+        elif early_stopping_rounds and iteration - best_iteration >= early_stopping_rounds:
+            break
+
+    booster.best_iteration = best_iteration
+    return booster, float(best_score), best_iteration
+
+
+def lgb_cv(X, y, params: Dict = None,
+           n_folds: int = 5,
+           seed: int = 42,
+           num_boost_round: int = 1000,
+           early_stopping_rounds: int = 50,
+           metric: str = 'auc',
+           fold_datasets: List[Tuple] = None) -> List[float]:
+    """
+    LightGBMの交差検証スコア（compare_feature_sets() の cv_func として使える）
+
+    Parameters:
+    -----------
+    X : pd.DataFrame or np.ndarray
+        特徴量
+    y : array-like
+        目的変数
+    params : Dict, optional
+        LightGBMのパラメータ
+    n_folds : int
+        分割数
+    seed : int
+        乱数シード
+    num_boost_round : int
+        最大ブースティング回数
+    early_stopping_rounds : int
+        早期終了の回数
+    metric : str
+        評価指標
+    fold_datasets : List[Tuple], optional
+        build_fold_datasets() で作成済みのDataset（指定した場合は再作成しない）
+
+    Returns:
+    --------
+    List[float] : フォールドごとのスコア
+    """
+    if fold_datasets is None:
+        folds = make_folds(y, n_folds=n_folds, seed=seed)
+        fold_datasets = build_fold_datasets(X, y, folds)
+
+    params = dict(params or {})
+    params.setdefault('learning_rate', 0.05)
+    params.setdefault('random_state', seed)
+
+    scores = []
+    for dtrain, dvalid in fold_datasets:
+        _, score, _ = train_booster(params, dtrain, dvalid, num_boost_round=num_boost_round,
+                                    early_stopping_rounds=early_stopping_rounds, metric=metric)
+        scores.append(score)
+    return scores
@@ -0,0 +1,238 @@
+"""
+訓練データとテストデータの分布のずれ（ドリフト）検出
+全カラムのPSI・KS統計量を共通のヒストグラムから一括計算し、Adversarial Validationも実行する
+"""
+import pandas as pd
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List
+
+
+def _quantile_edges(sample: np.ndarray, n_bins: int) -> np.ndarray:
+    """
+    全カラムの分位点境界を1回のソートで計算（欠損は除外）
+
+    戻り値は (n_bins - 1, カラム数)。すべて欠損のカラムの境界は inf。
+    """
+    sorted_sample = np.sort(sample, axis=0)  # NaNは末尾に並ぶ
+    n_valid = (~np.isnan(sample)).sum(axis=0)
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    idx = np.floor(quantiles[:, None] * np.maximum(n_valid - 1, 0)[None, :]).astype(np.int64)
+    edges = np.take_along_axis(sorted_sample, idx, axis=0)
+    edges[:, n_valid == 0] = np.inf
+    return edges
+
+
+def _bin_counts(X: np.ndarray, edges: np.ndarray, chunk_rows: int) -> np.ndarray:
+    """
+    (行数, カラム数) の配列を、カラムごとの境界 edges (n_edges, カラム数) でビン分けして件数を数える
+
+    戻り値は (カラム数, n_edges + 2)。ビン番号は値より小さい境界の数、最後のビンは欠損値。
+    チャンクをカラムごとにソートし、境界の位置を np.searchsorted で求めて隣り合う位置の差を件数にする
+    （計算量は行数 × カラム数 × log(行数) で、境界の数に依存しない）。
+    """
+    n_edges, n_cols = edges.shape
+    n_bins = n_edges + 2
+    counts = np.zeros((n_cols, n_bins), dtype=np.int64)
+
+    for start in range(0, len(X), chunk_rows):
+        chunk = np.sort(X[start:start + chunk_rows], axis=0)  # NaNは末尾に並ぶ
+        n_valid = (~np.isnan(chunk)).sum(axis=0)
+        for j in range(n_cols):
+            # 境界以下の値の件数（累積）→ 隣り合う差がビンごとの件数
+            at_most = np.searchsorted(chunk[:n_valid[j], j], edges[:, j], side='right')
+            counts[j, :n_edges + 1] += np.diff(at_most, prepend=0, append=n_valid[j])
+        counts[:, -1] += len(chunk) - n_valid
+
+    return counts
+
+
+def compute_drift(train: pd.DataFrame, test: pd.DataFrame,
+                  cols: List[str] = None,
+                  n_bins: int = 20,
+                  sample_size: int = 100_000,
+                  chunk_rows: int = 20_000,
+                  seed: int = 42) -> pd.DataFrame:
+    """
+    全カラムのPSIとKS統計量を一括計算
+
+    ビン境界は訓練データの分位点（全カラムを1回のソートで計算）を使い、
+    PSIとKS（ビン境界上の累積分布の最大差）を同じヒストグラムから求める。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str], optional
+        対象カラム（デフォルト: 共通の数値カラム）
+    n_bins : int
+        分位点ビンの数
+    sample_size : int, optional
+        ビン境界の計算に使う訓練データの行数（None: 全行）
+    chunk_rows : int
+        一度に処理する行数（メモリ使用量は chunk_rows × カラム数 に比例）
+    seed : int
+        サンプリングのシード
+
+    Returns:
+    --------
+    pd.DataFrame : カラムごとの 'psi', 'ks', 'train_nan_rate', 'test_nan_rate'（PSIの降順）
+    """
+    if cols is None:
+        cols = [col for col in train.select_dtypes(include=[np.number]).columns if col in test.columns]
+
+    X_train = train[cols].to_numpy(dtype=np.float32)
+    X_test = test[cols].to_numpy(dtype=np.float32)
+
+    sample = X_train
+    if sample_size is not None and len(X_train) > sample_size:
+        rng = np.random.default_rng(seed)
+        sample = X_train[rng.choice(len(X_train), sample_size, replace=False)]
+
+    edges = _quantile_edges(sample, n_bins)
+
+    counts_train = _bin_counts(X_train, edges, chunk_rows)
+    counts_test = _bin_counts(X_test, edges, chunk_rows)
+
+    eps = 1e-6
+    p_train = counts_train / max(len(X_train), 1)
+    p_test = counts_test / max(len(X_test), 1)
+    psi = ((p_test - p_train) * np.log((p_test + eps) / (p_train + eps))).sum(axis=1)
+
+    # KSは欠損以外の分布で比較
+    value_train = counts_train[:, :-1]
+    value_test = counts_test[:, :-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cdf_train = np.cumsum(value_train, axis=1) / value_train.sum(axis=1, keepdims=True)
+        cdf_test = np.cumsum(value_test, axis=1) / value_test.sum(axis=1, keepdims=True)
+    ks = np.nan_to_num(np.abs(cdf_train - cdf_test)).max(axis=1)
+
+    report = pd.DataFrame({
+        'psi': psi,
+        'ks': ks,
+        'train_nan_rate': p_train[:, -1],
+        'test_nan_rate': p_test[:, -1],
+    }, index=cols)
+
+    return report.sort_values('psi', ascending=False)
+
+
+def _adversarial_validation(train: pd.DataFrame, test: pd.DataFrame, cols: List[str],
+                            sample_size: int, n_folds: int, params: Dict, seed: int) -> Dict:
+    import lightgbm as lgb
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+
+    n_train = min(len(train), sample_size)
+    n_test = min(len(test), sample_size)
+    X = pd.concat([
+        train[cols].sample(n=n_train, random_state=seed),
+        test[cols].sample(n=n_test, random_state=seed),
+    ], axis=0, ignore_index=True)
+    y = np.r_[np.zeros(n_train), np.ones(n_test)]
+
+    lgb_params = {
+        'objective': 'binary', 'learning_rate': 0.1, 'num_leaves': 31,
+        'colsample_bytree': 0.7, 'verbosity': -1, 'random_state': seed,
+    }
+    lgb_params.update(params or {})
+
+    oof = np.zeros(len(X))
+    importance = np.zeros(len(cols))
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for trn_idx, val_idx in skf.split(X, y):
+        booster = lgb.train(lgb_params, lgb.Dataset(X.iloc[trn_idx], y[trn_idx]), num_boost_round=200)
+        oof[val_idx] = booster.predict(X.iloc[val_idx])
+        importance += booster.feature_importance(importance_type='gain') / n_folds
+
+    return {
+        'auc': float(roc_auc_score(y, oof)),
+        'importance': pd.DataFrame({'feature': cols, 'importance': importance})
+                        .sort_values('importance', ascending=False).reset_index(drop=True),
+    }
+
+
+def run_adversarial_validation(train: pd.DataFrame, test: pd.DataFrame,
+                               cols: List[str],
+                               sample_size: int = 50_000,
+                               n_folds: int = 3,
+                               params: Dict = None,
+                               background: bool = True,
+                               seed: int = 42):
+    """
+    訓練データかテストデータかを判別するLightGBMで分布のずれを評価（Adversarial Validation）
+
+    AUCが0.5に近いほど分布が近い。background=True の場合はバックグラウンドのスレッドで
+    実行して Future を返す（LightGBMの学習中はGILが解放されるため、他の処理と並行できる）。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str]
+        使用する特徴量
+    sample_size : int
+        訓練・テストそれぞれからサンプリングする行数
+    n_folds : int
+        交差検証の分割数
+    params : Dict, optional
+        LightGBMのパラメータ（デフォルト値を上書き）
+    background : bool
+        True: Future を返す、False: 結果を返す
+    seed : int
+        乱数シード
+
+    Returns:
+    --------
+    Dict or Future : {'auc': AUC, 'importance': 特徴量ごとの判別への寄与}
+    """
+    args = (train, test, cols, sample_size, n_folds, params, seed)
+    if not background:
+        return _adversarial_validation(*args)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(_adversarial_validation, *args)
+    executor.shutdown(wait=False)
+    return future
+
+
+def get_drifted_features(drift_report: pd.DataFrame,
+                         psi_threshold: float = 0.2,
+                         ks_threshold: float = 0.1,
+                         adversarial_result=None,
+                         adversarial_top_k: int = 0) -> List[str]:
+    """
+    ドリフトの大きい特徴量のリストを返す（select_features_combined() の drop_features に渡す）
+
+    Parameters:
+    -----------
+    drift_report : pd.DataFrame
+        compute_drift() の戻り値
+    psi_threshold : float
+        PSIがこの値以上のカラムを除外（0.2以上が一般的に「大きなずれ」）
+    ks_threshold : float
+        KS統計量がこの値以上のカラムを除外
+    adversarial_result : Dict or Future, optional
+        run_adversarial_validation() の戻り値
+    adversarial_top_k : int
+        Adversarial Validationの重要度上位から除外する数
+
+    Returns:
+    --------
+    List[str] : 除外する特徴量名のリスト
+    """
+    drifted = drift_report.index[
+        (drift_report['psi'] >= psi_threshold) | (drift_report['ks'] >= ks_threshold)
+    ].tolist()
+
+    if adversarial_result is not None and adversarial_top_k > 0:
+        if isinstance(adversarial_result, Future):
+            adversarial_result = adversarial_result.result()
+        top = adversarial_result['importance'].head(adversarial_top_k)['feature'].tolist()
+        drifted.extend(col for col in top if col not in drifted)
+
+    return drifted
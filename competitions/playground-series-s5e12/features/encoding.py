@@ -4,7 +4,6 @@
 """
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 from typing import Dict, List
 
 
@@ -27,6 +26,9 @@ def label_encode_categorical(train: pd.DataFrame, test: pd.DataFrame,
     tuple : (train, test, label_encoders)
         label_encoders: 各カラムのLabelEncoderの辞書
     """
+    # sklearnは読み込みが重いため、使うときだけインポートする
+    from sklearn.preprocessing import LabelEncoder
+    
     train = train.copy()
     test = test.copy()
     label_encoders = {}
@@ -167,3 +169,235 @@ def frequency_encode(train: pd.DataFrame, test: pd.DataFrame,
         test[f'{col}_frequency'] = test[col].map(frequency_map)
     
     return train, test, frequency_maps
+
+
+def frequency_encode_fast(train: pd.DataFrame, test: pd.DataFrame,
+                          categorical_cols: List[str],
+                          exact: bool = True,
+                          epsilon: float = 1e-4,
+                          delta: float = 1e-3,
+                          chunk_size: int = None) -> tuple:
+    """
+    高カーディナリティ向けの高速な頻度エンコーディング
+    
+    exact=True の場合は整数コードに対する np.unique(return_counts=True) で正確な頻度を計算し、
+    exact=False の場合は Count-Min Sketch で近似頻度を計算する（メモリはカテゴリ数に依存しない）。
+    
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    categorical_cols : List[str]
+        エンコーディングするカテゴリ変数のリスト
+    exact : bool
+        True: 正確な頻度、False: Count-Min Sketchによる近似頻度
+    epsilon : float
+        近似モードの相対誤差上限（総件数に対する割合）
+    delta : float
+        近似モードで誤差上限を超える確率
+    chunk_size : int, optional
+        近似モードでスケッチをストリーミング更新する際のチャンク行数
+    
+    Returns:
+    --------
+    tuple : (train, test, frequency_models)
+        frequency_models: exact=True の場合は各カラムの頻度Series（値→件数）、
+                          exact=False の場合は各カラムの CountMinSketch
+    """
+    from .sketch import CountMinSketch
+    
+    train = train.copy()
+    test = test.copy()
+    frequency_models = {}
+    n_train = len(train)
+    
+    for col in categorical_cols:
+        if col not in train.columns:
+            continue
+        
+        combined = pd.concat([train[col], test[col]], axis=0, ignore_index=True)
+        
+        if exact:
+            # 整数コード化して一括カウント（欠損は -1）
+            codes, uniques = pd.factorize(combined)
+            valid = codes >= 0
+            _, inverse, counts = np.unique(codes[valid], return_inverse=True, return_counts=True)
+            frequency = np.full(len(codes), np.nan)
+            frequency[valid] = counts[inverse]
+            # factorizeのコードは 0..k-1 の連番なので counts は uniques と同じ順序
+            frequency_models[col] = pd.Series(counts, index=uniques)
+        else:
+            sketch = CountMinSketch.from_error(epsilon=epsilon, delta=delta)
+            values = combined.to_numpy()
+            step = chunk_size or len(values)
+            for start in range(0, len(values), max(step, 1)):
+                sketch.update(values[start:start + step])
+            frequency = sketch.query(values)
+            frequency_models[col] = sketch
+        
+        train[f'{col}_frequency'] = frequency[:n_train]
+        test[f'{col}_frequency'] = frequency[n_train:]
+    
+    return train, test, frequency_models
+
+
+def cross_encode(train: pd.DataFrame, test: pd.DataFrame,
+                 cross_cols: List[tuple],
+                 n_buckets: int = None,
+                 seed: int = 0) -> tuple:
+    """
+    カテゴリ変数の組み合わせ（クロス特徴量）を1つのint64キーにエンコーディング
+    
+    各カラムを訓練・テスト共通の整数コードに変換し、混合基数
+    （key = c1 * n2 * n3 + c2 * n3 + c3）で文字列結合なしに一意なキーを作成する。
+    n_buckets を指定するとキーをハッシュして固定数のバケットに丸める
+    （組み合わせ数が int64 に収まらない場合は n_buckets が必須で、各カラムのコードを順にハッシュする）。
+    作成したカラムはそのまま frequency_encode_fast() や target_encode() に渡せる。
+    
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cross_cols : List[tuple]
+        組み合わせるカラムのタプルのリスト（2〜3カラム）
+        例: [('gender', 'ethnicity'), ('employment_status', 'income_level')]
+    n_buckets : int, optional
+        ハッシュバケット数（None の場合はハッシュせず一意なキーを使用）
+    seed : int
+        ハッシュのシード
+    
+    Returns:
+    --------
+    tuple : (train, test, cross_info)
+        cross_info: 作成したカラム名ごとの {'cols': 元カラム, 'cardinalities': 各カラムのカテゴリ数}
+        （欠損を含む組み合わせのキーは -1）
+    """
+    from .sketch import mix_hash
+    
+    train = train.copy()
+    test = test.copy()
+    cross_info = {}
+    n_train = len(train)
+    
+    for cols in cross_cols:
+        cols = tuple(cols)
+        if not 2 <= len(cols) <= 3:
+            raise ValueError(f'cross_cols の各要素は2〜3カラムで指定してください: {cols}')
+        if not all(col in train.columns and col in test.columns for col in cols):
+            continue
+        
+        new_col = '_x_'.join(cols)
+        all_codes = []
+        cardinalities = []
+        for col in cols:
+            combined = pd.concat([train[col], test[col]], axis=0, ignore_index=True)
+            codes, uniques = pd.factorize(combined)
+            all_codes.append(codes)
+            cardinalities.append(len(uniques))
+        missing = np.any([codes < 0 for codes in all_codes], axis=0)
+        
+        # 混合基数のキーが int64 に収まるかを、キーを計算する前に確認する
+        n_keys = int(np.prod([max(c, 1) for c in cardinalities], dtype=object))
+        if n_keys < 2 ** 63:
+            key = np.zeros(n_train + len(test), dtype=np.int64)
+            for codes, cardinality in zip(all_codes, cardinalities):
+                key = key * max(cardinality, 1) + codes
+            if n_buckets is not None:
+                key = (mix_hash(key.astype(np.uint64), seed) % np.uint64(n_buckets)).astype(np.int64)
+        elif n_buckets is None:
+            raise ValueError(f'{new_col}: 組み合わせ数が多すぎます。n_buckets を指定してください')
+        else:
+            # int64 に収まらない場合は各カラムのコードを順にハッシュへ混合する
+            h = np.zeros(n_train + len(test), dtype=np.uint64)
+            for codes in all_codes:
+                h = mix_hash(h ^ codes.astype(np.uint64), seed)
+            key = (h % np.uint64(n_buckets)).astype(np.int64)
+        key[missing] = -1
+        
+        train[new_col] = key[:n_train]
+        test[new_col] = key[n_train:]
+        cross_info[new_col] = {'cols': cols, 'cardinalities': cardinalities}
+    
+    return train, test, cross_info
+
+
+def fit_target_encoding_chunked(chunks, categorical_cols: List[str], target_col: str,
+                                smoothing: float = 1.0, n_jobs: int = 1) -> tuple:
+    """
+    チャンクのイテレータから Target Encoding のマップをストリーミングで計算
+    
+    target_encode() と同じスムージング式を、全データをメモリに載せずに適用する。
+    
+    Parameters:
+    -----------
+    chunks : Iterable[pd.DataFrame]
+        訓練データのチャンク（pd.read_csv(..., chunksize=...) など）
+    categorical_cols : List[str]
+        エンコーディングするカテゴリ変数のリスト
+    target_col : str
+        目的変数のカラム名
+    smoothing : float
+        スムージングパラメータ（デフォルト: 1.0）
+    n_jobs : int
+        チャンク集計の並列スレッド数
+    
+    Returns:
+    --------
+    tuple : (encoding_maps, global_mean)
+        encoding_maps: 各カラムのエンコーディングマップの辞書（target_encode() と同じ形式）
+    """
+    from .streaming import RunningStats, fit_group_aggregations_chunked
+    
+    # 全体平均はカテゴリの欠損に関係なく目的変数全体から計算する
+    target_stats = RunningStats([target_col])
+    
+    def track_target(chunks):
+        for chunk in chunks:
+            target_stats.update(chunk[[target_col]])
+            yield chunk
+    
+    fitted = fit_group_aggregations_chunked(
+        track_target(chunks), categorical_cols, [target_col], compression=0, n_jobs=n_jobs
+    )
+    global_mean = float(target_stats.mean[0]) if target_stats.count is not None else np.nan
+    
+    encoding_maps = {}
+    for col in categorical_cols:
+        if (col, target_col) not in fitted:
+            continue
+        agg = fitted[(col, target_col)].result(['count', 'mean'])
+        encoding_map = (agg['count'] * agg['mean'] + smoothing * global_mean) / (agg['count'] + smoothing)
+        encoding_maps[col] = encoding_map.to_dict()
+    
+    return encoding_maps, global_mean
+
+
+def apply_target_encoding(df: pd.DataFrame, encoding_maps: Dict[str, dict],
+                          global_mean: float) -> pd.DataFrame:
+    """
+    Target Encoding のマップをデータ（チャンク）に適用
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    encoding_maps : Dict[str, dict]
+        target_encode() / fit_target_encoding_chunked() のエンコーディングマップ
+    global_mean : float
+        未知のカテゴリに使う値
+    
+    Returns:
+    --------
+    pd.DataFrame : '{col}_target_encoded' を追加したデータフレーム
+    """
+    df = df.copy()
+    
+    for col, encoding_map in encoding_maps.items():
+        if col in df.columns:
+            df[f'{col}_target_encoded'] = df[col].map(encoding_map).fillna(global_mean)
+    
+    return df
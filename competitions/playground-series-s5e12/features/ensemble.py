@@ -0,0 +1,378 @@
+"""
+アンサンブル（OOF予測の保存とブレンディング／スタッキング）
+実験ごとのOOF・テスト予測をメモリマップ可能な float32 配列で保存し、重みを高速に探索する
+"""
+import json
+import os
+import time
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Tuple
+
+
+class PredictionStore:
+    """
+    実験（run）ごとのOOF予測とテスト予測の保存先
+
+    {root}/{name}/oof.npy, test.npy（float32）と meta.json を保存し、
+    読み込み時は np.load(mmap_mode='r') でメモリマップする。
+
+    Parameters:
+    -----------
+    root : str
+        保存ディレクトリ（例: 'data/output/predictions'）
+    """
+
+    def __init__(self, root: str = 'data/output/predictions'):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, name: str, oof: np.ndarray, test: np.ndarray, metadata: Dict = None) -> None:
+        """
+        予測を保存（同名の run は上書き）
+
+        Parameters:
+        -----------
+        name : str
+            run 名（例: 'lgb_seed42'）
+        oof : np.ndarray
+            OOF予測（訓練データの行順）
+        test : np.ndarray
+            テスト予測
+        metadata : Dict, optional
+            CVスコア、パラメータ、特徴量リストなど（JSONに保存できる値）
+        """
+        run_dir = os.path.join(self.root, name)
+        os.makedirs(run_dir, exist_ok=True)
+        oof = np.ascontiguousarray(oof, dtype=np.float32)
+        test = np.ascontiguousarray(test, dtype=np.float32)
+        np.save(os.path.join(run_dir, 'oof.npy'), oof)
+        np.save(os.path.join(run_dir, 'test.npy'), test)
+
+        meta = dict(metadata or {})
+        meta.update({
+            'name': name,
+            'n_train': int(len(oof)),
+            'n_test': int(len(test)),
+            'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        with open(os.path.join(run_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False, default=str)
+
+    def names(self) -> List[str]:
+        """保存済みの run 名のリスト"""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, 'meta.json'))
+        )
+
+    def load(self, name: str, mmap: bool = True) -> Tuple[np.ndarray, np.ndarray, Dict]:
+        """
+        run の予測を読み込む
+
+        Parameters:
+        -----------
+        name : str
+            run 名
+        mmap : bool
+            True の場合はメモリマップ（読み取り専用）で読み込む
+
+        Returns:
+        --------
+        Tuple[np.ndarray, np.ndarray, Dict] : (oof, test, metadata)
+        """
+        run_dir = os.path.join(self.root, name)
+        mmap_mode = 'r' if mmap else None
+        oof = np.load(os.path.join(run_dir, 'oof.npy'), mmap_mode=mmap_mode)
+        test = np.load(os.path.join(run_dir, 'test.npy'), mmap_mode=mmap_mode)
+        with open(os.path.join(run_dir, 'meta.json')) as f:
+            metadata = json.load(f)
+        return oof, test, metadata
+
+    def load_matrix(self, names: List[str] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        複数 run の予測を (行数, run数) の float32 行列にまとめる
+
+        Parameters:
+        -----------
+        names : List[str], optional
+            run 名のリスト（デフォルト: すべて）
+
+        Returns:
+        --------
+        Tuple[np.ndarray, np.ndarray, List[str]] : (OOF行列, テスト行列, run 名)
+        """
+        names = self.names() if names is None else list(names)
+        if not names:
+            raise ValueError('保存済みの予測がありません')
+
+        first_oof, first_test, _ = self.load(names[0])
+        oof_matrix = np.empty((len(first_oof), len(names)), dtype=np.float32)
+        test_matrix = np.empty((len(first_test), len(names)), dtype=np.float32)
+        for j, name in enumerate(names):
+            oof, test, _ = self.load(name)
+            oof_matrix[:, j] = oof
+            test_matrix[:, j] = test
+        return oof_matrix, test_matrix, names
+
+    def summary(self) -> pd.DataFrame:
+        """保存済み run のメタデータ一覧"""
+        rows = [self.load(name)[2] for name in self.names()]
+        return pd.DataFrame(rows)
+
+
+def _log_loss_batch(y: np.ndarray, P: np.ndarray, eps: float = 1e-7) -> np.ndarray:
+    """(行数, 候補数) の予測行列に対する各候補の log loss（行方向の和は float64 で計算）"""
+    P = np.clip(P, eps, 1 - eps)
+    losses = np.where(y[:, None] > 0, np.log(P), np.log1p(-P))
+    # float32 のまま数十万行を足すと近い候補の差が丸め誤差に埋もれるため、累積は float64 で行う
+    return -losses.sum(axis=0, dtype=np.float64) / len(y)
+
+
+def _auc_batch(y: np.ndarray, P: np.ndarray) -> np.ndarray:
+    """(行数, 候補数) の予測行列に対する各候補の AUC（順位和による計算、同順位は平均順位）"""
+    n = len(y)
+    n_pos = float(y.sum())
+    n_neg = n - n_pos
+    order = np.argsort(P, axis=0, kind='stable')
+    sorted_P = np.take_along_axis(P, order, axis=0)
+
+    # 同じ値が続く区間の先頭・末尾の位置から平均順位を求める
+    position = np.arange(n, dtype=np.int32)[:, None]
+    changed = sorted_P[1:] != sorted_P[:-1]
+    del sorted_P
+    edge = np.ones((1, P.shape[1]), dtype=bool)
+    first = np.maximum.accumulate(np.where(np.vstack([edge, changed]), position, 0), axis=0)
+    last = np.minimum.accumulate(np.where(np.vstack([changed, edge]), position, n)[::-1], axis=0)[::-1]
+    del changed
+
+    ranks = np.empty(P.shape, dtype=np.float64)
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=0)
+    return (y @ ranks - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def score_weight_candidates(oof_matrix: np.ndarray, y: np.ndarray, weights: np.ndarray,
+                            metric: str = 'log_loss', max_elements: int = 50_000_000) -> np.ndarray:
+    """
+    重み候補をまとめてスコアリング
+
+    候補 (k, run数) に対して P = OOF @ W.T を1回の行列積で計算する。
+    メモリを抑えるため、行数 × 候補数が max_elements 以下になるよう候補を分割する。
+
+    Parameters:
+    -----------
+    oof_matrix : np.ndarray
+        (行数, run数) のOOF予測
+    y : np.ndarray
+        目的変数（0/1）
+    weights : np.ndarray
+        (候補数, run数) の重み
+    metric : str
+        'log_loss'（小さいほど良い）または 'auc'（大きいほど良い）
+    max_elements : int
+        1回に計算する予測行列の要素数の上限
+
+    Returns:
+    --------
+    np.ndarray : 各候補のスコア
+    """
+    if metric not in ('log_loss', 'auc'):
+        raise ValueError(f"metric は 'log_loss' または 'auc' を指定してください: {metric}")
+
+    y = np.asarray(y, dtype=np.float32)
+    weights = np.asarray(weights, dtype=np.float32)
+    batch = max(1, max_elements // max(len(y), 1))
+    scores = np.empty(len(weights))
+    for start in range(0, len(weights), batch):
+        P = oof_matrix @ weights[start:start + batch].T
+        if metric == 'log_loss':
+            scores[start:start + batch] = _log_loss_batch(y, P)
+        else:
+            scores[start:start + batch] = _auc_batch(y, P)
+    return scores
+
+
+def optimize_blend_weights(oof_matrix: np.ndarray, y: np.ndarray,
+                           metric: str = 'log_loss',
+                           n_candidates: int = 500,
+                           n_rounds: int = 5,
+                           seed: int = 42) -> Tuple[np.ndarray, float]:
+    """
+    OOF予測のブレンド重み（非負、合計1）をランダム探索 + 局所探索で最適化
+
+    各ラウンドで n_candidates 個の重みを Dirichlet 分布からサンプリングし、
+    score_weight_candidates() で一括評価する。2ラウンド目以降は最良の重みの近傍を探索する。
+
+    Parameters:
+    -----------
+    oof_matrix : np.ndarray
+        (行数, run数) のOOF予測
+    y : np.ndarray
+        目的変数（0/1）
+    metric : str
+        'log_loss' または 'auc'
+    n_candidates : int
+        1ラウンドあたりの候補数
+    n_rounds : int
+        探索ラウンド数
+    seed : int
+        乱数シード
+
+    Returns:
+    --------
+    Tuple[np.ndarray, float] : (最良の重み, スコア)
+    """
+    rng = np.random.default_rng(seed)
+    n_models = oof_matrix.shape[1]
+    sign = 1.0 if metric == 'log_loss' else -1.0
+
+    # 初期候補: 単体モデル、均等重み、ランダム重み
+    candidates = np.vstack([
+        np.eye(n_models),
+        np.full((1, n_models), 1.0 / n_models),
+        rng.dirichlet(np.ones(n_models), size=n_candidates),
+    ])
+    best_weights, best_score = None, np.inf
+    concentration = 50.0
+
+    for _ in range(n_rounds):
+        scores = sign * score_weight_candidates(oof_matrix, y, candidates, metric=metric)
+        i = int(np.argmin(scores))
+        if scores[i] < best_score:
+            best_score, best_weights = scores[i], candidates[i]
+        # 最良の重みの近傍をサンプリング（ラウンドごとに範囲を狭める）
+        candidates = rng.dirichlet(best_weights * concentration + 1e-3, size=n_candidates)
+        candidates = np.vstack([best_weights, candidates])
+        concentration *= 4
+
+    return best_weights.astype(np.float64), float(sign * best_score)
+
+
+def rank_average(matrix: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+    """
+    予測を列ごとに順位（0〜1、同順位は平均順位）に変換して重み付き平均
+
+    Parameters:
+    -----------
+    matrix : np.ndarray
+        (行数, run数) の予測
+    weights : np.ndarray, optional
+        run ごとの重み（デフォルト: 均等）
+
+    Returns:
+    --------
+    np.ndarray : 順位平均（0〜1）
+    """
+    from scipy.stats import rankdata
+    
+    n_rows, n_models = matrix.shape
+    weights = np.full(n_models, 1.0 / n_models) if weights is None else np.asarray(weights) / np.sum(weights)
+    # 同じ値には平均順位を付ける（argsort の順序に依存しない）
+    ranks = ((rankdata(matrix, method='average', axis=0) - 1) / max(n_rows - 1, 1)).astype(np.float32)
+    return ranks @ weights.astype(np.float32)
+
+
+def fit_stacker(oof_matrix: np.ndarray, y: np.ndarray, test_matrix: np.ndarray,
+                n_folds: int = 5, C: float = 1.0, seed: int = 42) -> tuple:
+    """
+    レベル2のロジスティック回帰でスタッキング（入力は予測のlogit）
+
+    Parameters:
+    -----------
+    oof_matrix : np.ndarray
+        (行数, run数) のOOF予測
+    y : np.ndarray
+        目的変数（0/1）
+    test_matrix : np.ndarray
+        (テスト行数, run数) のテスト予測
+    n_folds : int
+        レベル2のOOFを作る分割数
+    C : float
+        正則化の強さの逆数
+    seed : int
+        乱数シード
+
+    Returns:
+    --------
+    tuple : (oof_level2, test_level2, model)
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold
+
+    def logit(P):
+        P = np.clip(P, 1e-6, 1 - 1e-6)
+        return np.log(P / (1 - P))
+
+    X = logit(np.asarray(oof_matrix, dtype=np.float64))
+    X_test = logit(np.asarray(test_matrix, dtype=np.float64))
+    y = np.asarray(y)
+
+    oof_level2 = np.zeros(len(y))
+    skf = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for trn_idx, val_idx in skf.split(X, y):
+        model = LogisticRegression(C=C, max_iter=1000)
+        model.fit(X[trn_idx], y[trn_idx])
+        oof_level2[val_idx] = model.predict_proba(X[val_idx])[:, 1]
+
+    model = LogisticRegression(C=C, max_iter=1000)
+    model.fit(X, y)
+    test_level2 = model.predict_proba(X_test)[:, 1]
+
+    return oof_level2, test_level2, model
+
+
+def blend_from_store(store: PredictionStore, y: np.ndarray,
+                     names: List[str] = None,
+                     method: str = 'weights',
+                     metric: str = 'log_loss',
+                     **kwargs) -> Dict:
+    """
+    保存済みの予測をブレンド
+
+    Parameters:
+    -----------
+    store : PredictionStore
+        予測の保存先
+    y : np.ndarray
+        目的変数（0/1）
+    names : List[str], optional
+        使う run 名（デフォルト: すべて）
+    method : str
+        'weights'（重み最適化）、'rank'（順位平均）、'stack'（ロジスティック回帰）
+    metric : str
+        'log_loss' または 'auc'
+    **kwargs : dict
+        optimize_blend_weights() / fit_stacker() に渡す引数
+
+    Returns:
+    --------
+    Dict : {'names', 'weights', 'score', 'oof', 'test'}
+    """
+    oof_matrix, test_matrix, names = store.load_matrix(names)
+    weights = None
+
+    if method == 'weights':
+        weights, _ = optimize_blend_weights(oof_matrix, y, metric=metric, **kwargs)
+        oof = oof_matrix @ weights.astype(np.float32)
+        test = test_matrix @ weights.astype(np.float32)
+    elif method == 'rank':
+        oof = rank_average(oof_matrix)
+        test = rank_average(test_matrix)
+    elif method == 'stack':
+        oof, test, _ = fit_stacker(oof_matrix, y, test_matrix, **kwargs)
+    else:
+        raise ValueError(f"method は 'weights', 'rank', 'stack' のいずれかを指定してください: {method}")
+
+    if method == 'rank' and metric == 'log_loss':
+        # 順位は確率ではないため log loss は評価しない
+        score = np.nan
+    else:
+        score = float(score_weight_candidates(oof[:, None], y, np.ones((1, 1)), metric=metric)[0])
+
+    return {
+        'names': names,
+        'weights': None if weights is None else dict(zip(names, weights.tolist())),
+        'score': score,
+        'oof': oof,
+        'test': test,
+    }
@@ -0,0 +1,241 @@
+"""
+欠損値補完
+補完値（定数・中央値・カテゴリごとの中央値）を全カラム一括で学習し、数値ブロックにマスクで一括適用する
+"""
+import json
+import os
+import pandas as pd
+import numpy as np
+from typing import Dict, List
+
+from .utils import load_cached_params, save_cached_params
+
+
+def fit_imputer(train: pd.DataFrame,
+                num_cols: List[str] = None,
+                cat_cols: List[str] = None,
+                strategy: str = 'median',
+                fill_value: float = 0.0,
+                group_col: str = None,
+                cat_fill_value: str = 'Missing',
+                fill_values: Dict[str, float] = None) -> Dict:
+    """
+    欠損値の補完値を学習
+
+    数値カラムは1つの2次元配列として全カラムの統計量を一括計算する。
+    group_col を指定した場合はカテゴリごとの中央値（平均）を1回の groupby で計算し、
+    全体が欠損しているグループや未知のカテゴリには全体の値を使う。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    num_cols : List[str], optional
+        数値カラム（デフォルト: group_col 以外のすべての数値カラム。テストデータのみの欠損にも対応）
+    cat_cols : List[str], optional
+        カテゴリカラム（デフォルト: object / category / string カラム）
+    strategy : str
+        'constant'（fill_value）、'median'、'mean'
+    fill_value : float
+        strategy='constant' の補完値
+    group_col : str, optional
+        グループごとに補完値を計算するカテゴリカラム（'median' / 'mean' のみ）
+    cat_fill_value : str
+        カテゴリカラムの補完値
+    fill_values : Dict[str, float], optional
+        カラムごとに固定する補完値（strategy より優先）
+
+    Returns:
+    --------
+    Dict : 学習済みパラメータ（JSONで保存可能）
+    """
+    if strategy not in ('constant', 'median', 'mean'):
+        raise ValueError(f"strategy は 'constant', 'median', 'mean' のいずれか: {strategy}")
+
+    if num_cols is None:
+        num_cols = [col for col in train.select_dtypes(include=[np.number]).columns if col != group_col]
+    if cat_cols is None:
+        cat_cols = train.select_dtypes(include=['object', 'category', 'string']).columns.tolist()
+
+    X = train[num_cols].to_numpy(dtype=np.float64)
+    if strategy == 'constant':
+        values = np.full(len(num_cols), fill_value, dtype=np.float64)
+    else:
+        reduce = np.nanmedian if strategy == 'median' else np.nanmean
+        with np.errstate(all='ignore'):
+            values = reduce(X, axis=0) if len(X) else np.full(len(num_cols), np.nan)
+        # 全体が欠損しているカラムは fill_value で補完
+        values = np.where(np.isnan(values), fill_value, values)
+
+    overrides = fill_values or {}
+    for j, col in enumerate(num_cols):
+        if col in overrides:
+            values[j] = overrides[col]
+
+    params = {
+        'strategy': strategy,
+        'num_cols': list(num_cols),
+        'values': values.tolist(),
+        'cat_cols': list(cat_cols),
+        'cat_fill_value': cat_fill_value,
+        'group_col': None,
+    }
+
+    if group_col is not None and strategy != 'constant' and num_cols:
+        grouped = train.groupby(group_col, observed=True, dropna=True)[num_cols]
+        group_values = grouped.median() if strategy == 'median' else grouped.mean()
+        G = group_values.to_numpy(dtype=np.float64)
+        # グループ内がすべて欠損の場合と、固定値を指定したカラムは全体の値を使う
+        G = np.where(np.isnan(G), values[None, :], G)
+        fixed = np.array([col in overrides for col in num_cols])
+        G[:, fixed] = values[fixed]
+        params.update({
+            'group_col': group_col,
+            'group_keys': group_values.index.tolist(),
+            'group_values': G.tolist(),
+        })
+
+    return params
+
+
+def apply_imputer(df: pd.DataFrame, params: Dict, inplace: bool = False) -> pd.DataFrame:
+    """
+    学習済みの補完値を適用
+
+    数値カラムの欠損マスクを一括で作成し、欠損を含むカラムのマスクの位置だけを補完値で書き換える
+    （数値ブロック全体のコピーと書き戻しは行わない。グループごとの補完値は欠損を含む行のみ参照する）。
+    パラメータのみに依存するため、テストデータをチャンクごとに処理しても結果は同じ。
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    params : Dict
+        fit_imputer() の戻り値
+    inplace : bool
+        True の場合は df を直接書き換える
+
+    Returns:
+    --------
+    pd.DataFrame : 補完後のデータフレーム
+    """
+    if not inplace:
+        df = df.copy()
+
+    cols = [col for col in params['num_cols'] if col in df.columns]
+    if cols:
+        positions = [params['num_cols'].index(col) for col in cols]
+        values = np.asarray(params['values'], dtype=np.float64)[positions]
+        # 欠損マスクは isna() から作成し、数値ブロック全体は取り出さない
+        mask = df[cols].isna().to_numpy()
+        changed = np.flatnonzero(mask.any(axis=0))
+
+        G, codes = None, None
+        if params['group_col'] is not None and params['group_col'] in df.columns and len(changed):
+            rows = np.flatnonzero(mask.any(axis=1))
+            # 未知のカテゴリ（-1）は全体の補完値の行を参照する
+            G = np.vstack([np.asarray(params['group_values'], dtype=np.float64)[:, positions], values])
+            codes = np.full(len(df), -1, dtype=np.int64)
+            codes[rows] = pd.Index(params['group_keys']).get_indexer(df[params['group_col']].iloc[rows])
+
+        # 欠損を含むカラムのマスク位置のみ書き換える（float64 以外は補完値を保持できるよう変換）
+        for j in changed:
+            col = cols[j]
+            if df[col].dtype != np.float64:
+                df[col] = df[col].astype(np.float64)
+            fill = values[j] if G is None else G[codes[mask[:, j]], j]
+            df.loc[mask[:, j], col] = fill
+
+    fill = params['cat_fill_value']
+    for col in params['cat_cols']:
+        if col not in df.columns or not df[col].isna().any():
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and fill not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([fill])
+        df[col] = df[col].fillna(fill)
+
+    return df
+
+
+def save_imputer(params: Dict, path: str) -> None:
+    """
+    学習済みパラメータをJSONに保存
+
+    Parameters:
+    -----------
+    params : Dict
+        fit_imputer() の戻り値
+    path : str
+        保存先のパス
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(params, f, indent=2, ensure_ascii=False, default=str)
+
+
+def load_imputer(path: str) -> Dict:
+    """
+    保存したパラメータを読み込む
+
+    Parameters:
+    -----------
+    path : str
+        save_imputer() で保存したJSONのパス
+
+    Returns:
+    --------
+    Dict : fit_imputer() と同じ形式のパラメータ
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def impute_missing(train: pd.DataFrame, test: pd.DataFrame,
+                   num_cols: List[str] = None,
+                   cat_cols: List[str] = None,
+                   strategy: str = 'median',
+                   group_col: str = None,
+                   cache_path: str = None,
+                   **kwargs) -> tuple:
+    """
+    訓練データで学習した補完値で訓練・テストデータを補完
+
+    cache_path が存在し、保存時の設定（strategy・対象カラム・group_col など）が引数と一致する場合は
+    学習済みパラメータを読み込む。存在しない場合や設定が異なる場合は学習して保存する。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    num_cols : List[str], optional
+        数値カラム
+    cat_cols : List[str], optional
+        カテゴリカラム
+    strategy : str
+        'constant'、'median'、'mean'
+    group_col : str, optional
+        グループごとに補完値を計算するカテゴリカラム
+    cache_path : str, optional
+        パラメータのキャッシュ（設定とパラメータのJSON）のパス
+    **kwargs : dict
+        fit_imputer() に渡す引数（fill_value、cat_fill_value、fill_values）
+
+    Returns:
+    --------
+    tuple : (train, test, params)
+    """
+    settings = {'num_cols': num_cols, 'cat_cols': cat_cols, 'strategy': strategy,
+                'group_col': group_col, **kwargs}
+    params = load_cached_params(cache_path, settings)
+    if params is None:
+        params = fit_imputer(train, num_cols, cat_cols, strategy=strategy,
+                             group_col=group_col, **kwargs)
+        if cache_path is not None:
+            save_cached_params(params, cache_path, settings)
+
+    train = apply_imputer(train, params)
+    test = apply_imputer(test, params)
+
+    return train, test, params
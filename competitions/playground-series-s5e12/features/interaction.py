@@ -145,7 +145,8 @@ def create_demographic_interactions(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def create_all_interaction_features(train: pd.DataFrame, test: pd.DataFrame) -> tuple:
+def create_all_interaction_features(train: pd.DataFrame, test: pd.DataFrame,
+                                    n_jobs: int = 1, backend: str = 'thread') -> tuple:
     """
     すべての相互作用特徴量を作成
     
@@ -155,11 +156,27 @@ def create_all_interaction_features(train: pd.DataFrame, test: pd.DataFrame) ->
         訓練データ
     test : pd.DataFrame
         テストデータ
+    n_jobs : int
+        並列ワーカー数（1: 直列実行、-1: 全コア）
+    backend : str
+        並列実行時のバックエンド（'thread' または 'process'）
     
     Returns:
     --------
     tuple : (train, test) 特徴量を追加したデータフレーム
     """
+    builders = [
+        create_high_importance_interactions,
+        create_cholesterol_interactions,
+        create_lifestyle_interactions,
+        create_demographic_interactions,
+    ]
+    
+    # 並列モード: 行チャンクごとに全相互作用関数を適用
+    if n_jobs != 1:
+        from .parallel import apply_features_parallel_train_test
+        return apply_features_parallel_train_test(train, test, builders, n_jobs=n_jobs, backend=backend)
+    
     train = train.copy()
     test = test.copy()
     
@@ -0,0 +1,161 @@
+"""
+k近傍の目的変数特徴量
+標準化した数値特徴量の近傍における目的変数の平均と距離の統計量を、フォールド外（OOF）で作成する
+"""
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from .cv import make_folds
+
+
+class _FaissIndex:
+    """faiss の HNSW インデックスを KDTree と同じ query() で扱うラッパー"""
+
+    def __init__(self, X: np.ndarray, m: int = 32, ef_search: int = 64):
+        import faiss
+
+        self.index = faiss.IndexHNSWFlat(X.shape[1], m)
+        self.index.hnsw.efSearch = ef_search
+        self.index.add(np.ascontiguousarray(X, dtype=np.float32))
+
+    def query(self, X: np.ndarray, k: int):
+        sq_dist, ind = self.index.search(np.ascontiguousarray(X, dtype=np.float32), k)
+        return np.sqrt(np.maximum(sq_dist, 0)), ind
+
+
+def _build_index(X: np.ndarray, index: str, leaf_size: int):
+    """近傍探索のインデックスを作成"""
+    if index == 'kd_tree':
+        from sklearn.neighbors import KDTree
+        return KDTree(X, leaf_size=leaf_size)
+    if index == 'ball_tree':
+        from sklearn.neighbors import BallTree
+        return BallTree(X, leaf_size=leaf_size)
+    if index == 'hnsw':
+        return _FaissIndex(X)
+    raise ValueError(f"index は 'kd_tree', 'ball_tree', 'hnsw' のいずれか: {index}")
+
+
+def _knn_stats(tree, X_query: np.ndarray, y_ref: np.ndarray, k_list: List[int],
+               out: np.ndarray, batch_size: int, n_jobs: int) -> None:
+    """
+    クエリ点ごとの近傍統計量を out（クエリ数, 2 * len(k_list) + 1）に書き込む
+
+    クエリはバッチごとに処理し、近傍のインデックス（バッチ行数 × k）はバッチ内でのみ保持する。
+    見つからなかった近傍（インデックス -1）は平均から除き、1つも見つからない場合は NaN にする。
+    """
+    k_max = max(k_list)
+
+    def task(start: int) -> None:
+        stop = min(start + batch_size, len(X_query))
+        dist, ind = tree.query(X_query[start:stop], k=k_max)
+        # faiss の HNSW は近傍が k 個見つからない場合にインデックス -1 を返すため除外する
+        # （y_ref[-1] を読まないように、見つかった近傍だけで平均する）
+        found = ind >= 0
+        y_cum = np.cumsum(np.where(found, y_ref[np.where(found, ind, 0)], 0.0), axis=1)
+        d_cum = np.cumsum(np.where(found, dist, 0.0), axis=1)
+        n_cum = np.cumsum(found, axis=1)
+        # 近傍の目的変数と距離の累積和から、各 k の平均を一度に求める
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for j, k in enumerate(k_list):
+                out[start:stop, 2 * j] = y_cum[:, k - 1] / n_cum[:, k - 1]
+                out[start:stop, 2 * j + 1] = d_cum[:, k - 1] / n_cum[:, k - 1]
+        out[start:stop, -1] = np.where(found[:, 0], dist[:, 0], np.nan)
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        list(executor.map(task, range(0, len(X_query), batch_size)))
+
+
+def create_knn_target_features(train: pd.DataFrame, test: pd.DataFrame,
+                               cols: List[str],
+                               target_col: str = 'diagnosed_diabetes',
+                               k_list: List[int] = (5, 20, 50),
+                               n_folds: int = 5,
+                               index: str = 'kd_tree',
+                               leaf_size: int = 40,
+                               batch_size: int = 20_000,
+                               n_jobs: int = -1,
+                               seed: int = 42) -> tuple:
+    """
+    k近傍の目的変数平均と距離の統計量を作成（訓練データはフォールド外）
+
+    数値カラムを訓練データの平均・標準偏差で標準化し、フォールドごとに学習用の行で
+    インデックスを1回だけ作成して検証用の行を問い合わせる。テストデータは訓練データ全体の
+    インデックスに問い合わせる。クエリはバッチに分けてスレッドで並列に処理する
+    （KDTree / BallTree / faiss の探索はGILを解放する）。
+
+    作成する特徴量:
+        knn{k}_target_mean : k近傍の目的変数の平均
+        knn{k}_dist_mean   : k近傍までの距離の平均
+        knn_dist_min       : 最近傍までの距離
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str]
+        距離の計算に使う数値カラム
+    target_col : str
+        目的変数のカラム名
+    k_list : List[int]
+        近傍数のリスト
+    n_folds : int
+        フォールド数
+    index : str
+        'kd_tree'、'ball_tree'（sklearn）、'hnsw'（faiss による近似探索。
+        近傍が k 個見つからない行は見つかった近傍だけで平均する）
+    leaf_size : int
+        KDTree / BallTree の葉のサイズ（index='hnsw' では使用しない）
+    batch_size : int
+        1回に問い合わせる行数（メモリ使用量は batch_size × max(k_list) に比例）
+    n_jobs : int
+        スレッド数（-1: 全コア）
+    seed : int
+        フォールド分割のシード
+
+    Returns:
+    --------
+    tuple : (train, test, feature_names)
+    """
+    train = train.copy()
+    test = test.copy()
+    k_list = sorted(k_list)
+    n_jobs = (os.cpu_count() or 1) if n_jobs is None or n_jobs < 0 else max(1, n_jobs)
+
+    # 訓練データの統計量で標準化（欠損は平均 = 0 で埋める）
+    X_train = train[cols].to_numpy(dtype=np.float64)
+    mean = np.nanmean(X_train, axis=0)
+    std = np.nanstd(X_train, axis=0)
+    std[~(std > 0)] = 1.0
+    X_train = np.nan_to_num((X_train - mean) / std).astype(np.float32)
+    X_test = np.nan_to_num((test[cols].to_numpy(dtype=np.float64) - mean) / std).astype(np.float32)
+    y = train[target_col].to_numpy(dtype=np.float64)
+
+    feature_names = []
+    for k in k_list:
+        feature_names += [f'knn{k}_target_mean', f'knn{k}_dist_mean']
+    feature_names.append('knn_dist_min')
+
+    oof = np.empty((len(train), len(feature_names)), dtype=np.float32)
+    # 分類の目的変数なら層化して分割
+    folds = make_folds(y, n_folds=n_folds, seed=seed, stratified=len(np.unique(y)) <= 20)
+    for trn_idx, val_idx in folds:
+        tree = _build_index(X_train[trn_idx], index, leaf_size)
+        fold_out = np.empty((len(val_idx), len(feature_names)), dtype=np.float32)
+        _knn_stats(tree, X_train[val_idx], y[trn_idx], k_list, fold_out, batch_size, n_jobs)
+        oof[val_idx] = fold_out
+        del tree
+
+    test_out = np.empty((len(test), len(feature_names)), dtype=np.float32)
+    tree = _build_index(X_train, index, leaf_size)
+    _knn_stats(tree, X_test, y, k_list, test_out, batch_size, n_jobs)
+
+    train[feature_names] = oof
+    test[feature_names] = test_out
+
+    return train, test, feature_names
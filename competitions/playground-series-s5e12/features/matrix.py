@@ -0,0 +1,242 @@
+"""
+学習用の特徴量行列
+全特徴量を列優先（Fortran順）の float32 配列1つに格納し、特徴量の部分集合をコピーなしで渡す
+"""
+import json
+import os
+import pandas as pd
+import numpy as np
+from typing import Callable, Dict, List, Union
+
+
+class FeatureMatrix:
+    """
+    列優先（Fortran順）の float32 特徴量行列
+
+    各特徴量は1本の連続したメモリ領域になるため、column() で取得したビューに
+    特徴量作成関数が直接書き込める。連続したカラム範囲の部分集合はビュー（コピーなし）、
+    それ以外も float32 のまま1回のコピーで取り出せ、LightGBM は変換せずに受け取る
+    （LightGBMは F_CONTIGUOUS な float32 配列を列優先のまま読み込む）。
+
+    path を指定した場合は .npy のメモリマップとして確保し、カラム名を
+    {path}.json に保存する（FeatureMatrix.open() で再度開ける）。
+
+    Parameters:
+    -----------
+    n_rows : int
+        行数
+    columns : List[str]
+        特徴量名のリスト
+    path : str, optional
+        メモリマップのファイルパス（例: 'data/output/train_features.npy'）
+    fill_value : float
+        初期値（デフォルト: NaN）
+    """
+
+    def __init__(self, n_rows: int, columns: List[str], path: str = None, fill_value: float = np.nan):
+        self.columns = list(columns)
+        if len(set(self.columns)) != len(self.columns):
+            raise ValueError('特徴量名が重複しています')
+        self._index = {name: j for j, name in enumerate(self.columns)}
+        self.path = path
+
+        shape = (n_rows, len(self.columns))
+        if path is None:
+            self.values = np.empty(shape, dtype=np.float32, order='F')
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.values = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                                    shape=shape, fortran_order=True)
+            with open(path + '.json', 'w') as f:
+                json.dump({'columns': self.columns}, f, ensure_ascii=False)
+        self.values.fill(fill_value)
+
+    @classmethod
+    def open(cls, path: str, mode: str = 'r') -> 'FeatureMatrix':
+        """
+        保存済みの特徴量行列をメモリマップで開く
+
+        Parameters:
+        -----------
+        path : str
+            .npy のパス
+        mode : str
+            'r': 読み取り専用、'r+': 書き込み可
+
+        Returns:
+        --------
+        FeatureMatrix : 特徴量行列
+        """
+        with open(path + '.json') as f:
+            columns = json.load(f)['columns']
+        matrix = cls.__new__(cls)
+        matrix.columns = columns
+        matrix._index = {name: j for j, name in enumerate(columns)}
+        matrix.path = path
+        matrix.values = np.load(path, mmap_mode=mode)
+        return matrix
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: List[str] = None, path: str = None) -> 'FeatureMatrix':
+        """
+        DataFrame のカラムを1列ずつ float32 で書き込む（DataFrame全体の変換コピーを作らない）
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            特徴量を含むデータフレーム
+        columns : List[str], optional
+            書き込むカラム（デフォルト: 数値カラム）
+        path : str, optional
+            メモリマップのファイルパス
+
+        Returns:
+        --------
+        FeatureMatrix : 特徴量行列
+        """
+        if columns is None:
+            columns = df.select_dtypes(include=[np.number, 'bool']).columns.tolist()
+        matrix = cls(len(df), columns, path=path)
+        for name in columns:
+            matrix[name] = df[name]
+        return matrix
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        1特徴量の書き込み可能なビュー（連続したメモリ領域）
+
+        例: np.divide(m.column('a'), m.column('b'), out=m.column('a_div_b'))
+        """
+        return self.values[:, self._index[name]]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    def __setitem__(self, name: str, values) -> None:
+        if isinstance(values, pd.Series):
+            values = values.to_numpy(dtype=np.float32, na_value=np.nan)
+        self.values[:, self._index[name]] = values
+
+    def fill(self, df: pd.DataFrame, builders: Dict[str, Callable]) -> 'FeatureMatrix':
+        """
+        特徴量作成関数の結果を各カラムに直接書き込む
+
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            元データ
+        builders : Dict[str, Callable]
+            特徴量名 → 関数。関数は (df, out) を受け取り、out（その特徴量のビュー）に
+            書き込むか、値を返す（返した値は out に書き込まれる）
+
+        Returns:
+        --------
+        FeatureMatrix : self
+        """
+        for name, builder in builders.items():
+            out = self.column(name)
+            result = builder(df, out)
+            if result is not None:
+                self[name] = result
+        return self
+
+    def indices(self, features: List[str]) -> np.ndarray:
+        """特徴量名のリストを列番号の配列に変換"""
+        return np.array([self._index[name] for name in features], dtype=np.int64)
+
+    def subset(self, features: List[str] = None) -> np.ndarray:
+        """
+        特徴量の部分集合を (行数, 特徴量数) の float32 配列で取得
+
+        列番号が連続している（行列の並び順どおりの範囲）場合はビューを返し、
+        それ以外は列優先の float32 配列に1回だけコピーする（dtype の変換は発生しない）。
+
+        Parameters:
+        -----------
+        features : List[str], optional
+            特徴量名のリスト（デフォルト: すべて）
+
+        Returns:
+        --------
+        np.ndarray : 特徴量の配列
+        """
+        if features is None:
+            return self.values
+        idx = self.indices(features)
+        if len(idx) > 0 and np.array_equal(idx, np.arange(idx[0], idx[0] + len(idx))):
+            return self.values[:, idx[0]:idx[0] + len(idx)]
+        out = np.empty((len(self), len(idx)), dtype=np.float32, order='F')
+        np.take(self.values, idx, axis=1, out=out)
+        return out
+
+    def to_frame(self, features: List[str] = None) -> pd.DataFrame:
+        """確認用に DataFrame へ変換（コピーが発生する）"""
+        features = self.columns if features is None else features
+        return pd.DataFrame(self.subset(features), columns=features)
+
+    def flush(self) -> None:
+        """メモリマップの内容をディスクに書き出す"""
+        if isinstance(self.values, np.memmap):
+            self.values.flush()
+
+    def __repr__(self) -> str:
+        storage = f"path='{self.path}'" if self.path else 'in-memory'
+        return f'FeatureMatrix({self.shape[0]:,} rows × {self.shape[1]} features, {storage})'
+
+
+def build_feature_matrix(train: pd.DataFrame, test: pd.DataFrame,
+                         features: List[str],
+                         path_prefix: str = None) -> tuple:
+    """
+    訓練・テストデータの特徴量行列を作成
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    features : List[str]
+        特徴量のリスト（この順で列に並ぶ）
+    path_prefix : str, optional
+        メモリマップの保存先（例: 'data/output/features' → features_train.npy, features_test.npy）
+
+    Returns:
+    --------
+    tuple : (train_matrix, test_matrix)
+    """
+    train_path = None if path_prefix is None else f'{path_prefix}_train.npy'
+    test_path = None if path_prefix is None else f'{path_prefix}_test.npy'
+    train_matrix = FeatureMatrix.from_frame(train, features, path=train_path)
+    test_matrix = FeatureMatrix.from_frame(test, features, path=test_path)
+    return train_matrix, test_matrix
+
+
+def as_model_input(X: Union[pd.DataFrame, np.ndarray, FeatureMatrix], features: List[str]):
+    """
+    特徴量リストに対応するモデル入力を返す（FeatureMatrix ならコピーなしの部分集合）
+
+    Parameters:
+    -----------
+    X : pd.DataFrame, np.ndarray or FeatureMatrix
+        特徴量を含むデータ
+    features : List[str]
+        特徴量のリスト
+
+    Returns:
+    --------
+    pd.DataFrame or np.ndarray : モデルに渡すデータ
+    """
+    if isinstance(X, FeatureMatrix):
+        return X.subset(features)
+    return X[features]
@@ -0,0 +1,188 @@
+"""
+特徴量作成の並列実行
+行をチャンクに分割し、スレッド／プロセスプールで特徴量関数を適用する
+"""
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Tuple
+
+
+def _resolve_n_jobs(n_jobs: int) -> int:
+    """n_jobs（-1 = 全コア）を実際のワーカー数に変換"""
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+
+def _chunk_bounds(n_rows: int, n_chunks: int) -> List[Tuple[int, int]]:
+    """行数をn_chunks個の連続した範囲 [start, stop) に分割"""
+    n_chunks = max(1, min(n_chunks, n_rows))
+    edges = np.linspace(0, n_rows, n_chunks + 1).astype(int)
+    return [(int(edges[i]), int(edges[i + 1])) for i in range(n_chunks)]
+
+
+def _apply_builders(df: pd.DataFrame, builders: List[Callable]) -> Dict[str, np.ndarray]:
+    """チャンクに特徴量関数を順番に適用し、新規カラムのみを返す"""
+    original_cols = set(df.columns)
+    for builder in builders:
+        df = builder(df)
+    return {col: df[col].to_numpy() for col in df.columns if col not in original_cols}
+
+
+def _thread_worker(df: pd.DataFrame, builders: List[Callable],
+                   start: int, stop: int) -> Dict[str, np.ndarray]:
+    # スレッドでは元データフレームのスライスをそのまま使う
+    return _apply_builders(df.iloc[start:stop], builders)
+
+
+def _process_worker(shm_name: str, layout: List[Tuple[str, str, int]], n_rows: int,
+                    object_chunk: pd.DataFrame, columns: List[str], index: np.ndarray,
+                    builders: List[Callable], start: int, stop: int) -> Dict[str, np.ndarray]:
+    # 共有メモリ上の数値ブロックをコピーせずに参照する
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = {}
+        for col, dtype, offset in layout:
+            full = np.ndarray((n_rows,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            data[col] = full[start:stop]
+        for col in object_chunk.columns:
+            data[col] = object_chunk[col].to_numpy()
+
+        chunk = pd.DataFrame(data, index=index, copy=False)[columns]
+        result = _apply_builders(chunk, builders)
+        # 共有メモリを閉じる前に参照を切る
+        del chunk, data
+        return result
+    finally:
+        shm.close()
+
+
+def _to_shared_memory(df: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, List[Tuple[str, str, int]], List[str]]:
+    """数値カラムを1つの共有メモリブロックに詰め、(shm, レイアウト, 非数値カラム) を返す"""
+    numeric_cols = df.select_dtypes(include=[np.number, 'bool']).columns.tolist()
+    object_cols = [col for col in df.columns if col not in numeric_cols]
+
+    layout = []
+    offset = 0
+    for col in numeric_cols:
+        dtype = df[col].to_numpy().dtype
+        # 8バイト境界に揃える
+        offset = (offset + 7) // 8 * 8
+        layout.append((col, dtype.str, offset))
+        offset += dtype.itemsize * len(df)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for col, dtype, col_offset in layout:
+        buf = np.ndarray((len(df),), dtype=np.dtype(dtype), buffer=shm.buf, offset=col_offset)
+        buf[:] = df[col].to_numpy()
+        del buf
+
+    return shm, layout, object_cols
+
+
+def apply_features_parallel(df: pd.DataFrame,
+                            builders: List[Callable],
+                            n_jobs: int = -1,
+                            n_chunks: int = None,
+                            backend: str = 'thread') -> pd.DataFrame:
+    """
+    行チャンク単位で特徴量関数を並列に適用
+
+    各特徴量関数は行ごとに独立した計算のみを行う前提（statistical.py, interaction.py の関数など）。
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    builders : List[Callable]
+        df -> df の特徴量関数のリスト（順番に適用）
+    n_jobs : int
+        ワーカー数（-1: 全コア、1: 直列実行）
+    n_chunks : int, optional
+        行の分割数（デフォルト: ワーカー数と同じ）
+    backend : str
+        'thread'（スレッドプール）または 'process'（プロセスプール + 共有メモリ）
+
+    Returns:
+    --------
+    pd.DataFrame : 特徴量を追加したデータフレーム（行順は入力と同じ）
+    """
+    if backend not in ('thread', 'process'):
+        raise ValueError(f"backend は 'thread' または 'process' を指定してください: {backend}")
+
+    n_workers = _resolve_n_jobs(n_jobs)
+    if n_workers == 1 or len(df) < 2:
+        out = df.copy()
+        for builder in builders:
+            out = builder(out)
+        return out
+
+    bounds = _chunk_bounds(len(df), n_chunks or n_workers)
+
+    if backend == 'thread':
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(_thread_worker, df, builders, start, stop)
+                       for start, stop in bounds]
+            results = [f.result() for f in futures]
+    else:
+        shm, layout, object_cols = _to_shared_memory(df)
+        try:
+            columns = df.columns.tolist()
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [
+                    executor.submit(
+                        _process_worker, shm.name, layout, len(df),
+                        df[object_cols].iloc[start:stop], columns,
+                        df.index[start:stop].to_numpy(), builders, start, stop
+                    )
+                    for start, stop in bounds
+                ]
+                results = [f.result() for f in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # チャンクの結果を元の行順で結合
+    out = df.copy()
+    if results:
+        new_cols = {col: np.concatenate([r[col] for r in results]) for col in results[0]}
+        out = pd.concat([out, pd.DataFrame(new_cols, index=df.index)], axis=1)
+    return out
+
+
+def apply_features_parallel_train_test(train: pd.DataFrame,
+                                       test: pd.DataFrame,
+                                       builders: List[Callable],
+                                       n_jobs: int = -1,
+                                       n_chunks: int = None,
+                                       backend: str = 'thread') -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    訓練データとテストデータの両方に特徴量関数を並列適用
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    builders : List[Callable]
+        df -> df の特徴量関数のリスト
+    n_jobs : int
+        ワーカー数（-1: 全コア）
+    n_chunks : int, optional
+        行の分割数
+    backend : str
+        'thread' または 'process'
+
+    Returns:
+    --------
+    Tuple[pd.DataFrame, pd.DataFrame] : (train, test)
+    """
+    train = apply_features_parallel(train, builders, n_jobs=n_jobs, n_chunks=n_chunks, backend=backend)
+    test = apply_features_parallel(test, builders, n_jobs=n_jobs, n_chunks=n_chunks, backend=backend)
+    return train, test
@@ -0,0 +1,236 @@
+"""
+推論（フォールドモデルのアンサンブル予測と提出ファイルの書き出し）
+行チャンクをスレッドプールで予測し、提出ファイルを逐次書き出す
+"""
+import os
+import pickle
+import time
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Union
+
+
+def load_fold_models(paths: List[str]) -> List:
+    """
+    保存したフォールドモデルを一度だけ読み込む
+
+    '.txt' は LightGBM の Booster（save_model() の出力）、'.json' / '.ubj' は XGBoost の Booster、
+    それ以外は pickle として読み込む。
+
+    Parameters:
+    -----------
+    paths : List[str]
+        モデルファイルのパスのリスト
+
+    Returns:
+    --------
+    List : モデルのリスト
+    """
+    models = []
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.txt':
+            import lightgbm as lgb
+            models.append(lgb.Booster(model_file=path))
+        elif ext in ('.json', '.ubj'):
+            import xgboost as xgb
+            booster = xgb.Booster()
+            booster.load_model(path)
+            models.append(booster)
+        else:
+            with open(path, 'rb') as f:
+                models.append(pickle.load(f))
+    return models
+
+
+def _is_xgb_booster(model) -> bool:
+    return not hasattr(model, 'predict_proba') and type(model).__module__.startswith('xgboost')
+
+
+def _predict_positive(model, X, predict_kwargs: Dict, n_threads: int, dmatrix=None) -> np.ndarray:
+    """
+    陽性クラスの確率を返す（sklearn API / LightGBM Booster / XGBoost Booster に対応）
+
+    LightGBM には num_threads=n_threads を既定で渡す（predict_kwargs の指定が優先）。
+    XGBoost Booster には作成済みの dmatrix を渡す。
+    """
+    if type(model).__module__.startswith('lightgbm'):
+        predict_kwargs = {'num_threads': n_threads, **predict_kwargs}
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(X, **predict_kwargs)[:, 1]
+    if _is_xgb_booster(model):
+        return model.predict(dmatrix, **predict_kwargs)
+    return model.predict(X, **predict_kwargs)
+
+
+def _predict_chunk(models: List, X, out: np.ndarray, predict_kwargs: Dict, n_threads: int) -> int:
+    """1チャンクの全フォールド平均を out（float32 のビュー）に書き込む"""
+    # XGBoost Booster 用の DMatrix はチャンクごとに1回だけ作成し、全フォールドで共有する
+    dmatrix = None
+    if any(_is_xgb_booster(model) for model in models):
+        import xgboost as xgb
+        dmatrix = xgb.DMatrix(X, nthread=n_threads)
+
+    out[:] = 0.0
+    for model in models:
+        out += _predict_positive(model, X, predict_kwargs, n_threads, dmatrix).astype(np.float32)
+    out /= len(models)
+    return len(out)
+
+
+def _resolve_workers(n_jobs: int) -> int:
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count() or 1
+    return max(1, n_jobs)
+
+
+def _threads_per_worker(n_workers: int) -> int:
+    """スレッドプールの各ワーカーがモデルの予測に使うスレッド数（合計がコア数を超えないように）"""
+    return max(1, (os.cpu_count() or 1) // n_workers)
+
+
+def predict_folds_batched(models: List,
+                          X: Union[pd.DataFrame, np.ndarray],
+                          chunk_size: int = 100_000,
+                          n_jobs: int = -1,
+                          predict_kwargs: Dict = None,
+                          verbose: bool = True) -> np.ndarray:
+    """
+    フォールドモデルの平均予測を行チャンク単位でスレッド並列に計算
+
+    LightGBM / XGBoost の予測はGILを解放するため、スレッドでコア数に応じてスケールする。
+    各ワーカーの LightGBM の予測スレッド数は コア数 // スレッド数 とし、CPUの過剰な割り当てを防ぐ。
+    結果はあらかじめ確保した float32 配列に直接書き込む。
+
+    Parameters:
+    -----------
+    models : List
+        フォールドモデルのリスト
+    X : pd.DataFrame or np.ndarray
+        予測する特徴量
+    chunk_size : int
+        1タスクあたりの行数
+    n_jobs : int
+        スレッド数（-1: 全コア）
+    predict_kwargs : Dict, optional
+        predict() に渡す追加引数（LightGBM の num_threads を指定した場合は既定値より優先）
+    verbose : bool
+        スループット（行/秒）を表示するか
+
+    Returns:
+    --------
+    np.ndarray : 平均予測確率（float32）
+    """
+    predict_kwargs = predict_kwargs or {}
+    n_workers = _resolve_workers(n_jobs)
+    n_threads = _threads_per_worker(n_workers)
+    n_rows = len(X)
+    preds = np.empty(n_rows, dtype=np.float32)
+    start_time = time.perf_counter()
+
+    def task(start: int) -> int:
+        stop = min(start + chunk_size, n_rows)
+        chunk = X.iloc[start:stop] if isinstance(X, pd.DataFrame) else X[start:stop]
+        return _predict_chunk(models, chunk, preds[start:stop], predict_kwargs, n_threads)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(task, range(0, n_rows, chunk_size)))
+
+    elapsed = time.perf_counter() - start_time
+    if verbose:
+        print(f'予測: {n_rows:,}行 × {len(models)}モデル, {elapsed:.2f}秒 '
+              f'({n_rows / max(elapsed, 1e-9):,.0f} 行/秒)')
+    return preds
+
+
+def write_submission_streaming(models: List,
+                               test: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                               features: List[str],
+                               path: str = 'submissions/submission.csv',
+                               id_col: str = 'id',
+                               target_col: str = 'diagnosed_diabetes',
+                               chunk_size: int = 100_000,
+                               n_jobs: int = -1,
+                               predict_kwargs: Dict = None,
+                               verbose: bool = True) -> Dict:
+    """
+    テストデータをチャンクごとに予測し、提出ファイルを逐次書き出す
+
+    test に pd.read_csv(..., chunksize=...) のイテレータを渡せば、テストデータ全体を
+    メモリに載せずに処理できる（同時に処理するチャンク数はスレッド数の2倍まで）。
+
+    Parameters:
+    -----------
+    models : List
+        フォールドモデルのリスト（load_fold_models() の戻り値など）
+    test : pd.DataFrame or Iterable[pd.DataFrame]
+        テストデータ、またはそのチャンクのイテレータ
+    features : List[str]
+        モデルに渡す特徴量のリスト
+    path : str
+        提出ファイルのパス
+    id_col : str
+        IDカラム名
+    target_col : str
+        予測値のカラム名
+    chunk_size : int
+        test が DataFrame の場合のチャンク行数
+    n_jobs : int
+        スレッド数（-1: 全コア）
+    predict_kwargs : Dict, optional
+        predict() に渡す追加引数（LightGBM の num_threads の既定値は コア数 // スレッド数）
+    verbose : bool
+        スループットを表示するか
+
+    Returns:
+    --------
+    Dict : {'rows': 書き出した行数, 'seconds': 所要時間, 'rows_per_second': スループット}
+    """
+    predict_kwargs = predict_kwargs or {}
+    n_workers = _resolve_workers(n_jobs)
+    n_threads = _threads_per_worker(n_workers)
+
+    if isinstance(test, pd.DataFrame):
+        chunks = (test.iloc[start:start + chunk_size] for start in range(0, len(test), chunk_size))
+    else:
+        chunks = iter(test)
+
+    def task(chunk: pd.DataFrame) -> pd.DataFrame:
+        preds = np.empty(len(chunk), dtype=np.float32)
+        _predict_chunk(models, chunk[features], preds, predict_kwargs, n_threads)
+        return pd.DataFrame({id_col: chunk[id_col].to_numpy(), target_col: preds})
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    start_time = time.perf_counter()
+    n_rows = 0
+
+    with open(path, 'w', newline='') as f, ThreadPoolExecutor(max_workers=n_workers) as executor:
+        pending = []
+        header = True
+
+        def write_oldest():
+            nonlocal header, n_rows
+            result = pending.pop(0).result()
+            result.to_csv(f, header=header, index=False)
+            header = False
+            n_rows += len(result)
+
+        for chunk in chunks:
+            pending.append(executor.submit(task, chunk))
+            # 先頭のチャンクから順に書き出し、未処理チャンクの数を制限する
+            if len(pending) >= n_workers * 2:
+                write_oldest()
+        while pending:
+            write_oldest()
+
+        if header:
+            # 空のテストデータでもヘッダーは書き出す
+            pd.DataFrame(columns=[id_col, target_col]).to_csv(f, index=False)
+
+    elapsed = time.perf_counter() - start_time
+    rows_per_second = n_rows / max(elapsed, 1e-9)
+    if verbose:
+        print(f'✅ {path} を書き出しました: {n_rows:,}行, {elapsed:.2f}秒 ({rows_per_second:,.0f} 行/秒)')
+
+    return {'rows': n_rows, 'seconds': elapsed, 'rows_per_second': rows_per_second}
@@ -6,6 +6,9 @@ import pandas as pd
 import numpy as np
 from typing import List, Dict, Tuple
 
+from .matrix import FeatureMatrix, as_model_input
+from .sketch import mix_hash
+
 
 def get_feature_importance_from_models(models: List, feature_names: List[str], 
                                       importance_type: str = 'gain') -> pd.DataFrame:
@@ -118,13 +121,254 @@ def remove_highly_correlated_features(df: pd.DataFrame,
     return to_keep
 
 
+def _column_values(data, col: str) -> np.ndarray:
+    """DataFrame / FeatureMatrix から1カラムを float64 で取り出す"""
+    if isinstance(data, FeatureMatrix):
+        return data.column(col).astype(np.float64)
+    return data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _column_forms(x: np.ndarray, decimals: int) -> Dict[str, np.ndarray]:
+    """
+    1カラムの正規化形（uint64 配列）
+
+    'exact': 値そのもの、'affine': 標準化して符号をそろえた値（a*x+b の重複）、
+    'rank': 密な順位（単調変換の重複。木モデルでは分割が同じになる）
+    欠損はすべての形で同じ値（NaN または -1）にそろえる。
+    """
+    mask = np.isnan(x)
+    forms = {'exact': np.where(mask, np.nan, x).view(np.uint64)}
+
+    valid = x[~mask]
+    z = np.full(len(x), np.nan)
+    z[~mask] = 0.0
+    if len(valid) > 0 and valid.std() > 0:
+        z[~mask] = (valid - valid.mean()) / valid.std()
+        # 傾きが負の一次変換も同じ形になるよう、最初の 0 でない値を正にそろえる
+        nonzero = np.flatnonzero(np.abs(z) > 1e-3)
+        if len(nonzero) > 0 and z[nonzero[0]] < 0:
+            z = -z
+    forms['affine'] = (np.round(z, decimals) + 0.0).view(np.uint64)
+
+    ranks = np.full(len(x), -1, dtype=np.int64)
+    _, inverse = np.unique(valid, return_inverse=True)
+    ranks[~mask] = inverse
+    # 減少する単調変換も同じ形になるよう、先頭の順位が小さい向きにそろえる
+    max_rank = inverse.max(initial=0)
+    first = np.flatnonzero(~mask)[:1]
+    if len(first) > 0 and ranks[first[0]] > max_rank - ranks[first[0]]:
+        ranks[~mask] = max_rank - inverse
+    forms['rank'] = ranks.view(np.uint64)
+    return forms
+
+
+def _fingerprint(values: np.ndarray, weights: np.ndarray) -> int:
+    """配列の 64bit フィンガープリント（ランダムな重みとの内積、線形時間）"""
+    with np.errstate(over='ignore'):
+        return int((values * weights).sum(dtype=np.uint64))
+
+
+def _minhash_signatures(X: np.ndarray, n_perm: int, n_bins: int, seed: int) -> np.ndarray:
+    """
+    各カラムの MinHash シグネチャ (カラム数, n_perm)
+
+    カラムを「(行番号, 分位ビン)」のトークン集合とみなし、2カラムの Jaccard 係数
+    （同じビンに入る行の割合に対応）を推定できるシグネチャを作る。
+    """
+    n_rows, n_cols = X.shape
+    bins = np.empty((n_rows, n_cols), dtype=np.uint64)
+    for j in range(n_cols):
+        x = X[:, j]
+        mask = np.isnan(x)
+        sorted_valid = np.sort(x[~mask])
+        # 同じ値は同じビンに入るよう searchsorted で順位を求める
+        rank = np.searchsorted(sorted_valid, x[~mask], side='left')
+        bins[~mask, j] = (rank * n_bins // max(len(sorted_valid), 1)).astype(np.uint64)
+        bins[mask, j] = n_bins  # 欠損は専用のビン
+
+    tokens = np.arange(n_rows, dtype=np.uint64)[:, None] * np.uint64(n_bins + 1) + bins
+    base = mix_hash(tokens, seed)
+
+    # 各ハッシュ関数はベースのハッシュの一次変換 a*h + b（a は奇数）で作る
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, n_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, n_perm, dtype=np.uint64)
+    signatures = np.empty((n_cols, n_perm), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for k in range(n_perm):
+            signatures[:, k] = (base * a[k] + b[k]).min(axis=0)
+    return signatures
+
+
+def find_redundant_features(data,
+                            cols: List[str] = None,
+                            near_duplicate_threshold: float = 0.98,
+                            sample_rows: int = 20_000,
+                            n_perm: int = 64,
+                            rows_per_band: int = 2,
+                            n_bins: int = 8,
+                            decimals: int = 5,
+                            seed: int = 0) -> Dict:
+    """
+    定数カラム・重複カラム・一次変換／単調変換の重複・ほぼ重複のカラムを検出
+
+    完全一致・一次変換（例: activity_score = physical_activity_minutes_per_week / 60）・
+    単調変換の重複は、各カラムの正規化形のフィンガープリントでグループ化するため、
+    カラム数に対して線形時間で検出できる（一致したペアは配列を比較して確認する）。
+    ほぼ重複のカラムは MinHash + LSH（バンド分割）で候補ペアを絞り込み、
+    候補ペアのみサンプル行で相関係数を計算して確認する。
+
+    Parameters:
+    -----------
+    data : pd.DataFrame or FeatureMatrix
+        データ
+    cols : List[str], optional
+        対象カラム（デフォルト: 数値カラム）
+    near_duplicate_threshold : float
+        ほぼ重複とみなす相関係数（絶対値）の閾値（None: 検出しない）
+    sample_rows : int
+        MinHash と相関の確認に使う行数
+    n_perm : int
+        MinHash のハッシュ関数の数
+    rows_per_band : int
+        LSH の1バンドあたりのハッシュ数（小さいほど候補が増え、見落としが減る）
+    n_bins : int
+        MinHash のトークンに使う分位ビンの数
+    decimals : int
+        一次変換の判定で標準化した値を丸める桁数
+    seed : int
+        乱数シード
+
+    Returns:
+    --------
+    Dict : {
+        'constant': 定数カラムのリスト,
+        'duplicate' / 'affine' / 'monotonic': {削除するカラム: 残すカラム},
+        'near_duplicate': [(残すカラム, 削除するカラム, 相関係数), ...]
+    }
+    """
+    if isinstance(data, FeatureMatrix):
+        cols = list(data.columns) if cols is None else cols
+    else:
+        numeric_cols = set(data.select_dtypes(include=[np.number]).columns)
+        cols = [col for col in (data.columns if cols is None else cols) if col in numeric_cols]
+
+    n_rows = len(data)
+    rng = np.random.default_rng(seed)
+    weights = rng.integers(0, 2 ** 63, n_rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    result = {'constant': [], 'duplicate': {}, 'affine': {}, 'monotonic': {}, 'near_duplicate': []}
+    kind_names = {'exact': 'duplicate', 'affine': 'affine', 'rank': 'monotonic'}
+    seen = {kind: {} for kind in kind_names}
+    remaining = []
+
+    for col in cols:
+        x = _column_values(data, col)
+        valid = x[~np.isnan(x)]
+        if len(valid) == 0 or (valid.min() == valid.max() and len(valid) == len(x)):
+            result['constant'].append(col)
+            continue
+
+        forms = _column_forms(x, decimals)
+        fingerprints = {kind: _fingerprint(form, weights) for kind, form in forms.items()}
+        for kind in kind_names:
+            keep = seen[kind].get(fingerprints[kind])
+            # フィンガープリントが一致した場合のみ配列を比較して確認
+            if keep is not None and np.array_equal(
+                    _column_forms(_column_values(data, keep), decimals)[kind], forms[kind]):
+                result[kind_names[kind]][col] = keep
+                break
+        else:
+            remaining.append(col)
+        for kind in kind_names:
+            seen[kind].setdefault(fingerprints[kind], col)
+
+    if near_duplicate_threshold is None or len(remaining) < 2:
+        return result
+
+    # ほぼ重複: MinHash シグネチャのバンドが一致するペアだけを候補にする
+    rows = np.sort(rng.choice(n_rows, min(sample_rows, n_rows), replace=False))
+    X = np.column_stack([_column_values(data, col)[rows] for col in remaining])
+    n_cols = X.shape[1]
+    # 負の相関も検出できるよう、符号を反転したカラムのシグネチャも作る
+    signatures = _minhash_signatures(np.hstack([X, -X]), n_perm, n_bins, seed)
+
+    candidates = set()
+    for start in range(0, n_perm - rows_per_band + 1, rows_per_band):
+        buckets = {}
+        for j, band in enumerate(map(bytes, signatures[:, start:start + rows_per_band])):
+            buckets.setdefault(band, []).append(j)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pair = sorted((members[a] % n_cols, members[b] % n_cols))
+                    if pair[0] != pair[1]:
+                        candidates.add(tuple(pair))
+
+    # 候補ペアのみ相関係数を計算して確認（欠損は列平均で埋める）
+    X = np.where(np.isnan(X), np.nanmean(X, axis=0), X)
+    Z = (X - X.mean(axis=0)) / X.std(axis=0)
+    dropped = set()
+    for a, b in sorted(candidates):
+        if a in dropped or b in dropped:
+            continue
+        corr = float(Z[:, a] @ Z[:, b] / len(Z))
+        if abs(corr) >= near_duplicate_threshold:
+            result['near_duplicate'].append((remaining[a], remaining[b], corr))
+            dropped.add(b)
+
+    return result
+
+
+def remove_redundant_features(data,
+                              cols: List[str] = None,
+                              drop_monotonic: bool = True,
+                              drop_near_duplicates: bool = True,
+                              **kwargs) -> Tuple[List[str], Dict]:
+    """
+    find_redundant_features() の結果から残すカラムのリストを作成
+
+    Parameters:
+    -----------
+    data : pd.DataFrame or FeatureMatrix
+        データ
+    cols : List[str], optional
+        対象カラム（デフォルト: 数値カラム）
+    drop_monotonic : bool
+        単調変換の重複を削除するか（木モデルでは冗長だが、線形モデルでは意味がある）
+    drop_near_duplicates : bool
+        ほぼ重複のカラムを削除するか
+    **kwargs : dict
+        find_redundant_features() に渡す引数
+
+    Returns:
+    --------
+    Tuple[List[str], Dict] : (残すカラムのリスト, find_redundant_features() の結果)
+    """
+    if not drop_near_duplicates:
+        kwargs['near_duplicate_threshold'] = None
+    report = find_redundant_features(data, cols=cols, **kwargs)
+
+    to_remove = set(report['constant']) | set(report['duplicate']) | set(report['affine'])
+    if drop_monotonic:
+        to_remove |= set(report['monotonic'])
+    to_remove |= {drop for _, drop, _ in report['near_duplicate']}
+
+    if cols is None:
+        cols = list(data.columns) if isinstance(data, FeatureMatrix) else \
+            data.select_dtypes(include=[np.number]).columns.tolist()
+    return [col for col in cols if col not in to_remove], report
+
+
 def select_features_combined(train: pd.DataFrame,
                              models: List,
                              feature_names: List[str],
                              target_col: str = None,
                              n_features: int = None,
                              importance_threshold: float = None,
-                             correlation_threshold: float = 0.95) -> Tuple[List[str], pd.DataFrame]:
+                             correlation_threshold: float = 0.95,
+                             drop_features: List[str] = None,
+                             remove_redundant: bool = False) -> Tuple[List[str], pd.DataFrame]:
     """
     特徴量重要度と相関分析を組み合わせて特徴量を選択
     
@@ -144,6 +388,11 @@ def select_features_combined(train: pd.DataFrame,
         重要度の閾値
     correlation_threshold : float
         相関係数の閾値
+    drop_features : List[str], optional
+        事前に除外する特徴量（get_drifted_features() の戻り値など）
+    remove_redundant : bool
+        相関分析の前に、定数・重複・一次変換・ほぼ重複のカラムをハッシュで除外するか
+        （単調変換の重複は除外しない。単調変換も除外する場合は remove_redundant_features() を使う）
     
     Returns:
     --------
@@ -165,7 +414,18 @@ def select_features_combined(train: pd.DataFrame,
         # 重要度が0より大きい特徴量
         selected_by_importance = select_features_by_importance(feature_importance)
     
-    # 3. 相関の高い特徴量を削除
+    # ドリフトなどで除外する特徴量を取り除く
+    if drop_features:
+        drop_set = set(drop_features)
+        selected_by_importance = [f for f in selected_by_importance if f not in drop_set]
+    
+    # 3. 定数・重複カラムを先に除外して、相関行列の計算対象を減らす
+    if remove_redundant:
+        selected_by_importance, _ = remove_redundant_features(
+            train, cols=[f for f in selected_by_importance if f != target_col], drop_monotonic=False
+        )
+    
+    # 4. 相関の高い特徴量を削除
     train_selected = train[selected_by_importance]
     selected_final = remove_highly_correlated_features(
         train_selected, target_col=target_col, threshold=correlation_threshold
@@ -174,7 +434,7 @@ def select_features_combined(train: pd.DataFrame,
     return selected_final, feature_importance
 
 
-def compare_feature_sets(train: pd.DataFrame,
+def compare_feature_sets(train,
                          y_train: pd.Series,
                          feature_sets: Dict[str, List[str]],
                          cv_func,
@@ -182,9 +442,13 @@ def compare_feature_sets(train: pd.DataFrame,
     """
     複数の特徴量セットの性能を比較
     
+    train に FeatureMatrix を渡すと、各特徴量セットは float32 の列優先配列
+    （連続した列ならビュー）として cv_func に渡され、DataFrame のスライスと
+    モデル側での float 変換の二重コピーが発生しない。
+    
     Parameters:
     -----------
-    train : pd.DataFrame
+    train : pd.DataFrame or FeatureMatrix
         訓練データ
     y_train : pd.Series
         目的変数
@@ -202,7 +466,7 @@ def compare_feature_sets(train: pd.DataFrame,
     results = []
     
     for set_name, features in feature_sets.items():
-        X = train[features]
+        X = as_model_input(train, features)
         cv_scores = cv_func(X, y_train, **cv_kwargs)
         
         results.append({
@@ -214,3 +478,169 @@ def compare_feature_sets(train: pd.DataFrame,
         })
     
     return pd.DataFrame(results)
+
+
+def _take_rows(X, idx: np.ndarray):
+    """DataFrame / 配列から行の部分集合を取り出す"""
+    if isinstance(X, (pd.DataFrame, pd.Series)):
+        return X.iloc[idx]
+    return X[idx]
+
+
+def compare_feature_sets_proxy(train,
+                               y_train: pd.Series,
+                               feature_sets: Dict[str, List[str]],
+                               cv_func,
+                               baseline: str = None,
+                               sizes: Tuple = (50_000, 200_000, None),
+                               confidence: float = 0.95,
+                               higher_is_better: bool = True,
+                               calibrate: bool = False,
+                               seed: int = 42,
+                               verbose: bool = True,
+                               **cv_kwargs) -> Tuple[pd.DataFrame, Dict]:
+    """
+    層化した行の部分集合で特徴量セットを比較し、差が曖昧な場合のみ行数を増やす（プロキシ評価）
+
+    各サイズでベースラインとの差をフォールドごとに計算し（同じ行・同じ分割での対応のある差）、
+    t分布による信頼区間が 0 を含まなければその時点で判定を確定する。0 を含む場合は
+    次のサイズ（None は全行）で再評価する。部分集合は入れ子になっているため、
+    小さいサイズの行は大きいサイズにも含まれる。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame or FeatureMatrix
+        訓練データ
+    y_train : pd.Series
+        目的変数
+    feature_sets : Dict[str, List[str]]
+        特徴量セットの辞書
+    cv_func : callable
+        交差検証関数（フォールドごとのスコアのリストを返す。lgb_cv など）
+    baseline : str, optional
+        比較の基準とする特徴量セット名（デフォルト: 最初のセット）
+    sizes : Tuple
+        評価する行数の列（昇順、None: 全行）
+    confidence : float
+        信頼区間の水準
+    higher_is_better : bool
+        スコアが大きいほど良いか（AUC: True、log loss: False）
+    calibrate : bool
+        判定が確定したセットも全行で評価し、全行での差・信頼区間（full_* カラム）と
+        プロキシと全行のスコアの相関を求めるか（False の場合、相関は全行まで評価したセットのみで計算する）
+    seed : int
+        部分集合のシード
+    verbose : bool
+        サイズごとの判定を表示するか
+    **cv_kwargs : dict
+        交差検証関数に渡す引数
+
+    Returns:
+    --------
+    Tuple[pd.DataFrame, Dict] : (各特徴量セットの判定結果, キャリブレーション情報)
+        判定結果の decision / delta / ci_low / ci_high / mean_cv_score は decision_n_rows 行での値
+        キャリブレーション情報: {'history': 全評価のデータフレーム,
+                                 'proxy_full_correlation': 最小サイズと全行のスコアの相関係数,
+                                 'n_pairs': 相関の計算に使ったセット数}
+    """
+    from scipy import stats
+    from .cv import stratified_subsample
+
+    names = list(feature_sets)
+    baseline = names[0] if baseline is None else baseline
+    y_values = np.asarray(y_train)
+    n_total = len(y_values)
+    sizes = [size if size is not None and size < n_total else None for size in sizes]
+    if sizes[-1] is not None:
+        sizes.append(None)
+
+    history = []
+    cache = {}
+
+    def evaluate(name: str, size) -> np.ndarray:
+        if (name, size) not in cache:
+            idx = stratified_subsample(y_values, size, seed=seed)
+            X = _take_rows(as_model_input(train, feature_sets[name]), idx)
+            scores = np.asarray(cv_func(X, _take_rows(y_train, idx), **cv_kwargs), dtype=np.float64)
+            cache[(name, size)] = scores
+            history.append({'feature_set': name, 'n_rows': len(idx),
+                            'mean_cv_score': scores.mean(), 'std_cv_score': scores.std()})
+        return cache[(name, size)]
+
+    def n_rows_of(size) -> int:
+        return n_total if size is None else len(stratified_subsample(y_values, size, seed=seed))
+
+    def paired_delta(name: str, size) -> Tuple[float, float, float]:
+        """ベースラインとのフォールドごとの差の平均と t 分布の信頼区間"""
+        diff = evaluate(name, size) - evaluate(baseline, size)
+        if not higher_is_better:
+            diff = -diff
+        half_width = 0.0
+        if len(diff) > 1:
+            half_width = stats.t.ppf(0.5 + confidence / 2, len(diff) - 1) * diff.std(ddof=1) / np.sqrt(len(diff))
+        return diff.mean(), diff.mean() - half_width, diff.mean() + half_width
+
+    results = {name: {'feature_set': name, 'n_features': len(feature_sets[name])} for name in names}
+    results[baseline].update({'decision': 'baseline', 'delta': 0.0, 'ci_low': 0.0, 'ci_high': 0.0})
+    # 判定を確定したサイズ（ベースラインは評価した最大のサイズ）
+    decision_size = {}
+    pending = [name for name in names if name != baseline]
+
+    for size in sizes:
+        if not pending:
+            break
+        decision_size[baseline] = size
+        n_rows = n_rows_of(size)
+        undecided = []
+        for name in pending:
+            delta, ci_low, ci_high = paired_delta(name, size)
+            if ci_low > 0:
+                decision = 'better'
+            elif ci_high < 0:
+                decision = 'worse'
+            else:
+                decision = 'tie' if size is None else None
+
+            results[name].update({'delta': delta, 'ci_low': ci_low, 'ci_high': ci_high, 'decision': decision})
+            decision_size[name] = size
+            if decision is None:
+                undecided.append(name)
+            if verbose:
+                print(f'{n_rows:,}行: {name} Δ={delta:+.5f} '
+                      f'[{ci_low:+.5f}, {ci_high:+.5f}] → {decision or "判定保留"}')
+        pending = undecided
+
+    # 判定・差・信頼区間・スコアはすべて判定を確定したサイズの値
+    for name in names:
+        scores = cache[(name, decision_size[name])]
+        results[name].update({'decision_n_rows': n_rows_of(decision_size[name]),
+                              'mean_cv_score': scores.mean(), 'std_cv_score': scores.std(),
+                              'features': feature_sets[name]})
+
+    # キャリブレーションでは全行での差・信頼区間・スコアを別のカラムに記録する
+    if calibrate:
+        for name in names:
+            full_scores = evaluate(name, None)
+            full_delta, full_ci_low, full_ci_high = (0.0, 0.0, 0.0) if name == baseline else paired_delta(name, None)
+            results[name].update({'full_delta': full_delta, 'full_ci_low': full_ci_low,
+                                  'full_ci_high': full_ci_high, 'full_mean_cv_score': full_scores.mean()})
+
+    # 最小サイズと全行の両方で評価したセットについて、スコアの相関を求める
+    pairs = [(cache[(name, sizes[0])].mean(), cache[(name, None)].mean())
+             for name in names if (name, sizes[0]) in cache and (name, None) in cache]
+    correlation = None
+    if len(pairs) >= 3 and sizes[0] is not None:
+        proxy, full = np.array(pairs).T
+        correlation = float(np.corrcoef(proxy, full)[0, 1])
+
+    calibration = {
+        'history': pd.DataFrame(history),
+        'proxy_full_correlation': correlation,
+        'n_pairs': len(pairs),
+    }
+    columns = ['feature_set', 'n_features', 'decision', 'decision_n_rows', 'delta', 'ci_low', 'ci_high',
+               'mean_cv_score', 'std_cv_score']
+    if calibrate:
+        columns += ['full_delta', 'full_ci_low', 'full_ci_high', 'full_mean_cv_score']
+    columns.append('features')
+    return pd.DataFrame([results[name] for name in names])[columns], calibration
@@ -0,0 +1,158 @@
+"""
+確率的データ構造
+高カーディナリティのカテゴリ変数向けのCount-Min Sketchなど
+"""
+import pandas as pd
+import numpy as np
+
+
+# 64bitハッシュ混合用の定数（splitmix64）
+_MIX_MULT_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_MULT_2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_values(values) -> np.ndarray:
+    """
+    任意の配列（文字列・数値・カテゴリ）をベクトル化して uint64 にハッシュ
+
+    Parameters:
+    -----------
+    values : array-like
+        ハッシュする値
+
+    Returns:
+    --------
+    np.ndarray : uint64 のハッシュ値
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy()
+    return pd.util.hash_array(np.asarray(values), categorize=True)
+
+
+def mix_hash(hashes: np.ndarray, seed: int) -> np.ndarray:
+    """ベースのハッシュ値をシードごとに独立なハッシュへ混合（splitmix64）"""
+    with np.errstate(over='ignore'):
+        z = hashes + _GOLDEN * np.uint64(seed + 1)
+        z = (z ^ (z >> np.uint64(30))) * _MIX_MULT_1
+        z = (z ^ (z >> np.uint64(27))) * _MIX_MULT_2
+        return z ^ (z >> np.uint64(31))
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch（近似頻度カウント）
+
+    誤差保証: 推定頻度 <= 真の頻度 + epsilon * 総件数 が確率 1 - delta 以上で成立
+    （過小評価はしない）。チャンクごとの update() や、別プロセスで作成した
+    スケッチとの merge() が可能。
+
+    Parameters:
+    -----------
+    width : int
+        各行のバケット数
+    depth : int
+        ハッシュ関数（行）の数
+    seed : int
+        ハッシュのシード
+    """
+
+    def __init__(self, width: int = 2 ** 16, depth: int = 4, seed: int = 0):
+        self.width = int(width)
+        self.depth = int(depth)
+        self.seed = int(seed)
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    @classmethod
+    def from_error(cls, epsilon: float = 1e-4, delta: float = 1e-3, seed: int = 0) -> 'CountMinSketch':
+        """
+        誤差上限からサイズを決めてスケッチを作成
+
+        Parameters:
+        -----------
+        epsilon : float
+            相対誤差の上限（総件数に対する割合）
+        delta : float
+            誤差上限を超える確率
+
+        Returns:
+        --------
+        CountMinSketch
+        """
+        width = int(np.ceil(np.e / epsilon))
+        depth = int(np.ceil(np.log(1.0 / delta)))
+        return cls(width=width, depth=max(depth, 1), seed=seed)
+
+    def _buckets(self, values) -> tuple:
+        """欠損以外の値について各行のバケット位置 (depth, n) とマスクを返す"""
+        mask = ~pd.isna(values)
+        hashes = hash_values(np.asarray(values)[mask])
+        buckets = np.empty((self.depth, len(hashes)), dtype=np.int64)
+        for i in range(self.depth):
+            buckets[i] = (mix_hash(hashes, self.seed * self.depth + i) % np.uint64(self.width)).astype(np.int64)
+        return buckets, mask
+
+    def update(self, values) -> 'CountMinSketch':
+        """
+        値の配列でカウントを更新（欠損値は無視）
+
+        Parameters:
+        -----------
+        values : array-like
+            カウントする値（1チャンク分）
+
+        Returns:
+        --------
+        CountMinSketch : self
+        """
+        buckets, mask = self._buckets(values)
+        for i in range(self.depth):
+            self.table[i] += np.bincount(buckets[i], minlength=self.width)
+        self.total += int(mask.sum())
+        return self
+
+    def query(self, values) -> np.ndarray:
+        """
+        値の推定頻度を返す（欠損値は NaN）
+
+        Parameters:
+        -----------
+        values : array-like
+            頻度を取得する値
+
+        Returns:
+        --------
+        np.ndarray : float64 の推定頻度
+        """
+        buckets, mask = self._buckets(values)
+        estimates = self.table[0, buckets[0]]
+        for i in range(1, self.depth):
+            estimates = np.minimum(estimates, self.table[i, buckets[i]])
+        result = np.full(len(mask), np.nan)
+        result[mask] = estimates
+        return result
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        """
+        同じサイズ・シードのスケッチを加算して統合
+
+        Parameters:
+        -----------
+        other : CountMinSketch
+            統合するスケッチ
+
+        Returns:
+        --------
+        CountMinSketch : self
+        """
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError('width, depth, seed が同じスケッチのみ統合できます')
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    @property
+    def error_bound(self) -> float:
+        """現在の総件数に対する推定誤差の上限（件数）"""
+        return np.e / self.width * self.total
@@ -0,0 +1,149 @@
+"""
+疎行列（scipy.sparse）による特徴量出力
+One-Hotエンコーディングやクロス特徴量を密なデータフレームに展開せずに扱う
+"""
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from typing import List, Tuple
+
+
+def _rows_to_csr(indices: np.ndarray, valid: np.ndarray, n_features: int) -> sp.csr_matrix:
+    """
+    (n_rows, n_cols) の列インデックス行列から CSR 行列を作成
+
+    各行は最大 n_cols 個の非ゼロ（値 1）を持つ。valid=False の要素は非ゼロにしない。
+    """
+    n_rows = indices.shape[0]
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+    col_idx = indices[valid].astype(np.int32)
+    data = np.ones(len(col_idx), dtype=np.float32)
+    matrix = sp.csr_matrix((data, col_idx, indptr), shape=(n_rows, n_features))
+    # 同じ行に重複した列（ハッシュ衝突）は加算する
+    matrix.sum_duplicates()
+    return matrix
+
+
+def one_hot_encode_sparse(train: pd.DataFrame, test: pd.DataFrame,
+                          categorical_cols: List[str],
+                          min_count: int = 1,
+                          n_buckets: int = None,
+                          seed: int = 0) -> tuple:
+    """
+    カテゴリ変数を疎行列（CSR）にOne-Hotエンコーディング
+
+    メモリは非ゼロ要素数（行数 × カラム数）に比例し、カテゴリ数には依存しない。
+    cross_encode() で作成したクロス特徴量のキーカラムもそのまま渡せる。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    categorical_cols : List[str]
+        エンコーディングするカテゴリ変数のリスト
+    min_count : int
+        訓練・テスト合計でこの件数未満のカテゴリは列を作らない（語彙モードのみ）
+    n_buckets : int, optional
+        指定した場合は語彙を持たず、(カラム, 値) をハッシュして n_buckets 列に割り当てる
+    seed : int
+        ハッシュのシード
+
+    Returns:
+    --------
+    tuple : (X_train, X_test, feature_names)
+        X_train, X_test: scipy.sparse.csr_matrix (float32)
+        feature_names: 列名のリスト（ハッシュモードでは 'hash_{i}'）
+    """
+    from .sketch import hash_values, mix_hash
+
+    categorical_cols = [col for col in categorical_cols if col in train.columns]
+    n_train = len(train)
+    n_total = n_train + len(test)
+
+    indices = np.zeros((n_total, len(categorical_cols)), dtype=np.int64)
+    valid = np.zeros((n_total, len(categorical_cols)), dtype=bool)
+    feature_names = []
+    offset = 0
+
+    for j, col in enumerate(categorical_cols):
+        combined = pd.concat([train[col], test[col]], axis=0, ignore_index=True)
+
+        if n_buckets is not None:
+            # 値のハッシュにカラム番号を混ぜて、カラム間で同じ値が衝突しないようにする
+            valid[:, j] = ~combined.isna().to_numpy()
+            hashes = mix_hash(hash_values(combined), seed * 1_000_003 + j)
+            indices[:, j] = (hashes % np.uint64(n_buckets)).astype(np.int64)
+            continue
+
+        codes, uniques = pd.factorize(combined)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        keep = counts >= min_count
+        # 残すカテゴリに連番の列番号を振る（除外カテゴリは -1）
+        remap = np.where(keep, np.cumsum(keep) - 1, -1)
+        col_codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+
+        valid[:, j] = col_codes >= 0
+        indices[:, j] = offset + np.maximum(col_codes, 0)
+        feature_names.extend(f'{col}={value}' for value in uniques[keep])
+        offset += int(keep.sum())
+
+    if n_buckets is not None:
+        n_features = n_buckets
+        feature_names = [f'hash_{i}' for i in range(n_buckets)]
+    else:
+        n_features = offset
+
+    X_train = _rows_to_csr(indices[:n_train], valid[:n_train], n_features)
+    X_test = _rows_to_csr(indices[n_train:], valid[n_train:], n_features)
+
+    return X_train, X_test, feature_names
+
+
+def hstack_features(dense, *sparse_blocks, dense_names: List[str] = None,
+                    sparse_names: List[List[str]] = None) -> Tuple[sp.csr_matrix, List[str]]:
+    """
+    密な数値特徴量と疎行列を横方向に結合（密な展開はしない）
+
+    結果の CSR 行列は lightgbm.Dataset / xgboost.DMatrix にそのまま渡せる。
+    密ブロックの 0 は格納されないが、値 0 として扱われる（NaN は保持される）。
+
+    Parameters:
+    -----------
+    dense : pd.DataFrame or np.ndarray or None
+        数値特徴量
+    *sparse_blocks : scipy.sparse matrix
+        結合する疎行列（one_hot_encode_sparse() の出力など）
+    dense_names : List[str], optional
+        dense の列名（DataFrameの場合はカラム名を使用）
+    sparse_names : List[List[str]], optional
+        各疎行列の列名リスト
+
+    Returns:
+    --------
+    Tuple[sp.csr_matrix, List[str]] : (結合した CSR 行列 (float32), 列名のリスト)
+    """
+    blocks = []
+    names = []
+
+    if dense is not None:
+        if isinstance(dense, pd.DataFrame):
+            dense_names = dense.columns.tolist() if dense_names is None else dense_names
+            dense = dense.to_numpy(dtype=np.float32)
+        dense = np.asarray(dense, dtype=np.float32)
+        blocks.append(sp.csr_matrix(dense))
+        names.extend(dense_names if dense_names is not None else [f'dense_{i}' for i in range(dense.shape[1])])
+
+    for i, block in enumerate(sparse_blocks):
+        blocks.append(sp.csr_matrix(block, dtype=np.float32))
+        if sparse_names is not None:
+            names.extend(sparse_names[i])
+        else:
+            names.extend(f'sparse{i}_{j}' for j in range(block.shape[1]))
+
+    if not blocks:
+        raise ValueError('結合する特徴量がありません')
+
+    return sp.hstack(blocks, format='csr', dtype=np.float32), names
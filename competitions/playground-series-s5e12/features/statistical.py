@@ -176,7 +176,8 @@ def create_bmi_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def create_all_statistical_features(train: pd.DataFrame, test: pd.DataFrame) -> tuple:
+def create_all_statistical_features(train: pd.DataFrame, test: pd.DataFrame,
+                                    n_jobs: int = 1, backend: str = 'thread') -> tuple:
     """
     すべての統計的特徴量を作成
     
@@ -186,11 +187,28 @@ def create_all_statistical_features(train: pd.DataFrame, test: pd.DataFrame) ->
         訓練データ
     test : pd.DataFrame
         テストデータ
+    n_jobs : int
+        並列ワーカー数（1: 直列実行、-1: 全コア）
+    backend : str
+        並列実行時のバックエンド（'thread' または 'process'）
     
     Returns:
     --------
     tuple : (train, test) 特徴量を追加したデータフレーム
     """
+    builders = [
+        create_cholesterol_features,
+        create_blood_pressure_features,
+        create_lifestyle_features,
+        create_age_features,
+        create_bmi_features,
+    ]
+    
+    # 並列モード: 行チャンクごとに全特徴量関数を適用
+    if n_jobs != 1:
+        from .parallel import apply_features_parallel_train_test
+        return apply_features_parallel_train_test(train, test, builders, n_jobs=n_jobs, backend=backend)
+    
     train = train.copy()
     test = test.copy()
     
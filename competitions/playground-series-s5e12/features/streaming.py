@@ -0,0 +1,468 @@
+"""
+ストリーミング統計量
+チャンク単位で更新・プロセス間で統合できる集計器（Welford法 + t-digest風の分位点スケッチ）
+"""
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Iterable, List
+
+
+def _merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b) -> tuple:
+    """(件数, 平均, 偏差平方和) を統合（Chanの並列アルゴリズム）"""
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        ratio = np.where(n > 0, n_b / np.where(n > 0, n, 1), 0.0)
+        mean = mean_a + delta * ratio
+        m2 = m2_a + m2_b + delta ** 2 * n_a * ratio
+    return n, mean, m2
+
+
+class RunningStats:
+    """
+    カラムごとの件数・平均・分散・最小・最大をチャンク単位で更新（欠損値は無視）
+
+    標準化など、全データをメモリに載せずに正規化パラメータを求める用途に使う。
+
+    Parameters:
+    -----------
+    columns : List[str], optional
+        カラム名（update() に DataFrame を渡した場合は自動で設定）
+    """
+
+    def __init__(self, columns: List[str] = None):
+        self.columns = list(columns) if columns is not None else None
+        self.count = None
+        self.mean = None
+        self.m2 = None
+        self.min = None
+        self.max = None
+
+    def update(self, X) -> 'RunningStats':
+        """
+        チャンクで統計量を更新
+
+        Parameters:
+        -----------
+        X : pd.DataFrame or np.ndarray
+            (n_rows, n_columns) のチャンク
+
+        Returns:
+        --------
+        RunningStats : self
+        """
+        if isinstance(X, pd.DataFrame):
+            if self.columns is None:
+                self.columns = X.columns.tolist()
+            X = X[self.columns].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[:, None]
+
+        valid = ~np.isnan(X)
+        n_b = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(n_b > 0, np.nansum(X, axis=0) / np.maximum(n_b, 1), 0.0)
+        m2_b = np.nansum((X - mean_b) ** 2, axis=0)
+        min_b = np.where(n_b > 0, np.nanmin(np.where(valid, X, np.inf), axis=0), np.inf)
+        max_b = np.where(n_b > 0, np.nanmax(np.where(valid, X, -np.inf), axis=0), -np.inf)
+
+        if self.count is None:
+            self.count, self.mean, self.m2 = n_b, mean_b, m2_b
+            self.min, self.max = min_b, max_b
+        else:
+            self.count, self.mean, self.m2 = _merge_moments(
+                self.count, self.mean, self.m2, n_b, mean_b, m2_b
+            )
+            self.min = np.minimum(self.min, min_b)
+            self.max = np.maximum(self.max, max_b)
+        return self
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """
+        別のチャンク／プロセスで計算した統計量を統合
+
+        Parameters:
+        -----------
+        other : RunningStats
+            統合する統計量（同じカラム順）
+
+        Returns:
+        --------
+        RunningStats : self
+        """
+        if other.count is None:
+            return self
+        if self.count is None:
+            self.columns = other.columns
+            self.count, self.mean, self.m2 = other.count.copy(), other.mean.copy(), other.m2.copy()
+            self.min, self.max = other.min.copy(), other.max.copy()
+            return self
+        self.count, self.mean, self.m2 = _merge_moments(
+            self.count, self.mean, self.m2, other.count, other.mean, other.m2
+        )
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    @property
+    def var(self) -> np.ndarray:
+        """不偏分散（ddof=1）"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        """標準偏差（ddof=1、pandasの std() と同じ）"""
+        return np.sqrt(self.var)
+
+    def transform(self, X) -> np.ndarray:
+        """
+        平均0・標準偏差1に標準化
+
+        Parameters:
+        -----------
+        X : pd.DataFrame or np.ndarray
+            変換するデータ
+
+        Returns:
+        --------
+        np.ndarray : 標準化後の配列（float64）
+        """
+        if isinstance(X, pd.DataFrame):
+            X = X[self.columns].to_numpy(dtype=np.float64)
+        std = np.where(self.std > 0, self.std, 1.0)
+        return (np.asarray(X, dtype=np.float64) - self.mean) / std
+
+    def to_frame(self) -> pd.DataFrame:
+        """カラムごとの統計量をデータフレームで返す"""
+        return pd.DataFrame({
+            'count': self.count, 'mean': self.mean, 'std': self.std,
+            'min': self.min, 'max': self.max
+        }, index=self.columns)
+
+
+def _compress_centroids(codes: np.ndarray, means: np.ndarray, weights: np.ndarray,
+                        compression: int) -> tuple:
+    """
+    グループごとのセントロイド（値, 重み）を最大 compression+1 個に圧縮（t-digest k1 スケール）
+
+    すべてのグループを1回のソートとbincountでまとめて処理する。
+    """
+    if len(codes) == 0:
+        return codes, means, weights
+
+    order = np.lexsort((means, codes))
+    codes, means, weights = codes[order], means[order], weights[order]
+
+    # グループ内の累積重みから分位点位置を計算
+    totals = np.bincount(codes, weights=weights)
+    cum = np.cumsum(weights)
+    group_start = np.concatenate([[0.0], np.cumsum(totals)])[codes]
+    q = (cum - group_start - weights / 2) / totals[codes]
+
+    # k1 スケール: 裾ほど細かいビンになる
+    bins = np.floor(compression * (np.arcsin(np.clip(2 * q - 1, -1, 1)) / np.pi + 0.5)).astype(np.int64)
+    ids = codes * (compression + 1) + bins
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+
+    new_weights = np.bincount(inverse, weights=weights)
+    new_means = np.bincount(inverse, weights=means * weights) / new_weights
+    new_codes = unique_ids // (compression + 1)
+    return new_codes, new_means, new_weights
+
+
+class GroupStats:
+    """
+    グループ（カテゴリ値）ごとの件数・平均・分散・最小・最大・近似分位点をチャンク単位で集計
+
+    update() でチャンクを追加し、merge() で別プロセスの結果と統合できる。
+    分位点は t-digest 風の統合可能なセントロイドで近似する。
+
+    Parameters:
+    -----------
+    compression : int
+        分位点スケッチの1グループあたりの最大セントロイド数（0 の場合は分位点を計算しない）
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.keys = pd.Index([])
+        self.count = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+        # 分位点スケッチ（グループキー, セントロイド値, 重み）
+        self._centroid_keys = np.zeros(0, dtype=object)
+        self._centroid_means = np.zeros(0)
+        self._centroid_weights = np.zeros(0)
+
+    def _align(self, keys: pd.Index) -> None:
+        """既存の集計を新しいキーの和集合に拡張"""
+        new_keys = self.keys.append(keys.difference(self.keys)) if len(self.keys) else keys
+        if len(new_keys) == len(self.keys):
+            return
+        n_new = len(new_keys) - len(self.keys)
+        self.keys = new_keys
+        self.count = np.concatenate([self.count, np.zeros(n_new)])
+        self.mean = np.concatenate([self.mean, np.zeros(n_new)])
+        self.m2 = np.concatenate([self.m2, np.zeros(n_new)])
+        self.min = np.concatenate([self.min, np.full(n_new, np.inf)])
+        self.max = np.concatenate([self.max, np.full(n_new, -np.inf)])
+
+    def _combine(self, keys: pd.Index, count, mean, m2, vmin, vmax,
+                 c_keys, c_means, c_weights) -> 'GroupStats':
+        """集計済みの値（keys ごとの配列）を統合"""
+        self._align(keys)
+        pos = self.keys.get_indexer(keys)
+        self.count[pos], self.mean[pos], self.m2[pos] = _merge_moments(
+            self.count[pos], self.mean[pos], self.m2[pos], count, mean, m2
+        )
+        self.min[pos] = np.minimum(self.min[pos], vmin)
+        self.max[pos] = np.maximum(self.max[pos], vmax)
+
+        if self.compression:
+            all_keys = np.concatenate([self._centroid_keys, c_keys])
+            codes = self.keys.get_indexer(all_keys)
+            codes, means, weights = _compress_centroids(
+                codes,
+                np.concatenate([self._centroid_means, c_means]),
+                np.concatenate([self._centroid_weights, c_weights]),
+                self.compression
+            )
+            self._centroid_keys = self.keys.to_numpy()[codes]
+            self._centroid_means = means
+            self._centroid_weights = weights
+        return self
+
+    def update(self, keys, values) -> 'GroupStats':
+        """
+        チャンクで集計を更新（キーまたは値が欠損の行は無視）
+
+        Parameters:
+        -----------
+        keys : array-like
+            グループキー
+        values : array-like
+            集計する数値
+
+        Returns:
+        --------
+        GroupStats : self
+        """
+        chunk = pd.DataFrame({'key': np.asarray(keys), 'value': np.asarray(values, dtype=np.float64)})
+        chunk = chunk.dropna()
+        if len(chunk) == 0:
+            return self
+
+        grouped = chunk.groupby('key', sort=False)['value']
+        agg = grouped.agg(['count', 'mean', 'min', 'max'])
+        deviation = chunk['value'] - chunk['key'].map(agg['mean'])
+        m2 = (deviation ** 2).groupby(chunk['key'], sort=False).sum().reindex(agg.index)
+
+        if self.compression:
+            # 各値を重み1のセントロイドとして追加し、まとめて圧縮
+            c_keys, c_means = chunk['key'].to_numpy(), chunk['value'].to_numpy()
+            c_weights = np.ones(len(chunk))
+        else:
+            c_keys, c_means, c_weights = np.zeros(0, dtype=object), np.zeros(0), np.zeros(0)
+
+        return self._combine(
+            agg.index, agg['count'].to_numpy(np.float64), agg['mean'].to_numpy(),
+            m2.to_numpy(), agg['min'].to_numpy(), agg['max'].to_numpy(),
+            c_keys, c_means, c_weights
+        )
+
+    def merge(self, other: 'GroupStats') -> 'GroupStats':
+        """
+        別のチャンク／プロセスで集計した GroupStats を統合
+
+        Parameters:
+        -----------
+        other : GroupStats
+            統合する集計
+
+        Returns:
+        --------
+        GroupStats : self
+        """
+        if len(other.keys) == 0:
+            return self
+        return self._combine(
+            other.keys, other.count, other.mean, other.m2, other.min, other.max,
+            other._centroid_keys, other._centroid_means, other._centroid_weights
+        )
+
+    def quantile(self, q: float) -> pd.Series:
+        """
+        グループごとの近似分位点
+
+        Parameters:
+        -----------
+        q : float
+            分位点（0〜1）
+
+        Returns:
+        --------
+        pd.Series : キー → 分位点
+        """
+        if not self.compression:
+            raise ValueError('compression=0 のため分位点は計算できません')
+
+        codes = self.keys.get_indexer(self._centroid_keys)
+        order = np.lexsort((self._centroid_means, codes))
+        codes, means, weights = codes[order], self._centroid_means[order], self._centroid_weights[order]
+
+        n_keys = len(self.keys)
+        group_ids = np.arange(n_keys, dtype=np.float64)
+        totals = np.bincount(codes, weights=weights, minlength=n_keys)
+        group_start = np.concatenate([[0.0], np.cumsum(totals)])
+        mid = (np.cumsum(weights) - weights / 2 - group_start[codes]) / totals[codes]
+
+        # グループコード + グループ内位置(0〜1) を1次元の単調な位置にして一括で線形補間
+        # 各グループの両端には最小値・最大値を置く
+        eps = 1e-9
+        position = np.concatenate([group_ids, codes + np.clip(mid, eps, 1 - 2 * eps), group_ids + 1 - eps])
+        values = np.concatenate([self.min, means, self.max])
+        order = np.argsort(position, kind='stable')
+        position, values = position[order], values[order]
+
+        targets = group_ids + np.clip(q, 0, 1 - 2 * eps)
+        right = np.clip(np.searchsorted(position, targets, side='right'), 1, len(position) - 1)
+        left = right - 1
+        span = position[right] - position[left]
+        frac = np.clip((targets - position[left]) / np.where(span > 0, span, 1.0), 0, 1)
+        result = values[left] + (values[right] - values[left]) * frac
+        return pd.Series(result, index=self.keys)
+
+    def result(self, stats: List[str] = ['count', 'mean', 'std', 'min', 'max']) -> pd.DataFrame:
+        """
+        グループごとの統計量をデータフレームで返す
+
+        Parameters:
+        -----------
+        stats : List[str]
+            'count', 'mean', 'std', 'var', 'min', 'max', 'q{百分位}'（例: 'q25'）
+
+        Returns:
+        --------
+        pd.DataFrame : キーをインデックスとする統計量
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+        values = {
+            'count': self.count, 'mean': self.mean, 'var': var, 'std': np.sqrt(var),
+            'min': self.min, 'max': self.max
+        }
+        out = {}
+        for stat in stats:
+            if stat in values:
+                out[stat] = values[stat]
+            elif stat.startswith('q'):
+                out[stat] = self.quantile(float(stat[1:]) / 100.0).to_numpy()
+            else:
+                raise ValueError(f'未対応の統計量です: {stat}')
+        return pd.DataFrame(out, index=self.keys)
+
+
+def fit_group_aggregations_chunked(chunks: Iterable[pd.DataFrame],
+                                   group_cols: List[str],
+                                   num_cols: List[str],
+                                   compression: int = 100,
+                                   n_jobs: int = 1) -> Dict[tuple, GroupStats]:
+    """
+    チャンクのイテレータから groupby 集計をストリーミングで計算
+
+    pd.read_csv(..., chunksize=...) の出力を渡せば、全データをメモリに載せずに集計できる。
+    n_jobs > 1 の場合はチャンクごとの集計をスレッドで並列化し、終わった順に統合する
+    （同時に保持するチャンクは 2 × n_jobs 個まで）。
+
+    Parameters:
+    -----------
+    chunks : Iterable[pd.DataFrame]
+        データのチャンク
+    group_cols : List[str]
+        グループ化するカテゴリ変数のリスト
+    num_cols : List[str]
+        集計する数値変数のリスト
+    compression : int
+        分位点スケッチのサイズ（0: 分位点なし）
+    n_jobs : int
+        並列スレッド数（-1: 全コア）
+
+    Returns:
+    --------
+    Dict[tuple, GroupStats] : (group_col, num_col) → GroupStats
+    """
+    def fit_chunk(chunk: pd.DataFrame) -> Dict[tuple, GroupStats]:
+        partial = {}
+        for cat_col in group_cols:
+            for num_col in num_cols:
+                if cat_col in chunk.columns and num_col in chunk.columns:
+                    partial[(cat_col, num_col)] = GroupStats(compression).update(chunk[cat_col], chunk[num_col])
+        return partial
+
+    fitted = {}
+
+    def merge_partial(partial: Dict[tuple, GroupStats]) -> None:
+        for key, stats in partial.items():
+            if key in fitted:
+                fitted[key].merge(stats)
+            else:
+                fitted[key] = stats
+
+    if n_jobs == 1:
+        for chunk in chunks:
+            merge_partial(fit_chunk(chunk))
+    else:
+        n_workers = n_jobs if n_jobs > 0 else (os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            # 実行中のチャンクを 2 × n_workers 個までに制限し、終わった順に統合する
+            # （executor.map はイテレータを先に読み切るため、全チャンクがメモリに載ってしまう）
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(fit_chunk, chunk))
+                if len(pending) >= 2 * n_workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        merge_partial(future.result())
+            for future in as_completed(pending):
+                merge_partial(future.result())
+
+    return fitted
+
+
+def apply_group_aggregations(df: pd.DataFrame,
+                             fitted: Dict[tuple, GroupStats],
+                             stats: List[str] = ['mean', 'std']) -> pd.DataFrame:
+    """
+    fit_group_aggregations_chunked() の結果を特徴量として追加
+
+    カラム名はノートブックと同じ '{cat_col}_{num_col}_{stat}'（未知のカテゴリは 0）。
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    fitted : Dict[tuple, GroupStats]
+        fit_group_aggregations_chunked() の戻り値
+    stats : List[str]
+        追加する統計量（'count', 'mean', 'std', 'min', 'max', 'q25' など）
+
+    Returns:
+    --------
+    pd.DataFrame : 特徴量を追加したデータフレーム
+    """
+    df = df.copy()
+
+    for (cat_col, num_col), group_stats in fitted.items():
+        if cat_col not in df.columns:
+            continue
+        table = group_stats.result(stats)
+        for stat in stats:
+            df[f'{cat_col}_{num_col}_{stat}'] = df[cat_col].map(table[stat]).fillna(0)
+
+    return df
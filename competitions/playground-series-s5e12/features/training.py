@@ -0,0 +1,317 @@
+"""
+複数モデルの学習オーケストレーター
+設定ファイルの model セクションから LightGBM / XGBoost × シードの学習をスケジュールし、OOF・テスト予測を1つの保存先に集める
+"""
+import json
+import os
+import threading
+import time
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Union
+
+from .cv import build_fold_datasets, make_folds, train_booster, _HIGHER_IS_BETTER
+from .ensemble import PredictionStore
+from .matrix import FeatureMatrix, build_feature_matrix
+
+
+# 設定ファイルの metric → (LightGBM の指標名, XGBoost の指標名)
+_METRIC_NAMES = {
+    'auc': ('auc', 'auc'),
+    'log_loss': ('binary_logloss', 'logloss'),
+    'binary_logloss': ('binary_logloss', 'logloss'),
+}
+
+_MODEL_TYPES = ('lightgbm', 'xgboost')
+
+# run_training() の戻り値のカラム（PredictionStore の meta.json にも保存される）
+_RESULT_COLUMNS = ['run', 'type', 'seed', 'metric', 'cv_score', 'cv_std',
+                   'fold_scores', 'best_iterations', 'num_threads', 'seconds']
+
+
+class _CpuSlots:
+    """
+    CPUスロット（スレッド数）の割り当て
+
+    各ジョブは必要なスロット数が空くまで待ち、終了時に返却する。
+    空きスロットより多く要求したジョブは全スロットに切り詰める。
+    """
+
+    def __init__(self, n_slots: int):
+        self.n_slots = n_slots
+        self.available = n_slots
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int) -> int:
+        n = min(max(1, n), self.n_slots)
+        with self._cond:
+            self._cond.wait_for(lambda: self.available >= n)
+            self.available -= n
+        return n
+
+    def release(self, n: int) -> None:
+        with self._cond:
+            self.available += n
+            self._cond.notify_all()
+
+
+def load_model_config(path: str = 'configs/default.json') -> Dict:
+    """
+    設定ファイルの model セクションを読み込み、学習ジョブの設定に正規化
+
+    model セクションの形式:
+        {
+            "n_folds": 5, "fold_seed": 42, "n_threads": null,
+            "num_boost_round": 2000, "early_stopping_rounds": 50,
+            "runs": [
+                {"name": "lgb", "type": "lightgbm", "seeds": [42, 43], "num_threads": 2, "params": {...}},
+                {"name": "xgb", "type": "xgboost", "seeds": [42], "num_threads": 2, "params": {...}}
+            ]
+        }
+    runs がない場合は {"name": "lightgbm", "params": {...}} を1つの run として扱う。
+    デフォルトの設定ファイルは LightGBM のみ。XGBoost の run は xgboost をインストールした
+    環境で runs に追加する（type が 'xgboost' の run がある場合のみ xgboost を読み込む）。
+
+    Parameters:
+    -----------
+    path : str
+        設定ファイル（JSON）のパス
+
+    Returns:
+    --------
+    Dict : model セクション（runs と既定値を補完済み、metric は設定ファイル直下の値）
+    """
+    with open(path) as f:
+        config = json.load(f)
+
+    model = dict(config.get('model', {}))
+    if 'runs' not in model:
+        name = model.pop('name', 'lightgbm')
+        model['runs'] = [{'name': name, 'type': name, 'params': model.pop('params', {})}]
+    model.setdefault('metric', config.get('metric', 'auc'))
+    model.setdefault('n_folds', 5)
+    model.setdefault('fold_seed', 42)
+    model.setdefault('num_boost_round', 2000)
+    model.setdefault('early_stopping_rounds', 50)
+
+    for run in model['runs']:
+        run.setdefault('type', run['name'])
+        run.setdefault('params', {})
+        run.setdefault('seeds', [model['fold_seed']])
+        if run['type'] not in _MODEL_TYPES:
+            raise ValueError(f"type は 'lightgbm' または 'xgboost': {run['type']}")
+    return model
+
+
+def _results_frame(records: List[Dict], higher_is_better: bool) -> pd.DataFrame:
+    """ジョブごとの結果をスコア順のデータフレームにまとめる"""
+    results = pd.DataFrame(records, columns=_RESULT_COLUMNS)
+    return results.sort_values('cv_score', ascending=not higher_is_better).reset_index(drop=True)
+
+
+def _build_xgb_folds(X: np.ndarray, y: np.ndarray, folds: List[Tuple[np.ndarray, np.ndarray]],
+                     n_threads: int) -> List[Tuple]:
+    """フォールドごとのXGBoost DMatrix（学習用, 検証用）を一度だけ作成"""
+    import xgboost as xgb
+
+    return [
+        (xgb.DMatrix(X[trn_idx], label=y[trn_idx], nthread=n_threads),
+         xgb.DMatrix(X[val_idx], label=y[val_idx], nthread=n_threads))
+        for trn_idx, val_idx in folds
+    ]
+
+
+def _train_lightgbm(params: Dict, fold_data: List[Tuple], X_test: np.ndarray,
+                    num_boost_round: int, early_stopping_rounds: int,
+                    metric: str) -> Tuple[List[np.ndarray], np.ndarray, List[float], List[int]]:
+    """作成済みのDatasetでフォールドごとに学習し、検証・テスト予測を返す"""
+    val_preds, test_pred, scores, iterations = [], np.zeros(len(X_test)), [], []
+    for dtrain, dvalid in fold_data:
+        booster, score, best_iteration = train_booster(
+            params, dtrain, dvalid, num_boost_round=num_boost_round,
+            early_stopping_rounds=early_stopping_rounds, metric=metric
+        )
+        val_preds.append(booster.predict(dvalid.get_data(), num_iteration=best_iteration))
+        test_pred += booster.predict(X_test, num_iteration=best_iteration) / len(fold_data)
+        scores.append(score)
+        iterations.append(best_iteration)
+    return val_preds, test_pred, scores, iterations
+
+
+def _train_xgboost(params: Dict, fold_data: List[Tuple], dtest,
+                   num_boost_round: int, early_stopping_rounds: int,
+                   metric: str) -> Tuple[List[np.ndarray], np.ndarray, List[float], List[int]]:
+    """作成済みのDMatrixでフォールドごとに学習し、検証・テスト予測を返す"""
+    import xgboost as xgb
+
+    params = dict(params)
+    params.setdefault('objective', 'binary:logistic')
+    params.setdefault('tree_method', 'hist')
+    params['eval_metric'] = metric
+    n_rows = dtest.num_row()
+
+    val_preds, test_pred, scores, iterations = [], np.zeros(n_rows), [], []
+    for dtrain, dvalid in fold_data:
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round,
+                            evals=[(dvalid, 'valid')],
+                            early_stopping_rounds=early_stopping_rounds or None,
+                            verbose_eval=False)
+        best_iteration = getattr(booster, 'best_iteration', num_boost_round - 1)
+        iteration_range = (0, best_iteration + 1)
+        val_preds.append(booster.predict(dvalid, iteration_range=iteration_range))
+        test_pred += booster.predict(dtest, iteration_range=iteration_range) / len(fold_data)
+        scores.append(float(booster.best_score) if hasattr(booster, 'best_score') else np.nan)
+        iterations.append(best_iteration + 1)
+    return val_preds, test_pred, scores, iterations
+
+
+def run_training(train: Union[pd.DataFrame, FeatureMatrix],
+                 test: Union[pd.DataFrame, FeatureMatrix],
+                 y,
+                 features: List[str] = None,
+                 config: Dict = None,
+                 config_path: str = 'configs/default.json',
+                 store: PredictionStore = None,
+                 n_threads: int = None,
+                 matrix_path_prefix: str = None,
+                 overwrite: bool = False,
+                 verbose: bool = True) -> pd.DataFrame:
+    """
+    model セクションの run × シードを学習し、OOF・テスト予測を PredictionStore に保存
+
+    特徴量行列（列優先 float32）とフォールドのインデックスは最初に一度だけ作成し、
+    ビン分け済みのLightGBM Dataset / XGBoost DMatrix もモデルの種類ごとに一度だけ作成して
+    全シードで共有する（フォールドは fold_seed で固定するため、各 run のOOFはそのままブレンドできる）。
+    ジョブ（run × シード）はスレッドプールで実行し、各ジョブは num_threads 個のCPUスロットを
+    確保してから学習する（スロットの合計は n_threads）。スロットの多いジョブから順に投入する。
+
+    run 名は '{name}_seed{seed}'。保存済みの run は overwrite=False の場合スキップする。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame or FeatureMatrix
+        訓練データ
+    test : pd.DataFrame or FeatureMatrix
+        テストデータ
+    y : array-like
+        目的変数
+    features : List[str], optional
+        特徴量のリスト（デフォルト: FeatureMatrix ならすべてのカラム、DataFrame なら必須）
+    config : Dict, optional
+        load_model_config() の戻り値（デフォルト: config_path から読み込む）
+    config_path : str
+        設定ファイルのパス
+    store : PredictionStore, optional
+        予測の保存先（デフォルト: PredictionStore()）
+    n_threads : int, optional
+        CPUスロットの合計（デフォルト: 設定の n_threads、なければ全コア）
+    matrix_path_prefix : str, optional
+        特徴量行列をメモリマップで保存する場合の保存先（build_feature_matrix() を参照）
+    overwrite : bool
+        保存済みの run も再学習するか
+    verbose : bool
+        ジョブごとの結果を表示するか
+
+    Returns:
+    --------
+    pd.DataFrame : ジョブごとの結果（run, type, seed, cv_score, 学習時間など。スキップした run も含む）
+    """
+    config = load_model_config(config_path) if config is None else config
+    store = PredictionStore() if store is None else store
+    n_threads = n_threads or config.get('n_threads') or os.cpu_count() or 1
+    lgb_metric, xgb_metric = _METRIC_NAMES.get(config['metric'], (config['metric'], config['metric']))
+    num_boost_round = config['num_boost_round']
+    early_stopping_rounds = config['early_stopping_rounds']
+
+    jobs = [
+        (f"{run['name']}_seed{seed}", run, seed)
+        for run in config['runs']
+        for seed in run['seeds']
+    ]
+    # 保存済みの run はメタデータから結果を復元し、学習はスキップする
+    records = []
+    if not overwrite:
+        done = set(store.names())
+        records = [{col: store.load(name)[2].get(col) for col in _RESULT_COLUMNS}
+                   for name, _, _ in jobs if name in done]
+        jobs = [job for job in jobs if job[0] not in done]
+    higher_is_better = _HIGHER_IS_BETTER.get(lgb_metric, False)
+    if not jobs:
+        return _results_frame(records, higher_is_better)
+
+    # 特徴量行列とフォールドを一度だけ作成
+    if isinstance(train, FeatureMatrix):
+        features = train.columns if features is None else features
+        X, X_test = train.subset(features), test.subset(features)
+    else:
+        train_matrix, test_matrix = build_feature_matrix(train, test, features, path_prefix=matrix_path_prefix)
+        X, X_test = train_matrix.values, test_matrix.values
+    y = np.asarray(y)
+    folds = make_folds(y, n_folds=config['n_folds'], seed=config['fold_seed'])
+
+    # モデルの種類（と Dataset のパラメータ）ごとの学習データを一度だけ作成
+    prepared = {}
+    for _, run, _ in jobs:
+        key = (run['type'], json.dumps(run.get('dataset_params', {}), sort_keys=True))
+        if key in prepared:
+            continue
+        if run['type'] == 'lightgbm':
+            prepared[key] = (build_fold_datasets(X, y, folds, dataset_params=run.get('dataset_params')), X_test)
+        else:
+            import xgboost as xgb
+            prepared[key] = (_build_xgb_folds(X, y, folds, n_threads), xgb.DMatrix(X_test, nthread=n_threads))
+
+    slots = _CpuSlots(n_threads)
+
+    def execute(job: Tuple[str, Dict, int]) -> Dict:
+        name, run, seed = job
+        key = (run['type'], json.dumps(run.get('dataset_params', {}), sort_keys=True))
+        fold_data, test_data = prepared[key]
+        threads = slots.acquire(run.get('num_threads', 1))
+        try:
+            start = time.perf_counter()
+            params = dict(run['params'])
+            if run['type'] == 'lightgbm':
+                params.update({'random_state': seed, 'num_threads': threads})
+                val_preds, test_pred, scores, iterations = _train_lightgbm(
+                    params, fold_data, test_data, num_boost_round, early_stopping_rounds, lgb_metric
+                )
+            else:
+                params.update({'seed': seed, 'nthread': threads})
+                val_preds, test_pred, scores, iterations = _train_xgboost(
+                    params, fold_data, test_data, num_boost_round, early_stopping_rounds, xgb_metric
+                )
+            seconds = time.perf_counter() - start
+        finally:
+            slots.release(threads)
+
+        oof = np.empty(len(y), dtype=np.float64)
+        for (_, val_idx), pred in zip(folds, val_preds):
+            oof[val_idx] = pred
+
+        record = {
+            'run': name,
+            'type': run['type'],
+            'seed': seed,
+            'metric': config['metric'],
+            'cv_score': float(np.mean(scores)),
+            'cv_std': float(np.std(scores)),
+            'fold_scores': [float(s) for s in scores],
+            'best_iterations': [int(i) for i in iterations],
+            'num_threads': threads,
+            'seconds': seconds,
+        }
+        store.save(name, oof, test_pred, dict(record, params=run['params'], features=list(features or [])))
+        if verbose:
+            print(f"{name}: {config['metric']}={record['cv_score']:.5f} ± {record['cv_std']:.5f} "
+                  f"({threads}スレッド, {seconds:.1f}秒)")
+        return record
+
+    # スロットの多いジョブから投入し、空いたスロットに小さいジョブを詰める
+    jobs.sort(key=lambda job: -min(job[1].get('num_threads', 1), n_threads))
+    n_workers = min(len(jobs), n_threads)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        records += list(executor.map(execute, jobs))
+
+    return _results_frame(records, higher_is_better)
@@ -0,0 +1,245 @@
+"""
+数値特徴量の分位点変換（Gauss-rank / 一様分布）
+全数値カラムの分位点テーブルを一括で学習し、新しいデータは searchsorted による補間で変換する
+"""
+import json
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from .utils import load_cached_params, save_cached_params
+
+
+def _column_quantiles(x: np.ndarray, references: np.ndarray) -> np.ndarray:
+    """1カラムの分位点（欠損を除いて1回だけソート）"""
+    sorted_x = np.sort(x[~np.isnan(x)])
+    if len(sorted_x) == 0:
+        return np.zeros(len(references))
+    # 線形補間の分位点（np.quantile の 'linear' と同じ）
+    pos = references * (len(sorted_x) - 1)
+    lower = np.floor(pos).astype(np.int64)
+    upper = np.minimum(lower + 1, len(sorted_x) - 1)
+    return sorted_x[lower] + (pos - lower) * (sorted_x[upper] - sorted_x[lower])
+
+
+def fit_quantile_transform(train: pd.DataFrame,
+                           cols: List[str],
+                           n_quantiles: int = 1000,
+                           output: str = 'normal',
+                           subsample: int = None,
+                           n_jobs: int = 1,
+                           seed: int = 42) -> Dict:
+    """
+    分位点変換の補間テーブルを学習
+
+    対象カラムを1つの2次元配列として取り出し、カラムごとの1回のソートで
+    n_quantiles 個の分位点を求める（カラムはスレッドで並列に処理）。
+    保存するのは (カラム数 × n_quantiles) のテーブルのみで、訓練データは不要。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    cols : List[str]
+        対象の数値カラム（例: get_base_features() の 'NUMS'）
+    n_quantiles : int
+        分位点の数（ユニーク値がこれより少ないカラムは値そのものが境界になる）
+    output : str
+        'normal'（Gauss-rank、標準正規分布）または 'uniform'（[0, 1]）
+    subsample : int, optional
+        分位点の計算に使う行数（None: 全行）
+    n_jobs : int
+        スレッド数（-1: 全コア）
+    seed : int
+        サンプリングのシード
+
+    Returns:
+    --------
+    Dict : 学習済みパラメータ（JSONで保存可能）
+    """
+    if output not in ('normal', 'uniform'):
+        raise ValueError(f"output は 'normal' または 'uniform': {output}")
+
+    X = train[cols].to_numpy(dtype=np.float64)
+    if subsample is not None and len(X) > subsample:
+        rng = np.random.default_rng(seed)
+        X = X[np.sort(rng.choice(len(X), subsample, replace=False))]
+
+    references = np.linspace(0, 1, n_quantiles)
+    n_workers = (os.cpu_count() or 1) if n_jobs is None or n_jobs < 0 else max(1, n_jobs)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        quantiles = list(executor.map(lambda j: _column_quantiles(X[:, j], references), range(len(cols))))
+
+    return {
+        'columns': list(cols),
+        'output': output,
+        'references': references.tolist(),
+        'quantiles': np.vstack(quantiles).tolist() if quantiles else [],
+    }
+
+
+def _interpolate(x: np.ndarray, quantiles: np.ndarray, references: np.ndarray) -> np.ndarray:
+    """
+    分位点テーブルで値を累積確率に変換
+
+    同じ値が複数の分位点にまたがる場合（離散値のカラム）は、左右から補間した値の平均
+    （その値の区間の中央）にする。
+    """
+    n = len(quantiles)
+    x_clipped = np.clip(x, quantiles[0], quantiles[-1])
+
+    def side(idx: np.ndarray) -> np.ndarray:
+        i = np.clip(idx, 1, n - 1)
+        q0, q1 = quantiles[i - 1], quantiles[i]
+        r0, r1 = references[i - 1], references[i]
+        width = q1 - q0
+        frac = np.divide(x_clipped - q0, width, out=np.zeros_like(x_clipped), where=width > 0)
+        return r0 + np.clip(frac, 0, 1) * (r1 - r0)
+
+    forward = side(np.searchsorted(quantiles, x_clipped, side='right'))
+    backward = side(np.searchsorted(quantiles, x_clipped, side='left'))
+    p = 0.5 * (forward + backward)
+    p[np.isnan(x)] = np.nan
+    return p
+
+
+def apply_quantile_transform(df: pd.DataFrame, params: Dict,
+                             suffix: str = None,
+                             n_jobs: int = 1) -> pd.DataFrame:
+    """
+    学習済みの分位点変換を適用（再学習はしない）
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム（テストデータやチャンク）
+    params : Dict
+        fit_quantile_transform() の戻り値
+    suffix : str, optional
+        作成するカラムの接尾辞（デフォルト: 'normal' は '_gauss'、'uniform' は '_quantile'。
+        '' を指定すると元のカラムを上書き）
+    n_jobs : int
+        スレッド数（-1: 全コア）
+
+    Returns:
+    --------
+    pd.DataFrame : 変換後のカラムを追加したデータフレーム
+    """
+    from scipy.special import ndtri
+
+    df = df.copy()
+    if suffix is None:
+        suffix = '_gauss' if params['output'] == 'normal' else '_quantile'
+
+    positions = [j for j, col in enumerate(params['columns']) if col in df.columns]
+    if not positions:
+        return df
+    cols = [params['columns'][j] for j in positions]
+    quantiles = np.asarray(params['quantiles'], dtype=np.float64)[positions]
+    references = np.asarray(params['references'], dtype=np.float64)
+
+    X = df[cols].to_numpy(dtype=np.float64)
+    out = np.empty(X.shape, dtype=np.float64)
+
+    def task(j: int) -> None:
+        p = _interpolate(X[:, j], quantiles[j], references)
+        if params['output'] == 'normal':
+            # 両端が ±inf にならないよう確率を丸めてから標準正規分布の分位点に変換
+            eps = 1e-7
+            p = ndtri(np.clip(p, eps, 1 - eps))
+        out[:, j] = p
+
+    n_workers = (os.cpu_count() or 1) if n_jobs is None or n_jobs < 0 else max(1, n_jobs)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(task, range(len(cols))))
+
+    df[[f'{col}{suffix}' for col in cols]] = out
+    return df
+
+
+def save_quantile_transform(params: Dict, path: str) -> None:
+    """
+    学習済みパラメータをJSONに保存
+
+    Parameters:
+    -----------
+    params : Dict
+        fit_quantile_transform() の戻り値
+    path : str
+        保存先のパス
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(params, f, ensure_ascii=False)
+
+
+def load_quantile_transform(path: str) -> Dict:
+    """
+    保存したパラメータを読み込む
+
+    Parameters:
+    -----------
+    path : str
+        save_quantile_transform() で保存したJSONのパス
+
+    Returns:
+    --------
+    Dict : fit_quantile_transform() と同じ形式のパラメータ
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def quantile_transform_features(train: pd.DataFrame, test: pd.DataFrame,
+                                cols: List[str],
+                                n_quantiles: int = 1000,
+                                output: str = 'normal',
+                                subsample: int = None,
+                                suffix: str = None,
+                                n_jobs: int = 1,
+                                cache_path: str = None) -> tuple:
+    """
+    訓練データで学習した分位点変換を訓練・テストデータに適用
+
+    cache_path が存在し、保存時の設定（cols・output・n_quantiles・subsample）が引数と一致する場合は
+    学習済みパラメータを読み込む。存在しない場合や設定が異なる場合は学習して保存する。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str]
+        対象の数値カラム
+    n_quantiles : int
+        分位点の数
+    output : str
+        'normal' または 'uniform'
+    subsample : int, optional
+        分位点の計算に使う行数（None: 全行）
+    suffix : str, optional
+        作成するカラムの接尾辞
+    n_jobs : int
+        スレッド数
+    cache_path : str, optional
+        パラメータのキャッシュ（設定とパラメータのJSON）のパス
+
+    Returns:
+    --------
+    tuple : (train, test, params)
+    """
+    settings = {'cols': list(cols), 'output': output, 'n_quantiles': n_quantiles, 'subsample': subsample}
+    params = load_cached_params(cache_path, settings)
+    if params is None:
+        params = fit_quantile_transform(train, cols, n_quantiles=n_quantiles, output=output,
+                                        subsample=subsample, n_jobs=n_jobs)
+        if cache_path is not None:
+            save_cached_params(params, cache_path, settings)
+
+    train = apply_quantile_transform(train, params, suffix=suffix, n_jobs=n_jobs)
+    test = apply_quantile_transform(test, params, suffix=suffix, n_jobs=n_jobs)
+
+    return train, test, params
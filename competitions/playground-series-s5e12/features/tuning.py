@@ -0,0 +1,241 @@
+"""
+ハイパーパラメータ探索（Successive Halving）
+フォールドごとのDatasetを一度だけ作成し、行数とブースティング回数を段階的に増やしながら候補を絞り込む
+"""
+import json
+import os
+import time
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from .cv import build_fold_datasets, make_folds, train_booster, _HIGHER_IS_BETTER, _LGB_LOCK
+
+
+def sample_params(param_space: Dict, rng: np.random.Generator) -> Dict:
+    """
+    探索空間からパラメータを1組サンプリング
+
+    探索空間の指定方法:
+        (low, high)            : float は一様分布、int は整数の一様分布
+        ('log', low, high)     : 対数一様分布
+        [a, b, c]              : いずれかを選択
+        その他の値             : 固定値
+
+    Parameters:
+    -----------
+    param_space : Dict
+        パラメータ名 → 探索範囲
+    rng : np.random.Generator
+        乱数生成器
+
+    Returns:
+    --------
+    Dict : パラメータ
+    """
+    params = {}
+    for name, space in param_space.items():
+        if isinstance(space, list):
+            value = space[rng.integers(len(space))]
+            params[name] = value.item() if isinstance(value, np.generic) else value
+        elif isinstance(space, tuple) and len(space) == 3 and space[0] == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(space[1]), np.log(space[2]))))
+        elif isinstance(space, tuple) and len(space) == 2:
+            low, high = space
+            if isinstance(low, int) and isinstance(high, int):
+                params[name] = int(rng.integers(low, high + 1))
+            else:
+                params[name] = float(rng.uniform(low, high))
+        else:
+            params[name] = space
+    return params
+
+
+def _load_study(path: str) -> Dict[tuple, Dict]:
+    """保存済みの試行結果を (trial_id, rung) → 結果 の辞書で読み込む"""
+    results = {}
+    if path is not None and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    results[(record['trial_id'], record['rung'])] = record
+    return results
+
+
+def successive_halving_search(X, y,
+                              param_space: Dict,
+                              n_trials: int = 27,
+                              eta: int = 3,
+                              min_rows_fraction: float = 1 / 9,
+                              min_rounds: int = 100,
+                              max_rounds: int = 900,
+                              n_folds: int = 3,
+                              metric: str = 'auc',
+                              early_stopping_rounds: int = 50,
+                              n_workers: int = 2,
+                              n_threads: int = None,
+                              study_path: str = 'logs/tuning_study.jsonl',
+                              dataset_params: Dict = None,
+                              base_params: Dict = None,
+                              seed: int = 42,
+                              verbose: bool = True) -> tuple:
+    """
+    Successive Halving によるハイパーパラメータ探索
+
+    rung 0 では全候補を「min_rows_fraction の行 × min_rounds 回」で評価し、上位 1/eta を残して
+    行数とブースティング回数を eta 倍にする。これを全行・max_rounds に達するまで繰り返す。
+    ビン分け済みのDatasetはフォールドごとに一度だけ作成し、行の部分集合は Dataset.subset()
+    （ビン境界を共有）で作るため、試行ごとの再作成は発生しない。
+
+    結果は study_path に1試行1行のJSONで追記され、同じ study_path と seed で再実行すると
+    評価済みの (試行, rung) はスキップされる（中断からの再開）。
+
+    Parameters:
+    -----------
+    X : pd.DataFrame or np.ndarray
+        特徴量
+    y : array-like
+        目的変数
+    param_space : Dict
+        探索空間（sample_params() を参照）
+    n_trials : int
+        rung 0 の候補数
+    eta : int
+        各 rung で残す割合の逆数、および行数・回数の増加率
+    min_rows_fraction : float
+        rung 0 で使う学習行の割合
+    min_rounds : int
+        rung 0 の最大ブースティング回数
+    max_rounds : int
+        最終 rung の最大ブースティング回数
+    n_folds : int
+        交差検証の分割数
+    metric : str
+        評価指標（'auc' は大きいほど良い、'binary_logloss' は小さいほど良い）
+    early_stopping_rounds : int
+        早期終了の回数
+    n_workers : int
+        並列に評価する試行数（スレッド）
+    n_threads : int, optional
+        全体のスレッド数の上限（各試行の num_threads = n_threads // n_workers、デフォルト: 全コア）
+    study_path : str, optional
+        試行結果の保存先（JSON Lines）
+    dataset_params : Dict, optional
+        Datasetのパラメータ（max_bin など、探索対象にしない）
+    base_params : Dict, optional
+        全試行に共通のLightGBMパラメータ
+    seed : int
+        乱数シード
+    verbose : bool
+        rung ごとの結果を表示するか
+
+    Returns:
+    --------
+    tuple : (best_params, results)
+        results: 全試行・全 rung の結果のデータフレーム
+    """
+    rng = np.random.default_rng(seed)
+    higher_is_better = _HIGHER_IS_BETTER.get(metric, False)
+    n_threads = n_threads or os.cpu_count() or 1
+    threads_per_trial = max(1, n_threads // max(n_workers, 1))
+
+    # 候補はシードから決まるため、再開時も同じ候補が生成される
+    candidates = [sample_params(param_space, rng) for _ in range(n_trials)]
+    base = {'objective': 'binary', 'verbosity': -1, 'random_state': seed}
+    base.update(base_params or {})
+
+    folds = make_folds(y, n_folds=n_folds, seed=seed)
+    fold_datasets = build_fold_datasets(X, y, folds, dataset_params=dataset_params)
+
+    # rung ごとの (行の割合, ブースティング回数)
+    n_rungs = 1
+    while min_rounds * eta ** n_rungs <= max_rounds and min_rows_fraction * eta ** n_rungs <= 1.0 + 1e-9:
+        n_rungs += 1
+    schedule = [
+        (min(1.0, min_rows_fraction * eta ** i), min(max_rounds, min_rounds * eta ** i))
+        for i in range(n_rungs)
+    ]
+    schedule[-1] = (1.0, max_rounds)
+
+    # 行の部分集合のDatasetは rung ごとに一度だけ作成し、全試行で共有する
+    subset_cache = {}
+
+    def get_train_set(fold: int, fraction: float):
+        dtrain, _ = fold_datasets[fold]
+        if fraction >= 1.0:
+            return dtrain
+        key = (fold, fraction)
+        if key not in subset_cache:
+            n_rows = dtrain.num_data()
+            idx = np.sort(np.random.default_rng(seed + fold).permutation(n_rows)[:max(1, int(n_rows * fraction))])
+            with _LGB_LOCK:
+                subset = dtrain.subset(idx.tolist())
+                subset.construct()
+            subset_cache[key] = subset
+        return subset_cache[key]
+
+    done = _load_study(study_path)
+    if study_path is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(study_path)), exist_ok=True)
+
+    def evaluate(trial_id: int, rung: int) -> Dict:
+        if (trial_id, rung) in done:
+            return done[(trial_id, rung)]
+        fraction, rounds = schedule[rung]
+        params = dict(base)
+        params.update(candidates[trial_id])
+        params['num_threads'] = threads_per_trial
+
+        start = time.perf_counter()
+        scores, iterations = [], []
+        for fold in range(len(fold_datasets)):
+            _, score, best_iteration = train_booster(
+                params, get_train_set(fold, fraction), fold_datasets[fold][1],
+                num_boost_round=rounds, early_stopping_rounds=early_stopping_rounds, metric=metric
+            )
+            scores.append(score)
+            iterations.append(best_iteration)
+
+        return {
+            'trial_id': trial_id,
+            'rung': rung,
+            'rows_fraction': fraction,
+            'num_boost_round': rounds,
+            'score': float(np.mean(scores)),
+            'score_std': float(np.std(scores)),
+            'best_iteration': int(np.mean(iterations)),
+            'params': candidates[trial_id],
+            'seconds': time.perf_counter() - start,
+        }
+
+    records = []
+    survivors = list(range(n_trials))
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        for rung in range(n_rungs):
+            # 並列評価する試行のタスクをまとめて投入（結果は終わった順ではなく試行順で取得）
+            for record in executor.map(lambda trial_id: evaluate(trial_id, rung), survivors):
+                records.append(record)
+                if (record['trial_id'], rung) not in done and study_path is not None:
+                    with open(study_path, 'a') as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    done[(record['trial_id'], rung)] = record
+
+            rung_records = [r for r in records if r['rung'] == rung]
+            rung_records.sort(key=lambda r: r['score'], reverse=higher_is_better)
+            if verbose:
+                fraction, rounds = schedule[rung]
+                print(f'rung {rung}: {len(rung_records)}試行, 行 {fraction:.0%}, {rounds}回 '
+                      f'→ best {metric}={rung_records[0]["score"]:.5f} (trial {rung_records[0]["trial_id"]})')
+            n_keep = max(1, len(rung_records) // eta)
+            survivors = [r['trial_id'] for r in rung_records[:n_keep]]
+
+    results = pd.DataFrame(records)
+    final = results[results['rung'] == n_rungs - 1].sort_values('score', ascending=not higher_is_better)
+    best = final.iloc[0]
+    best_params = dict(base)
+    best_params.update(best['params'])
+    best_params['n_estimators'] = int(best['best_iteration'])
+
+    return best_params, results
@@ -2,17 +2,17 @@
 特徴量エンジニアリングのユーティリティ関数
 段階的な特徴量追加、実験管理など
 """
+import json
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Callable
 import sys
 import os
+import subprocess
 
-# 親ディレクトリのfeaturesモジュールをインポート
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-
-def create_features_phase1(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def create_features_phase1(train: pd.DataFrame, test: pd.DataFrame,
+                           n_jobs: int = 1, backend: str = 'thread') -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Phase 1: 高重要度特徴量の相互作用特徴量を作成
     
@@ -22,6 +22,10 @@ def create_features_phase1(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.
         訓練データ
     test : pd.DataFrame
         テストデータ
+    n_jobs : int
+        並列ワーカー数（1: 直列実行、-1: 全コア）
+    backend : str
+        並列実行時のバックエンド（'thread' または 'process'）
     
     Returns:
     --------
@@ -29,13 +33,20 @@ def create_features_phase1(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.
     """
     from .interaction import create_high_importance_interactions
     
+    if n_jobs != 1:
+        from .parallel import apply_features_parallel_train_test
+        return apply_features_parallel_train_test(
+            train, test, [create_high_importance_interactions], n_jobs=n_jobs, backend=backend
+        )
+    
     train = create_high_importance_interactions(train)
     test = create_high_importance_interactions(test)
     
     return train, test
 
 
-def create_features_phase2(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def create_features_phase2(train: pd.DataFrame, test: pd.DataFrame,
+                           n_jobs: int = 1, backend: str = 'thread') -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Phase 2: 統計的特徴量を作成
     
@@ -45,6 +56,10 @@ def create_features_phase2(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.
         訓練データ
     test : pd.DataFrame
         テストデータ
+    n_jobs : int
+        並列ワーカー数（1: 直列実行、-1: 全コア）
+    backend : str
+        並列実行時のバックエンド（'thread' または 'process'）
     
     Returns:
     --------
@@ -52,12 +67,13 @@ def create_features_phase2(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.
     """
     from .statistical import create_all_statistical_features
     
-    train, test = create_all_statistical_features(train, test)
+    train, test = create_all_statistical_features(train, test, n_jobs=n_jobs, backend=backend)
     
     return train, test
 
 
-def create_features_phase3(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def create_features_phase3(train: pd.DataFrame, test: pd.DataFrame,
+                           n_jobs: int = 1, backend: str = 'thread') -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Phase 3: その他の相互作用特徴量を作成
     
@@ -67,6 +83,10 @@ def create_features_phase3(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.
         訓練データ
     test : pd.DataFrame
         テストデータ
+    n_jobs : int
+        並列ワーカー数（1: 直列実行、-1: 全コア）
+    backend : str
+        並列実行時のバックエンド（'thread' または 'process'）
     
     Returns:
     --------
@@ -78,6 +98,15 @@ def create_features_phase3(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.
         create_demographic_interactions
     )
     
+    if n_jobs != 1:
+        from .parallel import apply_features_parallel_train_test
+        builders = [
+            create_cholesterol_interactions,
+            create_lifestyle_interactions,
+            create_demographic_interactions,
+        ]
+        return apply_features_parallel_train_test(train, test, builders, n_jobs=n_jobs, backend=backend)
+    
     train = create_cholesterol_interactions(train)
     test = create_cholesterol_interactions(test)
     
@@ -92,7 +121,9 @@ def create_features_phase3(train: pd.DataFrame, test: pd.DataFrame) -> Tuple[pd.
 
 def create_features_incremental(train: pd.DataFrame, 
                                 test: pd.DataFrame,
-                                phases: List[int] = [1, 2, 3]) -> Tuple[pd.DataFrame, pd.DataFrame, Dict]:
+                                phases: List[int] = [1, 2, 3],
+                                n_jobs: int = 1,
+                                backend: str = 'thread') -> Tuple[pd.DataFrame, pd.DataFrame, Dict]:
     """
     段階的に特徴量を追加
     
@@ -104,6 +135,10 @@ def create_features_incremental(train: pd.DataFrame,
         テストデータ
     phases : List[int]
         実行するフェーズのリスト（1, 2, 3）
+    n_jobs : int
+        並列ワーカー数（1: 直列実行、-1: 全コア）
+    backend : str
+        並列実行時のバックエンド（'thread' または 'process'）
     
     Returns:
     --------
@@ -129,7 +164,7 @@ def create_features_incremental(train: pd.DataFrame,
         
         n_before = len([c for c in train.columns if c not in ['id', 'diagnosed_diabetes']])
         
-        train, test = phase_functions[phase](train, test)
+        train, test = phase_functions[phase](train, test, n_jobs=n_jobs, backend=backend)
         
         n_after = len([c for c in train.columns if c not in ['id', 'diagnosed_diabetes']])
         n_added = n_after - n_before
@@ -224,3 +259,105 @@ def print_feature_summary_by_phase(feature_info: Dict):
     
     print(f"合計特徴量数: {feature_info['total_features']}個")
     print("=" * 60)
+
+
+def measure_import_time(statement: str = 'from features import create_all_statistical_features',
+                        heavy_modules: List[str] = ['sklearn', 'scipy', 'lightgbm', 'xgboost'],
+                        max_seconds: float = None,
+                        check: bool = True) -> Dict:
+    """
+    新しいPythonプロセスでインポート時間と読み込まれた重いモジュールを計測
+    
+    ワーカープロセスの起動コストの回帰チェックに使う（check=True の場合、max_seconds を
+    超えるか heavy_modules が読み込まれると AssertionError）。
+    
+    Parameters:
+    -----------
+    statement : str
+        計測するインポート文
+    heavy_modules : List[str]
+        読み込まれてはいけないモジュールのリスト
+    max_seconds : float, optional
+        インポート時間の上限（秒）
+    check : bool
+        True の場合は上記の条件を assert する
+    
+    Returns:
+    --------
+    Dict : {'seconds': インポート時間, 'loaded_heavy_modules': 読み込まれた重いモジュール}
+    """
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        'import sys, time\n'
+        'start = time.perf_counter()\n'
+        f'{statement}\n'
+        'elapsed = time.perf_counter() - start\n'
+        'print(elapsed)\n'
+        'print(",".join(sorted({m.split(".")[0] for m in sys.modules})))\n'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=package_parent,
+        capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    
+    seconds = float(output[0])
+    loaded = set(output[1].split(','))
+    loaded_heavy = [m for m in heavy_modules if m in loaded]
+    
+    if check:
+        assert not loaded_heavy, f'重いモジュールが読み込まれています: {loaded_heavy}'
+    if check and max_seconds is not None:
+        assert seconds <= max_seconds, f'インポート時間が上限を超えています: {seconds:.3f}s > {max_seconds}s'
+    
+    return {'seconds': seconds, 'loaded_heavy_modules': loaded_heavy}
+
+
+def _normalize_settings(settings: Dict) -> Dict:
+    """JSONに保存した値と比較できる形に変換（タプル → リストなど）"""
+    return json.loads(json.dumps(settings, ensure_ascii=False, default=str))
+
+
+def load_cached_params(path: str, settings: Dict):
+    """
+    学習済みパラメータのキャッシュを読み込む（保存時の設定が一致する場合のみ）
+    
+    save_cached_params() で保存したJSONの 'settings' が settings と一致しない場合や、
+    設定を保存していない古いキャッシュの場合は None を返す（呼び出し側で再学習する）。
+    
+    Parameters:
+    -----------
+    path : str, optional
+        キャッシュ（JSON）のパス
+    settings : Dict
+        学習時の設定（対象カラム、方法、シードなど）
+    
+    Returns:
+    --------
+    Dict or None : 学習済みパラメータ
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        cached = json.load(f)
+    if not isinstance(cached, dict) or cached.get('settings') != _normalize_settings(settings):
+        return None
+    return cached.get('params')
+
+
+def save_cached_params(params: Dict, path: str, settings: Dict) -> None:
+    """
+    学習済みパラメータを学習時の設定とともにJSONに保存
+    
+    Parameters:
+    -----------
+    params : Dict
+        学習済みパラメータ
+    path : str
+        保存先のパス
+    settings : Dict
+        学習時の設定（load_cached_params() で照合する）
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'settings': _normalize_settings(settings), 'params': params},
+                  f, ensure_ascii=False, default=str)
@@ -0,0 +1,35 @@
+"""
+特徴量エンジニアリングモジュール（Titanic）
+
+使用方法:
+    from features import extract_name_features, extract_ticket_cabin_features, create_text_svd_features
+
+    # 敬称・姓・チケット接頭辞・客室デッキ（行ごとの apply を使わない）
+    train = extract_ticket_cabin_features(extract_name_features(train))
+    test = extract_ticket_cabin_features(extract_name_features(test))
+
+    # Name の文字 n-gram をハッシュした疎行列を SVD で圧縮
+    train, test, svd_cols = create_text_svd_features(
+        train, test, ['Name'], n_components=8, analyzer='char', ngram_range=(2, 4),
+        cache_dir='../data/output/text_cache'
+    )
+"""
+
+from .text import (
+    TITLE_MAP,
+    hash_text_columns,
+    hash_text_features,
+    create_text_svd_features,
+    extract_name_features,
+    extract_ticket_cabin_features
+)
+
+__all__ = [
+    # text
+    'TITLE_MAP',
+    'hash_text_columns',
+    'hash_text_features',
+    'create_text_svd_features',
+    'extract_name_features',
+    'extract_ticket_cabin_features',
+]
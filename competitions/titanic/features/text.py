@@ -0,0 +1,391 @@
+"""
+文字列カラムの特徴量
+文字列をベクトル化した処理でトークン化し、語彙を持たないハッシュ n-gram の疎行列（と任意で Truncated SVD）を作成する
+"""
+import hashlib
+import json
+import os
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+from typing import List, Tuple
+
+
+TOKEN_PATTERN = r'[a-z0-9]+'
+
+# 敬称のグループ化（上位解法ノートブックと同じ対応）
+TITLE_MAP = {
+    'Mlle': 'Miss', 'Ms': 'Miss', 'Mme': 'Mrs',
+    'Dr': 'Officer', 'Rev': 'Officer', 'Major': 'Officer', 'Col': 'Officer', 'Capt': 'Officer',
+    'Sir': 'Royal', 'Lady': 'Royal', 'Countess': 'Royal', 'Don': 'Royal', 'Jonkheer': 'Royal', 'Dona': 'Royal',
+}
+
+
+def _normalize_text(values: pd.Series, lowercase: bool) -> pd.Series:
+    text = values.astype(object).where(values.notna(), '').astype(str).reset_index(drop=True)
+    return text.str.lower() if lowercase else text
+
+
+# 64bit ハッシュの混合に使う定数（splitmix64）
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_ROLL = np.uint64(0x100000001B3)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """uint64 配列のハッシュ値をかき混ぜる（splitmix64 の最終処理、桁あふれは 2**64 で折り返す）"""
+    h = (h ^ (h >> np.uint64(30))) * _MIX_1
+    h = (h ^ (h >> np.uint64(27))) * _MIX_2
+    return h ^ (h >> np.uint64(31))
+
+
+def _salt(col: str, n: int, seed: int) -> np.uint64:
+    """カラム名・n-gram の長さ・シードから決まるハッシュの塩（カラム間で同じ n-gram を区別する）"""
+    digest = hashlib.md5(f'{seed}\x01{col}\x01{n}'.encode()).digest()
+    return np.uint64(int.from_bytes(digest[:8], 'little'))
+
+
+def _word_ngram_hashes(text: pd.Series, ngram_range: Tuple[int, int], token_pattern: str,
+                       col: str, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    単語 n-gram を (行番号, ハッシュ値) の配列で返す
+
+    正規表現によるトークン化と explode で全行を一括処理し、トークンは pd.util.hash_array で
+    1回だけハッシュする。n-gram は文字列を連結せず、連続するトークンのハッシュ値を
+    配列演算で合成する（「n 個先のトークンが同じ行か」で行をまたぐ n-gram を除く）。
+    """
+    exploded = text.str.findall(token_pattern).explode().dropna()
+    rows = exploded.index.to_numpy(dtype=np.int64)
+    token_hashes = pd.util.hash_array(exploded.to_numpy(dtype=object), hash_key=f'{seed:016d}'[-16:])
+
+    all_rows, all_hashes = [], []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        if len(token_hashes) < n:
+            continue
+        m = len(token_hashes) - n + 1
+        same_row = rows[:m] == rows[n - 1:]
+        h = token_hashes[:m].copy()
+        for offset in range(1, n):
+            h = _mix(h * _ROLL + token_hashes[offset:offset + m])
+        all_rows.append(rows[:m][same_row])
+        all_hashes.append(_mix(h[same_row] ^ _salt(col, n, seed)))
+
+    if not all_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+    return np.concatenate(all_rows), np.concatenate(all_hashes)
+
+
+def _char_ngram_hashes(text: pd.Series, ngram_range: Tuple[int, int], col: str, seed: int,
+                       chunk_rows: int = 100_000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    文字 n-gram を (行番号, ハッシュ値) の配列で返す（前後に空白を付けた文字列から切り出す、空文字列は除く）
+
+    行チャンクを固定長の Unicode 配列にして (行数, 最大文字数) の文字コード行列として扱い、
+    全行・全開始位置の n-gram のハッシュ値を「n-1 文字のハッシュ × 定数 + 次の文字」で
+    配列演算により一括計算する（n-gram の文字列は作成しない）。
+    """
+    padded = (' ' + text + ' ').where(text != '', '')
+    all_rows, all_hashes = [], []
+
+    for start in range(0, len(padded), chunk_rows):
+        chunk = padded.iloc[start:start + chunk_rows].to_numpy(dtype=str)
+        lengths = np.char.str_len(chunk)
+        max_len = int(lengths.max()) if len(lengths) else 0
+        if max_len < ngram_range[0]:
+            continue
+        codes = chunk.astype(f'U{max_len}').view(np.uint32).reshape(len(chunk), max_len).astype(np.uint64)
+
+        h = None
+        for n in range(1, ngram_range[1] + 1):
+            width = max_len - n + 1
+            if width <= 0:
+                break
+            # h[:, s] は位置 s から始まる n 文字のハッシュ値
+            h = codes[:, :width].copy() if h is None else h[:, :width] * _ROLL + codes[:, n - 1:n - 1 + width]
+            if n < ngram_range[0]:
+                continue
+            valid = np.arange(width)[None, :] + n <= lengths[:, None]
+            rows, _ = np.nonzero(valid)
+            all_rows.append(rows + start)
+            all_hashes.append(_mix(h[valid] ^ _salt(col, n, seed)))
+
+    if not all_rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+    return np.concatenate(all_rows), np.concatenate(all_hashes)
+
+
+def hash_text_columns(df: pd.DataFrame,
+                      cols: List[str],
+                      n_features: int = 2 ** 18,
+                      analyzer: str = 'word',
+                      ngram_range: Tuple[int, int] = (1, 2),
+                      lowercase: bool = True,
+                      token_pattern: str = TOKEN_PATTERN,
+                      alternate_sign: bool = True,
+                      binary: bool = False,
+                      seed: int = 0) -> sp.csr_matrix:
+    """
+    文字列カラムをハッシュ n-gram の疎行列（CSR）に変換
+
+    語彙を持たないため、訓練・テスト・チャンクを別々に変換しても同じ列に対応する。
+    n-gram の文字列は作らず、トークン・文字コードのハッシュ値を配列演算で合成する。
+    ハッシュには「カラム名」を混ぜるため、カラム間で同じ単語も区別される。
+    欠損値・空文字列からは n-gram を作らない（すべて 0 の行になる）。
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    cols : List[str]
+        文字列カラムのリスト
+    n_features : int
+        ハッシュの列数
+    analyzer : str
+        'word'（単語 n-gram）または 'char'（文字 n-gram）
+    ngram_range : Tuple[int, int]
+        n-gram の最小・最大の長さ
+    lowercase : bool
+        小文字に変換するか
+    token_pattern : str
+        単語の正規表現（analyzer='word' のみ）
+    alternate_sign : bool
+        ハッシュ値の符号を交互にして衝突による偏りを打ち消すか
+    binary : bool
+        出現回数ではなく 0/1 にするか
+    seed : int
+        ハッシュのシード
+
+    Returns:
+    --------
+    sp.csr_matrix : (行数, n_features) の float32 疎行列
+    """
+    if analyzer not in ('word', 'char'):
+        raise ValueError(f"analyzer は 'word' または 'char': {analyzer}")
+
+    row_parts, col_parts, sign_parts = [], [], []
+    for col in cols:
+        text = _normalize_text(df[col], lowercase)
+        if analyzer == 'word':
+            rows, hashes = _word_ngram_hashes(text, ngram_range, token_pattern, col, seed)
+        else:
+            rows, hashes = _char_ngram_hashes(text, ngram_range, col, seed)
+        if len(rows) == 0:
+            continue
+        row_parts.append(rows)
+        col_parts.append((hashes % np.uint64(n_features)).astype(np.int64))
+        if alternate_sign:
+            sign_parts.append(np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32))
+        else:
+            sign_parts.append(np.ones(len(rows), dtype=np.float32))
+
+    if not row_parts:
+        return sp.csr_matrix((len(df), n_features), dtype=np.float32)
+
+    matrix = sp.coo_matrix(
+        (np.concatenate(sign_parts), (np.concatenate(row_parts), np.concatenate(col_parts))),
+        shape=(len(df), n_features), dtype=np.float32
+    ).tocsr()
+    matrix.sum_duplicates()
+    if binary:
+        matrix.data = np.sign(matrix.data).astype(np.float32)
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def _cache_key(df: pd.DataFrame, cols: List[str], params: dict) -> str:
+    """データの内容とパラメータから決まるキャッシュのキー"""
+    h = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode())
+    h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def hash_text_features(train: pd.DataFrame, test: pd.DataFrame,
+                       cols: List[str],
+                       n_features: int = 2 ** 18,
+                       cache_dir: str = None,
+                       **kwargs) -> tuple:
+    """
+    訓練・テストデータの文字列カラムをハッシュ n-gram の疎行列に変換
+
+    cache_dir を指定した場合は、データの内容とパラメータから決まるキーで
+    {cache_dir}/text_{key}.npz に保存し、次回以降は読み込む。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str]
+        文字列カラムのリスト
+    n_features : int
+        ハッシュの列数
+    cache_dir : str, optional
+        キャッシュの保存先
+    **kwargs : dict
+        hash_text_columns() に渡す引数（analyzer、ngram_range など）
+
+    Returns:
+    --------
+    tuple : (X_train, X_test, feature_names)
+        X_train, X_test: scipy.sparse.csr_matrix (float32)
+        feature_names: 列名のリスト（'text_hash_{i}'）
+    """
+    feature_names = [f'text_hash_{i}' for i in range(n_features)]
+    params = dict(kwargs, cols=list(cols), n_features=n_features)
+
+    paths = None
+    if cache_dir is not None:
+        paths = [os.path.join(cache_dir, f'text_{_cache_key(df, cols, params)}.npz') for df in (train, test)]
+        if all(os.path.exists(path) for path in paths):
+            return sp.load_npz(paths[0]).tocsr(), sp.load_npz(paths[1]).tocsr(), feature_names
+
+    X_train = hash_text_columns(train, cols, n_features=n_features, **kwargs)
+    X_test = hash_text_columns(test, cols, n_features=n_features, **kwargs)
+
+    if paths is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        sp.save_npz(paths[0], X_train)
+        sp.save_npz(paths[1], X_test)
+
+    return X_train, X_test, feature_names
+
+
+def create_text_svd_features(train: pd.DataFrame, test: pd.DataFrame,
+                             cols: List[str],
+                             n_components: int = 16,
+                             prefix: str = None,
+                             n_features: int = 2 ** 18,
+                             seed: int = 42,
+                             cache_dir: str = None,
+                             **kwargs) -> tuple:
+    """
+    ハッシュ n-gram の疎行列を Truncated SVD で低次元の密な特徴量に圧縮
+
+    SVD は訓練データで学習してテストデータに適用する。cache_dir を指定した場合は
+    疎行列と SVD の結果の両方をキャッシュする。
+
+    Parameters:
+    -----------
+    train : pd.DataFrame
+        訓練データ
+    test : pd.DataFrame
+        テストデータ
+    cols : List[str]
+        文字列カラムのリスト
+    n_components : int
+        SVD の次元数
+    prefix : str, optional
+        作成するカラム名の接頭辞（デフォルト: カラム名を '_' で連結）
+    n_features : int
+        ハッシュの列数
+    seed : int
+        SVD の乱数シード
+    cache_dir : str, optional
+        キャッシュの保存先
+    **kwargs : dict
+        hash_text_columns() に渡す引数
+
+    Returns:
+    --------
+    tuple : (train, test, feature_names)
+    """
+    from sklearn.decomposition import TruncatedSVD
+
+    prefix = prefix or '_'.join(cols)
+    feature_names = [f'{prefix}_svd_{i}' for i in range(n_components)]
+    train = train.copy()
+    test = test.copy()
+
+    path = None
+    if cache_dir is not None:
+        params = dict(kwargs, cols=list(cols), n_features=n_features, n_components=n_components, seed=seed)
+        key = _cache_key(pd.concat([train[cols], test[cols]], ignore_index=True), cols, params)
+        path = os.path.join(cache_dir, f'text_svd_{key}.npz')
+
+    if path is not None and os.path.exists(path):
+        cached = np.load(path)
+        Z_train, Z_test = cached['train'], cached['test']
+    else:
+        X_train, X_test, _ = hash_text_features(train, test, cols, n_features=n_features,
+                                                cache_dir=cache_dir, **kwargs)
+        svd = TruncatedSVD(n_components=n_components, random_state=seed)
+        Z_train = svd.fit_transform(X_train).astype(np.float32)
+        Z_test = svd.transform(X_test).astype(np.float32)
+        if path is not None:
+            np.savez(path, train=Z_train, test=Z_test)
+
+    train[feature_names] = Z_train
+    test[feature_names] = Z_test
+
+    return train, test, feature_names
+
+
+def extract_name_features(df: pd.DataFrame, name_col: str = 'Name') -> pd.DataFrame:
+    """
+    Name カラムから敬称・姓・長さの特徴量を作成（行ごとの apply を使わない）
+
+    作成する特徴量:
+        Title        : 敬称（TITLE_MAP でグループ化、不明は 'Unknown'）
+        Surname      : 姓（'Braund, Mr. Owen Harris' → 'Braund'、名前が欠損の場合は欠損）
+        Name_length  : 文字数
+        Name_n_words : 単語数
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+    name_col : str
+        名前のカラム名
+
+    Returns:
+    --------
+    pd.DataFrame : 特徴量を追加したデータフレーム
+    """
+    df = df.copy()
+    name = df[name_col].fillna('')
+
+    # 'Rothes, the Countess. of (...)' のような 'the' は敬称に含めない
+    title = name.str.extract(r',\s*(?:the\s+)?([^\.]*)\.', expand=False).str.strip()
+    df['Title'] = title.replace(TITLE_MAP).fillna('Unknown')
+    # 名前が欠損している行の姓は欠損のまま
+    df['Surname'] = df[name_col].str.split(',', n=1).str[0].str.strip()
+    df['Name_length'] = name.str.len()
+    df['Name_n_words'] = name.str.count(r'\S+')
+
+    return df
+
+
+def extract_ticket_cabin_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ticket・Cabin カラムから接頭辞・番号・デッキの特徴量を作成（行ごとの apply を使わない）
+
+    作成する特徴量:
+        CabinDeck    : 客室の先頭文字（欠損は 'Unknown'）
+        Cabin_count  : 客室の数
+        TicketPrefix : チケットの英字部分（なければ 'NONE'）
+        TicketNumber : チケットの番号（なければ欠損）
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        入力データフレーム
+
+    Returns:
+    --------
+    pd.DataFrame : 特徴量を追加したデータフレーム
+    """
+    df = df.copy()
+
+    if 'Cabin' in df.columns:
+        cabin = df['Cabin']
+        df['CabinDeck'] = cabin.str[0].fillna('Unknown')
+        df['Cabin_count'] = cabin.str.split().str.len().fillna(0).astype(int)
+
+    if 'Ticket' in df.columns:
+        ticket = df['Ticket'].fillna('').str.strip()
+        prefix = ticket.str.replace(r'\d+$', '', regex=True).str.replace(r'[\./\s]', '', regex=True).str.upper()
+        df['TicketPrefix'] = prefix.where(prefix != '', 'NONE')
+        df['TicketNumber'] = pd.to_numeric(ticket.str.extract(r'(\d+)$', expand=False), errors='coerce')
+
+    return df